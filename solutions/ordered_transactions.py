@@ -5,7 +5,7 @@ Store transactions in a Redis List, ordered from newest to oldest.
 This provides a simple timeline of all transactions.
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 
 def process_transaction(redis_client, tx_data: Dict[str, str]) -> None:
@@ -25,3 +25,92 @@ def get_recent_transactions(redis_client, limit: int = 10) -> List[str]:
     """
     
     return redis_client.lrange("transactions:ordered", 0, limit - 1)
+
+
+# ---------------------------------------------------------------------------
+# Time-ordered index
+#
+# The list above can only be read by offset. A sorted set scored by
+# transaction timestamp lets any page - including "jump to date" - be
+# reached with a score seek, at the same cost as the first page.
+# ---------------------------------------------------------------------------
+
+TIME_INDEX_KEY = "transactions:by_time"
+
+
+def index_transaction(redis_client, tx_data: Dict[str, str]) -> None:
+    """
+    Add transaction ID to the time-ordered index (score = timestamp).
+    """
+    tx_id = tx_data.get('transactionId')
+    timestamp = int(tx_data.get('timestamp', 0))
+
+    redis_client.zadd(TIME_INDEX_KEY, {tx_id: timestamp})
+
+
+def backfill_time_index(redis_client, chunk_size: int = 500) -> int:
+    """
+    Build the time index from "transactions:ordered" and the JSON documents.
+    Called at startup while the index is still empty. Returns IDs indexed.
+    """
+    indexed = 0
+    offset = 0
+    while True:
+        tx_ids = redis_client.lrange("transactions:ordered", offset, offset + chunk_size - 1)
+        if not tx_ids:
+            return indexed
+        offset += len(tx_ids)
+
+        keys = [f"transaction:{tx_id}" for tx_id in tx_ids]
+        timestamps = redis_client.json().mget(keys, "$.timestamp")
+        scores = {
+            tx_id: int(ts[0])
+            for tx_id, ts in zip(tx_ids, timestamps)
+            if ts
+        }
+        if scores:
+            redis_client.zadd(TIME_INDEX_KEY, scores)
+            indexed += len(scores)
+
+
+def get_transaction_page(
+    redis_client,
+    limit: int = 20,
+    before: Optional[int] = None,
+    before_id: Optional[str] = None,
+    after: Optional[int] = None,
+) -> List[Tuple[str, int]]:
+    """
+    Seek into the time index, newest first.
+    Returns up to `limit` (transaction_id, timestamp) tuples.
+
+    - before: Only transactions at or before this timestamp (ms)
+    - before_id: With `before`, the cursor's transaction ID; it and anything
+      already served at the same timestamp are skipped
+    - after: Only transactions at or after this timestamp (ms)
+
+    One round trip: the cursor's timestamp is read separately so ties are
+    resolved by ID, and the rest of the page starts strictly below it.
+    """
+    max_score = "+inf" if before is None else before
+    min_score = "-inf" if after is None else after
+
+    if before is None or before_id is None:
+        page = redis_client.zrevrangebyscore(
+            TIME_INDEX_KEY, max_score, min_score, start=0, num=limit, withscores=True
+        )
+        return [(tx_id, int(score)) for tx_id, score in page]
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zrangebyscore(TIME_INDEX_KEY, before, before)
+    pipe.zrevrangebyscore(
+        TIME_INDEX_KEY, f"({before}", min_score, start=0, num=limit, withscores=True
+    )
+    ties, older = pipe.execute()
+
+    # Same-score members are served in reverse ID order
+    page = [(tx_id, before) for tx_id in sorted(ties, reverse=True) if tx_id < before_id]
+    if after is not None and before < after:
+        page = []
+    page += [(tx_id, int(score)) for tx_id, score in older]
+    return page[:limit]
@@ -7,13 +7,14 @@ This allows natural language queries like "coffee shop transactions" or "transac
 RedisVL provides:
 - SearchIndex: Create and manage vector indexes
 - HFTextVectorizer: Generate embeddings from text
-- VectorQuery: Search for similar vectors
+- RangeQuery: Search for vectors within a distance threshold
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from redisvl.index import SearchIndex
-from redisvl.query import VectorQuery
+from redisvl.query import FilterQuery, RangeQuery
+from redisvl.query.filter import FilterExpression, Num, Tag
 from redisvl.utils.vectorize import HFTextVectorizer
 
 # Generates 384-dimensional embeddings from text
@@ -21,6 +22,9 @@ vectorizer = HFTextVectorizer(model="sentence-transformers/all-MiniLM-L6-v2")
 
 index = None
 
+# Hits further than this cosine distance are dropped by Redis (similarity < 0.50)
+MAX_DISTANCE = 0.50
+
 schema = {
     "index": {
         "name": "idx:transactions:vector",
@@ -37,27 +41,67 @@ schema = {
                 "algorithm": "flat",
                 "datatype": "float32"
             }
-        }
+        },
+        # Pre-filter fields ("|" separator: locations contain commas)
+        {"name": "merchant", "type": "tag", "attrs": {"separator": "|"}},
+        {"name": "category", "type": "tag", "attrs": {"separator": "|"}},
+        {"name": "location", "type": "tag", "attrs": {"separator": "|"}},
+        {"name": "customerId", "type": "tag", "attrs": {"separator": "|"}},
+        {"name": "amount", "type": "numeric"},
+        {"name": "timestamp", "type": "numeric", "attrs": {"sortable": True}},
     ]
 }
 
 
 def create_index(redis_client) -> bool:
-    """Create the vector search index. Called once at startup."""
+    """
+    Create the vector search index. Called once at startup.
+
+    An existing index missing fields from the schema is rebuilt in place
+    (documents are kept and re-indexed).
+    """
     global index
     index = SearchIndex.from_dict(schema, redis_client=redis_client)
     try:
         index.create(overwrite=False)
         return True
     except:
+        pass
+
+    try:
+        existing = _indexed_fields(redis_client)
+    except Exception:
         return False
+    if {field["name"] for field in schema["fields"]} - existing:
+        index.create(overwrite=True, drop=False)
+        return True
+    return False
 
 
-def embed_query(query: str) -> List:
-    """Convert search query text into an embedding vector."""
+def _indexed_fields(redis_client) -> set:
+    """Names of the fields the live index was created with."""
+    info = redis_client.ft(schema["index"]["name"]).info()
+    names = set()
+    for attribute in info.get("attributes", []):
+        attrs = dict(zip(attribute[::2], attribute[1::2]))
+        names.add(attrs.get("attribute"))
+    return names
+
+
+def _query_text(query: str) -> str:
     if "transaction" not in query.lower():
         query = f"transactions {query}"
-    return vectorizer.embed(query)
+    return query
+
+
+def embed_query(query: str) -> List:
+    """Convert search query text into an embedding vector."""
+    return vectorizer.embed(_query_text(query))
+
+
+def embed_queries(queries: List[str]) -> List[List]:
+    """Embed several queries in one forward pass (same vectors as embed_query)."""
+    return vectorizer.embed_many([_query_text(query) for query in queries])
 
 
 def process_transaction(redis_client, tx_data: Dict[str, str]) -> None:
@@ -73,17 +117,29 @@ def process_transaction(redis_client, tx_data: Dict[str, str]) -> None:
     redis_client.json().set(f"transaction:{tx_id}", "embedding", embedding)
 
 
-def search_by_vector(redis_client, query_vector: List, limit: int = 10) -> List[Dict]:
-    """Search transactions by vector similarity."""
+def search_by_vector(
+    redis_client,
+    query_vector: List,
+    limit: int = 10,
+    filter_expression: Optional[FilterExpression] = None,
+) -> List[Dict]:
+    """
+    Search transactions by vector similarity.
+
+    The filter and the distance threshold are applied inside Redis, in the
+    same FT.SEARCH as the KNN range query.
+    """
     global index
     if index is None:
         index = SearchIndex.from_dict(schema, redis_client=redis_client)
 
-    vec_query = VectorQuery(
+    vec_query = RangeQuery(
         vector=query_vector,
         vector_field_name="embedding",
         num_results=limit,
         return_fields=["$.merchant", "$.category", "$.location", "$.amount", "$.timestamp", "$.transactionId"],
+        distance_threshold=MAX_DISTANCE,
+        filter_expression=filter_expression,
     )
     results = index.query(vec_query)
 
@@ -91,8 +147,6 @@ def search_by_vector(redis_client, query_vector: List, limit: int = 10) -> List[
     transactions = []
     for doc in results:
         distance = float(doc.get('vector_distance', 1))
-        if (1 - distance) < 0.50:  # Skip low similarity
-            continue
         transactions.append({
             "transactionId": doc.get('$.transactionId'),
             "merchant": doc.get('$.merchant'),
@@ -103,3 +157,81 @@ def search_by_vector(redis_client, query_vector: List, limit: int = 10) -> List[
             "score": distance,
         })
     return transactions
+
+
+def search_by_tag(
+    redis_client,
+    field: str,
+    value: str,
+    limit: int = 10,
+    filter_expression: Optional[FilterExpression] = None,
+) -> List[Dict]:
+    """Exact-match lookup on a TAG field, newest first. No embedding needed."""
+    global index
+    if index is None:
+        index = SearchIndex.from_dict(schema, redis_client=redis_client)
+
+    expression = Tag(field) == value
+    if filter_expression is not None:
+        expression = expression & filter_expression
+
+    query = FilterQuery(
+        filter_expression=expression,
+        num_results=limit,
+        return_fields=["$.merchant", "$.category", "$.location", "$.amount", "$.timestamp", "$.transactionId"],
+    )
+    query.sort_by("timestamp", asc=False)
+    results = index.query(query)
+
+    return [
+        {
+            "transactionId": doc.get('$.transactionId'),
+            "merchant": doc.get('$.merchant'),
+            "category": doc.get('$.category'),
+            "location": doc.get('$.location'),
+            "amount": doc.get('$.amount'),
+            "timestamp": doc.get('$.timestamp'),
+            "score": 0.0,  # Exact match
+        }
+        for doc in results
+    ]
+
+
+def build_filter(
+    category: Optional[str] = None,
+    merchant: Optional[str] = None,
+    location: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> Optional[FilterExpression]:
+    """
+    Combine the given pre-filters into one filter expression.
+    Returns None when no filter is set.
+    """
+    conditions = []
+    for field, value in (
+        ("category", category),
+        ("merchant", merchant),
+        ("location", location),
+        ("customerId", customer_id),
+    ):
+        if value:
+            conditions.append(Tag(field) == value)
+    if min_amount is not None:
+        conditions.append(Num("amount") >= min_amount)
+    if max_amount is not None:
+        conditions.append(Num("amount") <= max_amount)
+    if start is not None:
+        conditions.append(Num("timestamp") >= start)
+    if end is not None:
+        conditions.append(Num("timestamp") <= end)
+
+    if not conditions:
+        return None
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return expression
@@ -4,16 +4,44 @@ API Dependencies
 Provides Redis client and module access.
 """
 
-from lib.redis_client import get_redis
+from fastapi import Depends
+
+from lib.redis_client import get_cached_redis, get_redis
 from processor.modules import (
     ordered_transactions,
     store_transaction,
     spending_categories,
     spending_over_time,
     vector_search,
+    customer_activity,
+    transaction_query,
+    spending_windows,
+    transaction_sketches,
+    amount_percentiles,
 )
 
 
 def get_redis_client():
     """Get Redis client instance."""
     return get_redis()
+
+
+def get_read_redis_client():
+    """Redis client for reads: a healthy replica when configured, else the primary."""
+    return get_redis(readonly=True)
+
+
+def get_cached_redis_client():
+    """Redis client with client-side caching, for read-mostly keys."""
+    return get_cached_redis()
+
+
+def get_cached_read_redis_client(redis=Depends(get_read_redis_client)):
+    """
+    Cached client consistent with this request's read client.
+
+    The cache follows the primary; when reads go to a (possibly lagging)
+    replica, that replica is returned instead, so values read from both
+    never mix the two views.
+    """
+    return get_cached_redis() if redis is get_redis() else redis
@@ -0,0 +1,156 @@
+"""
+Query Embedder
+
+Runs search-query embedding on a dedicated, bounded executor instead of
+FastAPI's shared thread pool, so a burst of searches can't starve the
+other endpoints of threads.
+
+Queries wait in a bounded queue. Each worker thread takes the first
+waiting query, collects whatever else arrives within a few milliseconds
+(up to a maximum batch size) and embeds them in one forward pass;
+identical queries in a batch are embedded once. When the queue is full,
+submit() fails immediately so the API can answer 503 instead of queueing
+without bound.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+from lib import metrics
+from lib.logger import setup_logger
+
+# Configuration from environment
+WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+QUEUE_SIZE = int(os.getenv("EMBED_QUEUE_SIZE", "64"))
+MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+TIMEOUT_S = float(os.getenv("EMBED_TIMEOUT_S", "10"))
+
+logger = setup_logger("embedder")
+
+EMBED_QUEUE_DEPTH = metrics.REGISTRY.register(metrics.Gauge(
+    "embed_queue_depth",
+    "Queries waiting for the embedding executor",
+))
+EMBED_BATCH_SIZE = metrics.REGISTRY.register(metrics.Histogram(
+    "embed_batch_size",
+    "Queries embedded per forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+))
+EMBED_REJECTED = metrics.REGISTRY.register(metrics.Counter(
+    "embed_rejected_total",
+    "Queries refused because the embedding queue was full",
+))
+
+
+class EmbedderBusy(Exception):
+    """Raised when the embedding queue is full."""
+
+
+class EmbeddingExecutor:
+    """
+    Bounded, batching executor around a `List[str] -> List[vector]` function.
+
+    Example:
+        >>> embedder = EmbeddingExecutor(vector_search.embed_queries)
+        >>> vector = await asyncio.wrap_future(embedder.submit("coffee"))
+    """
+
+    def __init__(
+        self,
+        embed_many: Callable[[List[str]], List[List[float]]],
+        workers: int = WORKERS,
+        queue_size: int = QUEUE_SIZE,
+        max_batch: int = MAX_BATCH,
+        batch_window_ms: float = BATCH_WINDOW_MS,
+    ):
+        self._embed_many = embed_many
+        self.workers = workers
+        self.max_batch = max_batch
+        self.batch_window = batch_window_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a query for embedding.
+
+        Raises:
+            EmbedderBusy: If the queue is full
+        """
+        self._ensure_started()
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((text, future))
+        except queue.Full:
+            EMBED_REJECTED.inc()
+            raise EmbedderBusy(f"Embedding queue is full ({self._queue.maxsize} waiting)")
+        EMBED_QUEUE_DEPTH.set(self._queue.qsize())
+        return future
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "queue_size": self._queue.maxsize,
+            "max_batch": self.max_batch,
+            "batch_window_ms": self.batch_window * 1000,
+            "rejected": int(EMBED_REJECTED.value()),
+        }
+
+    def _ensure_started(self) -> None:
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"embedder-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _next_batch(self) -> List[tuple]:
+        """Block for one query, then gather more for up to batch_window."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        EMBED_QUEUE_DEPTH.set(self._queue.qsize())
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            # Drop queries whose caller already gave up
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            EMBED_BATCH_SIZE.observe(len(texts))
+            try:
+                vectors = dict(zip(texts, self._embed_many(texts)))
+            except Exception as e:
+                logger.warning(f"Embedding batch of {len(texts)} failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for text, future in batch:
+                future.set_result(vectors[text])
+
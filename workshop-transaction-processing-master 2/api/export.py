@@ -0,0 +1,233 @@
+"""
+Transaction Export
+
+Streams transactions out of Redis as NDJSON or CSV with bounded memory.
+
+Transactions are walked newest first through the time-ordered index
+(falling back to SCAN over "transaction:*" when it doesn't exist) and
+hydrated a chunk at a time with JSON.MGET, so only one chunk is ever held
+in memory no matter how many rows are exported.
+
+Usage:
+    python -m api.export --format csv --gzip --output transactions.csv.gz
+    python -m api.export --category dining --start 1700000000000 > dining.ndjson
+"""
+
+import argparse
+import csv
+import io
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import orjson
+
+# Allow running as a script from the api/ directory
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from processor.modules import ordered_transactions, store_transaction
+
+FORMATS = ("ndjson", "csv")
+DEFAULT_CHUNK_SIZE = 500
+
+
+class ExportStats:
+    """Rows written and elapsed time of one export."""
+
+    def __init__(self):
+        self.rows = 0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return f"Exported {self.rows:,} rows in {self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/sec)"
+
+
+def _id_chunks_by_time(redis, chunk_size: int, start: Optional[int], end: Optional[int]) -> Iterator[List[str]]:
+    """Transaction IDs newest first, seeking through the time index."""
+    before, before_id = end, None
+    while True:
+        page = ordered_transactions.get_transaction_page(
+            redis, chunk_size, before=before, before_id=before_id, after=start
+        )
+        if not page:
+            return
+        yield [tx_id for tx_id, _ in page]
+        if len(page) < chunk_size:
+            return
+        before_id, before = page[-1]
+
+
+def _id_chunks_by_scan(redis, chunk_size: int) -> Iterator[List[str]]:
+    """Transaction IDs in keyspace order, via SCAN."""
+    ids: List[str] = []
+    for key in redis.scan_iter(match="transaction:*", count=chunk_size):
+        ids.append(key.split(":", 1)[1])
+        if len(ids) == chunk_size:
+            yield ids
+            ids = []
+    if ids:
+        yield ids
+
+
+def iter_transaction_chunks(
+    redis,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    category: Optional[str] = None,
+    include_embedding: bool = False,
+) -> Iterator[List[Dict]]:
+    """
+    Yield lists of transaction documents, at most `chunk_size` at a time.
+
+    Filters:
+    - start, end: timestamp range (milliseconds, inclusive)
+    - category: exact category
+    """
+    fields = store_transaction.TRANSACTION_FIELDS + (["embedding"] if include_embedding else [])
+
+    if redis.exists(ordered_transactions.TIME_INDEX_KEY):
+        id_chunks = _id_chunks_by_time(redis, chunk_size, start, end)
+        time_filtered = True
+    else:
+        id_chunks = _id_chunks_by_scan(redis, chunk_size)
+        time_filtered = False
+
+    for ids in id_chunks:
+        rows = []
+        for tx in store_transaction.get_transactions_batch(redis, ids, fields, chunk_size=chunk_size):
+            if tx is None:
+                continue
+            if category and tx.get("category") != category:
+                continue
+            if not time_filtered:
+                timestamp = tx.get("timestamp", 0)
+                if (start is not None and timestamp < start) or (end is not None and timestamp > end):
+                    continue
+            rows.append(tx)
+        if rows:
+            yield rows
+
+
+def encode_ndjson(chunks: Iterator[List[Dict]], stats: ExportStats) -> Iterator[bytes]:
+    """One JSON document per line."""
+    for rows in chunks:
+        stats.rows += len(rows)
+        yield b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+
+def encode_csv(chunks: Iterator[List[Dict]], stats: ExportStats, include_embedding: bool = False) -> Iterator[bytes]:
+    """CSV with a header row; the embedding (if any) is a JSON array cell."""
+    fields = store_transaction.TRANSACTION_FIELDS + (["embedding"] if include_embedding else [])
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+
+    for rows in chunks:
+        stats.rows += len(rows)
+        for row in rows:
+            if include_embedding and "embedding" in row:
+                row["embedding"] = orjson.dumps(row["embedding"]).decode()
+            writer.writerow(row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_stream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Compress a byte stream into a single gzip member, chunk by chunk."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(
+    redis,
+    fmt: str = "ndjson",
+    gzip: bool = False,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    category: Optional[str] = None,
+    include_embedding: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    stats: Optional[ExportStats] = None,
+) -> Iterator[bytes]:
+    """
+    Encoded export as an iterator of byte chunks.
+
+    `stats` is filled in as rows are encoded and finished once the stream
+    is exhausted.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    stats = stats or ExportStats()
+
+    chunks = iter_transaction_chunks(redis, chunk_size, start, end, category, include_embedding)
+    if fmt == "csv":
+        body = encode_csv(chunks, stats, include_embedding)
+    else:
+        body = encode_ndjson(chunks, stats)
+    if gzip:
+        body = gzip_stream(body)
+
+    yield from body
+    stats.finished = time.perf_counter()
+
+
+def main() -> int:
+    """Command-line export."""
+    from lib.redis_client import get_redis
+
+    parser = argparse.ArgumentParser(description="Export transactions from Redis")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+    parser.add_argument("--start", type=int, help="Start timestamp (milliseconds)")
+    parser.add_argument("--end", type=int, help="End timestamp (milliseconds)")
+    parser.add_argument("--category", help="Only this category")
+    parser.add_argument("--include-embedding", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    stats = ExportStats()
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in export_stream(
+            get_redis(readonly=True),
+            fmt=args.format,
+            gzip=args.gzip,
+            start=args.start,
+            end=args.end,
+            category=args.category,
+            include_embedding=args.include_embedding,
+            chunk_size=args.chunk_size,
+            stats=stats,
+        ):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+    print(stats.summary(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Search Lexicon
+
+Known merchants, categories and cities from the transaction generator,
+so exact queries like "Starbucks" or "Dallas" can skip the embedding model.
+"""
+
+import re
+from typing import Dict, Optional, Tuple
+
+from generator.transaction_models import LOCATIONS, MERCHANTS, TransactionCategory
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace (the embedding model is uncased)."""
+    return " ".join(query.lower().split())
+
+
+def lexical_key(query: str) -> str:
+    """Normalized form used for exact matching, ignoring punctuation."""
+    key = re.sub(r"['’]", "", query.lower())
+    return " ".join(re.sub(r"[^\w]+", " ", key).split())
+
+
+def _build_lexicon() -> Dict[str, Tuple[str, str]]:
+    """Map lexical keys to (index field, tag value). Categories win ties."""
+    lexicon: Dict[str, Tuple[str, str]] = {}
+
+    for location in LOCATIONS:
+        city = location.split(",")[0]
+        lexicon[lexical_key(location)] = ("location", location)
+        lexicon[lexical_key(city)] = ("location", location)
+
+    for merchants in MERCHANTS.values():
+        for merchant in merchants:
+            lexicon[lexical_key(merchant)] = ("merchant", merchant)
+
+    for category in TransactionCategory:
+        lexicon[lexical_key(category.value)] = ("category", category.value)
+
+    return lexicon
+
+
+LEXICON = _build_lexicon()
+
+
+def match(query: str) -> Optional[Tuple[str, str]]:
+    """
+    Look up a query in the lexicon.
+
+    Returns:
+        (field, value) for an exact merchant/category/city match, else None
+
+    Example:
+        >>> match("dallas")
+        ('location', 'Dallas, TX')
+    """
+    return LEXICON.get(lexical_key(query))
@@ -13,7 +13,9 @@ from pathlib import Path
 # Add parent to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from api.routers import transactions, categories, timeseries, status, stream, search
+from api.middleware import MetricsMiddleware
+from api.routers import transactions, categories, timeseries, status, stream, search, customers, metrics, sketches, percentiles, admin, pipeline
+from lib.profiling import install_signal_handlers
 
 app = FastAPI(title="Banking Workshop API", default_response_class=ORJSONResponse)
 
@@ -24,8 +26,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Request latency histograms + Server-Timing header
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(status.router)
 app.include_router(transactions.router)
@@ -33,6 +39,15 @@ app.include_router(categories.router)
 app.include_router(timeseries.router)
 app.include_router(stream.router)
 app.include_router(search.router)
+app.include_router(customers.router)
+app.include_router(sketches.router)
+app.include_router(percentiles.router)
+app.include_router(pipeline.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
+
+# kill -USR1 <pid> profiles the worker, kill -USR2 takes a memory snapshot
+install_signal_handlers(admin.profiler, admin.memory)
 
 
 @app.get("/health")
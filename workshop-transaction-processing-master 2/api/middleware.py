@@ -0,0 +1,54 @@
+"""
+API Middleware
+
+Per-request latency instrumentation (lib.metrics):
+- Server-Timing header with each phase (redis, embed, ...) and the total
+- Latency histograms per route and per phase, served at /metrics
+
+Written as plain ASGI rather than BaseHTTPMiddleware so streaming
+responses (SSE, export) pass through untouched.
+"""
+
+import time
+
+from lib import metrics
+
+
+def _route_label(scope) -> str:
+    """Route template ("/api/transactions/{transaction_id}"), never the raw path."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and adds a Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        phases = metrics.start_request()
+        status = [500]
+        t0 = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                # Phases finished by now: the whole handler for normal responses
+                header = metrics.server_timing(phases, time.perf_counter() - t0)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+            route = _route_label(scope)
+            metrics.REQUEST_LATENCY.observe(time.perf_counter() - t0, scope["method"], route, str(status[0]))
+            for name, seconds in phases.items():
+                metrics.REQUEST_PHASE_LATENCY.observe(seconds, route, name)
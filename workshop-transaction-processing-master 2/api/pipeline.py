@@ -0,0 +1,269 @@
+"""
+Pipeline Monitoring
+
+How far behind the processor is, read from Redis:
+
+- Consumer lag: stream length and head, and for each consumer group its
+  lag (entries not yet delivered) and pending entries (delivered, not
+  acknowledged) from XINFO GROUPS, with each consumer's oldest pending
+  entry from XPENDING
+- Freshness: the newest transaction in spending:timeseries,
+  transactions:ordered and the vector index (documents with an
+  embedding), compared with the stream head. Structures hold transaction
+  time, so the lag is the transaction time between the head and the
+  newest transaction they have
+
+pipeline_status() also sets the pipeline_* gauges, which /metrics
+refreshes on every scrape; pipeline_down() clears them when Redis can't
+be read, leaving pipeline_up at 0.
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+from redis.commands.search.query import Query
+from redis.exceptions import RedisError
+from redisvl.redis.utils import array_to_buffer
+
+from lib import metrics
+from processor.modules import ordered_transactions, spending_over_time, vector_search
+
+STREAM_KEY = "stream:transactions"
+ORDERED_KEY = "transactions:ordered"
+VECTOR_INDEX = vector_search.schema["index"]["name"]
+
+# Cosine distances lie in [0, 2]: a range query this wide matches every
+# document that has an embedding, and only those
+ANY_DISTANCE = 2.1
+
+# Query vector of that range query: at that distance any vector will do,
+# so a unit vector of the model's size, no embedding needed
+PROBE_VECTOR = array_to_buffer([1.0] + [0.0] * (vector_search.vectorizer.dims - 1), "float32")
+
+PIPELINE_UP = metrics.REGISTRY.register(metrics.Gauge(
+    "pipeline_up",
+    "1 if the last scrape read the pipeline state from Redis, 0 if it failed",
+))
+STREAM_LENGTH = metrics.REGISTRY.register(metrics.Gauge(
+    "pipeline_stream_length",
+    "Entries in the transaction stream",
+))
+STREAM_HEAD_AGE = metrics.REGISTRY.register(metrics.Gauge(
+    "pipeline_stream_head_age_seconds",
+    "Time since the newest stream entry was added",
+))
+GROUP_LAG = metrics.REGISTRY.register(metrics.Gauge(
+    "pipeline_group_lag",
+    "Stream entries not yet delivered to each consumer group",
+    ("group",),
+))
+GROUP_PENDING = metrics.REGISTRY.register(metrics.Gauge(
+    "pipeline_group_pending",
+    "Entries delivered to each consumer group but not acknowledged",
+    ("group",),
+))
+CONSUMER_PENDING = metrics.REGISTRY.register(metrics.Gauge(
+    "pipeline_consumer_pending",
+    "Entries delivered to each consumer but not acknowledged",
+    ("group", "consumer"),
+))
+CONSUMER_OLDEST_PENDING_AGE = metrics.REGISTRY.register(metrics.Gauge(
+    "pipeline_consumer_oldest_pending_age_seconds",
+    "Time since each consumer's oldest unacknowledged entry was added to the stream",
+    ("group", "consumer"),
+))
+FRESHNESS_LAG = metrics.REGISTRY.register(metrics.Gauge(
+    "pipeline_freshness_lag_seconds",
+    "Transaction time between the stream head and the newest transaction in each structure",
+    ("structure",),
+))
+
+# Cleared on every update: label sets follow the groups and consumers
+# that exist, and nothing stale is left when Redis can't be read
+_GAUGES = (
+    STREAM_LENGTH, STREAM_HEAD_AGE, GROUP_LAG, GROUP_PENDING,
+    CONSUMER_PENDING, CONSUMER_OLDEST_PENDING_AGE, FRESHNESS_LAG,
+)
+
+
+def _id_ms(stream_id: str) -> int:
+    """Milliseconds part of a stream ID: when the entry was added."""
+    return int(str(stream_id).split("-", 1)[0])
+
+
+def _error(result: Any) -> Optional[str]:
+    return str(result) if isinstance(result, Exception) else None
+
+
+def _freshness(newest: Optional[int], head: Optional[int], **extra) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {"newest_timestamp": newest, "lag_ms": None, "current": None}
+    if newest is not None and head is not None:
+        entry["lag_ms"] = max(0, head - newest)
+        entry["current"] = newest >= head
+    entry.update(extra)
+    return entry
+
+
+def _vector_freshness(redis, head_timestamp: Optional[int]) -> Dict[str, Any]:
+    """
+    Newest document with an embedding, by its sortable timestamp.
+
+    The index covers every transaction document, embedded or not, so only
+    documents matching an all-inclusive vector range query are counted.
+    """
+    query = (
+        Query("@embedding:[VECTOR_RANGE $radius $vector]")
+        .sort_by("timestamp", asc=False)
+        .paging(0, 1)
+        .return_fields("timestamp")
+        .dialect(2)
+    )
+    try:
+        result = redis.ft(VECTOR_INDEX).search(query, {"radius": ANY_DISTANCE, "vector": PROBE_VECTOR})
+    except Exception as e:
+        return {"error": str(e).splitlines()[0] if str(e) else type(e).__name__}
+    newest = int(float(result.docs[0].timestamp)) if result.docs else None
+    return _freshness(newest, head_timestamp, documents=result.total)
+
+
+def pipeline_status(redis) -> Dict[str, Any]:
+    """
+    Stream, consumer group and freshness report; also sets the gauges.
+
+    The stream and structure reads, the consumers of every group and
+    their oldest pending entries are each one pipelined round trip.
+
+    Raises:
+        RuntimeError: the stream can't be read
+    """
+    now_ms = time.time() * 1000
+
+    pipe = redis.pipeline(transaction=False)
+    pipe.xlen(STREAM_KEY)
+    pipe.xrevrange(STREAM_KEY, count=1)
+    pipe.xinfo_groups(STREAM_KEY)
+    pipe.ts().get(spending_over_time.TIMESERIES_KEY)
+    pipe.lindex(ORDERED_KEY, 0)
+    length, head_entries, groups_info, ts_newest, ordered_newest = pipe.execute(raise_on_error=False)
+
+    if _error(length):
+        raise RuntimeError(f"Stream {STREAM_KEY} unavailable: {length}")
+
+    # Stream head: added at its ID's time, transaction time in its fields
+    head: Optional[Dict[str, Any]] = None
+    head_timestamp = None
+    if head_entries and not _error(head_entries):
+        head_id, fields = head_entries[0]
+        if fields.get("timestamp"):
+            head_timestamp = int(fields["timestamp"])
+        head = {
+            "id": head_id,
+            "transactionId": fields.get("transactionId"),
+            "timestamp": head_timestamp,
+            "age_ms": round(now_ms - _id_ms(head_id)),
+        }
+
+    groups: List[Dict[str, Any]] = []
+    if not _error(groups_info):
+        pipe = redis.pipeline(transaction=False)
+        for info in groups_info:
+            pipe.xinfo_consumers(STREAM_KEY, info["name"])
+        consumers_info = pipe.execute(raise_on_error=False)
+
+        pipe = redis.pipeline(transaction=False)
+        oldest_for = []
+        for info, consumers in zip(groups_info, consumers_info):
+            for consumer in [] if _error(consumers) else consumers:
+                if consumer["pending"]:
+                    pipe.xpending_range(STREAM_KEY, info["name"], "-", "+", 1, consumername=consumer["name"])
+                    oldest_for.append((info["name"], consumer["name"]))
+        oldest = dict(zip(oldest_for, pipe.execute(raise_on_error=False) if oldest_for else []))
+
+        for info, consumers in zip(groups_info, consumers_info):
+            group = {
+                "name": info["name"],
+                "lag": info.get("lag"),
+                "pending": info["pending"],
+                "last_delivered_id": info["last-delivered-id"],
+                "entries_read": info.get("entries-read"),
+                "consumers": [],
+            }
+            if _error(consumers):
+                group["error"] = _error(consumers)
+                consumers = []
+            for consumer in consumers:
+                entry: Dict[str, Any] = {
+                    "name": consumer["name"],
+                    "pending": consumer["pending"],
+                    "idle_ms": consumer["idle"],
+                    "oldest_pending": None,
+                }
+                pending = oldest.get((info["name"], consumer["name"]))
+                if pending and not _error(pending):
+                    entry["oldest_pending"] = {
+                        "id": pending[0]["message_id"],
+                        "age_ms": round(now_ms - _id_ms(pending[0]["message_id"])),
+                        "idle_ms": pending[0]["time_since_delivered"],
+                        "deliveries": pending[0]["times_delivered"],
+                    }
+                group["consumers"].append(entry)
+            groups.append(group)
+
+    # Freshness of each derived structure against the stream head
+    ordered: Dict[str, Any]
+    if _error(ordered_newest):
+        ordered = {"error": _error(ordered_newest)}
+    else:
+        score = redis.zscore(ordered_transactions.TIME_INDEX_KEY, ordered_newest) if ordered_newest else None
+        ordered = _freshness(
+            int(score) if score is not None else None,
+            head_timestamp,
+            transactionId=ordered_newest,
+        )
+        if head and ordered_newest:
+            # The list holds IDs: it's current if its newest is the head
+            ordered["current"] = ordered_newest == head["transactionId"]
+    freshness = {
+        spending_over_time.TIMESERIES_KEY: (
+            {"error": _error(ts_newest)} if _error(ts_newest)
+            else _freshness(int(ts_newest[0]) if ts_newest else None, head_timestamp)
+        ),
+        ORDERED_KEY: ordered,
+        VECTOR_INDEX: _vector_freshness(redis, head_timestamp),
+    }
+
+    _set_gauges(length, head, groups, freshness)
+    return {
+        "stream": {"key": STREAM_KEY, "length": length, "head": head},
+        "groups": groups,
+        "freshness": freshness,
+    }
+
+
+def pipeline_down() -> None:
+    """Drop the pipeline gauges and set pipeline_up to 0: Redis can't be read."""
+    for gauge in _GAUGES:
+        gauge.clear()
+    PIPELINE_UP.set(0)
+
+
+def _set_gauges(length: int, head: Optional[Dict], groups: List[Dict], freshness: Dict[str, Dict]) -> None:
+    for gauge in _GAUGES:
+        gauge.clear()
+    PIPELINE_UP.set(1)
+    STREAM_LENGTH.set(length)
+    if head is not None:
+        STREAM_HEAD_AGE.set(head["age_ms"] / 1000)
+    for group in groups:
+        if group["lag"] is not None:
+            GROUP_LAG.set(group["lag"], group["name"])
+        GROUP_PENDING.set(group["pending"], group["name"])
+        for consumer in group["consumers"]:
+            CONSUMER_PENDING.set(consumer["pending"], group["name"], consumer["name"])
+            oldest = consumer["oldest_pending"]
+            CONSUMER_OLDEST_PENDING_AGE.set(
+                oldest["age_ms"] / 1000 if oldest else 0, group["name"], consumer["name"]
+            )
+    for structure, entry in freshness.items():
+        if entry.get("lag_ms") is not None:
+            FRESHNESS_LAG.set(entry["lag_ms"] / 1000, structure)
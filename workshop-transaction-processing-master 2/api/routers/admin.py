@@ -0,0 +1,97 @@
+"""
+Admin Router
+
+On-demand profiling of the running API process (lib.profiling): CPU
+profiles and tracemalloc snapshots, returned in the response and written
+under PROFILE_DIR.
+
+Disabled unless ADMIN_TOKEN is set: every request must send it in
+X-Admin-Token, and without one configured every request gets a 403.
+"""
+
+import asyncio
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+
+from lib.profiling import MAX_SECONDS, MODES, MemoryTracker, Profiler, ProfilerBusy
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+profiler = Profiler("api")
+memory = MemoryTracker("api")
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Check X-Admin-Token against ADMIN_TOKEN; refuse everything without one."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: ADMIN_TOKEN is not set")
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token")
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/profile")
+def get_profile_status():
+    """The running profiling session, if any, and the last report."""
+    return profiler.status()
+
+
+@router.post("/profile")
+async def run_profile(
+    seconds: float = Query(10, gt=0, le=MAX_SECONDS),
+    mode: str = "sample",
+):
+    """
+    Profile the process for `seconds` and return the report.
+
+    - sample: statistical sampling of every thread (event loop and
+      thread-pool workers included); also writes collapsed stacks for
+      flamegraph.pl / speedscope
+    - cprofile: deterministic, but only inside profiled() regions, which
+      the API has none of - use it on the consumer (SIGUSR1)
+    """
+    if mode not in MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(MODES)}")
+    try:
+        session = profiler.start(seconds, mode)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    # Shielded: a client that goes away doesn't cancel the session, whose
+    # report is still written and kept as the last report
+    return await asyncio.shield(asyncio.wrap_future(session.future))
+
+
+@router.delete("/profile")
+def stop_profile():
+    """End the running session early; its report is still written."""
+    return {"stopped": profiler.stop()}
+
+
+@router.get("/memory")
+def get_memory_status():
+    """Whether tracemalloc is tracing, and the memory it has traced."""
+    return memory.status()
+
+
+@router.post("/memory/snapshot")
+async def take_memory_snapshot(top: int = Query(25, ge=1, le=200)):
+    """
+    Top allocations by line, and the growth since the previous snapshot.
+
+    The first snapshot starts tracing (allocations made before it are not
+    seen); take another later to see what grew. DELETE /memory when done,
+    since tracing slows allocations down.
+    """
+    return await run_in_threadpool(memory.snapshot, top)
+
+
+@router.delete("/memory")
+def stop_memory_tracing():
+    """Stop tracemalloc and drop the previous snapshot."""
+    return {"stopped": memory.stop()}
@@ -5,50 +5,96 @@ Endpoints for spending category data (Sorted Sets module).
 """
 
 import time
-from fastapi import APIRouter, Depends
-from api.dependencies import get_redis_client
-from processor.modules import spending_categories
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from api.dependencies import get_cached_redis_client, get_redis_client
+from processor.modules import spending_categories, spending_windows
 
 router = APIRouter(prefix="/api/categories", tags=["categories"])
 
 
+def check_window(window: Optional[str]) -> None:
+    if window and window not in spending_windows.WINDOWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"window must be one of {', '.join(spending_windows.WINDOWS)}"
+        )
+
+
 @router.get("/top")
-def get_top_categories(limit: int = 10, redis=Depends(get_redis_client)):
+def get_top_categories(
+    limit: int = 10,
+    window: Optional[str] = None,
+    redis=Depends(get_redis_client),
+    cached_redis=Depends(get_cached_redis_client),
+):
     """
     Get top spending categories.
 
-    Uses spending_categories module (Sorted Set).
+    Uses spending_categories module (Sorted Set, read through the
+    client-side cache), or spending_windows (hourly Sorted Sets merged
+    with ZUNIONSTORE) when a window is given. Windows stay on the primary:
+    the merge writes a cache key, which a read-only replica would refuse.
+
+    Query params:
+    - window: 1h, 6h, 24h or 7d up to the latest transaction (default: all time)
     """
+    check_window(window)
     try:
         t0 = time.perf_counter()
-        categories = spending_categories.get_top_categories(redis, limit)
+        window_info = {}
+        if window:
+            categories, window_info = spending_windows.get_top_categories(redis, window, limit)
+        else:
+            categories = spending_categories.get_top_categories(cached_redis, limit)
         redis_ms = round((time.perf_counter() - t0) * 1000, 2)
 
         result = [
             {"category": cat, "total_spent": float(amount)}
             for cat, amount in categories
         ]
-        return {"categories": result, "count": len(result), "redis_ms": redis_ms}
+        return {"categories": result, "count": len(result), **window_info, "redis_ms": redis_ms}
     except Exception as e:
         return {"categories": [], "count": 0, "error": str(e)}
 
 
 @router.get("/{category}/top")
-def get_top_in_category(category: str, limit: int = 10, redis=Depends(get_redis_client)):
+def get_top_in_category(
+    category: str,
+    limit: int = 10,
+    window: Optional[str] = None,
+    redis=Depends(get_redis_client),
+    cached_redis=Depends(get_cached_redis_client),
+):
     """
     Get top merchants in a specific category.
 
-    Uses spending_categories module (Sorted Set).
+    Uses spending_categories module (Sorted Set, read through the
+    client-side cache), or spending_windows when a window is given.
+
+    Query params:
+    - window: 1h, 6h, 24h or 7d up to the latest transaction (default: all time)
     """
+    check_window(window)
     try:
         t0 = time.perf_counter()
-        merchants = spending_categories.get_top_merchants_in_category(redis, category, limit)
+        window_info = {}
+        if window:
+            merchants, window_info = spending_windows.get_top_merchants_in_category(redis, category, window, limit)
+        else:
+            merchants = spending_categories.get_top_merchants_in_category(cached_redis, category, limit)
         redis_ms = round((time.perf_counter() - t0) * 1000, 2)
 
         result = [
             {"merchant": merchant, "amount": float(amount)}
             for merchant, amount in merchants
         ]
-        return {"merchants": result, "count": len(result), "category": category, "redis_ms": redis_ms}
+        return {
+            "merchants": result,
+            "count": len(result),
+            "category": category,
+            **window_info,
+            "redis_ms": redis_ms,
+        }
     except Exception as e:
         return {"merchants": [], "count": 0, "category": category, "error": str(e)}
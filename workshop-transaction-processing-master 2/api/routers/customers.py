@@ -0,0 +1,114 @@
+"""
+Customers Router
+
+Endpoints for per-customer activity (customer_activity module).
+"""
+
+import time
+from fastapi import APIRouter, Depends, HTTPException
+from api.dependencies import get_read_redis_client
+from processor.modules import customer_activity, store_transaction
+
+router = APIRouter(prefix="/api/customers", tags=["customers"])
+
+
+@router.get("/{customer_id}/recent")
+def get_customer_recent(customer_id: str, limit: int = 20, redis=Depends(get_read_redis_client)):
+    """
+    Get a customer's recent transactions, newest first.
+
+    2 Redis calls:
+    1. LRANGE on the customer's capped list
+    2. JSON.MGET to fetch the documents
+    """
+    try:
+        t0 = time.perf_counter()
+        tx_ids = customer_activity.get_recent_transactions(redis, customer_id, limit)
+        transactions = [
+            tx for tx in store_transaction.get_transactions_batch(
+                redis, tx_ids, store_transaction.TRANSACTION_FIELDS
+            )
+            if tx
+        ]
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+        return {
+            "customer_id": customer_id,
+            "transactions": transactions,
+            "count": len(transactions),
+            "redis_ms": redis_ms,
+        }
+    except Exception as e:
+        return {"customer_id": customer_id, "transactions": [], "count": 0, "error": str(e)}
+
+
+@router.get("/{customer_id}/categories")
+def get_customer_categories(customer_id: str, limit: int = 10, redis=Depends(get_read_redis_client)):
+    """
+    Get what a customer has spent per category.
+
+    Uses customer_activity module (Sorted Set).
+    """
+    try:
+        t0 = time.perf_counter()
+        categories = customer_activity.get_category_spending(redis, customer_id, limit)
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+        result = [
+            {"category": cat, "total_spent": float(amount)}
+            for cat, amount in categories
+        ]
+        return {"customer_id": customer_id, "categories": result, "count": len(result), "redis_ms": redis_ms}
+    except Exception as e:
+        return {"customer_id": customer_id, "categories": [], "count": 0, "error": str(e)}
+
+
+@router.get("/{customer_id}/spending")
+def get_customer_spending(
+    customer_id: str,
+    start: int = None,
+    end: int = None,
+    days: int = None,
+    bucket_ms: int = None,
+    redis=Depends(get_read_redis_client),
+):
+    """
+    Get a customer's spending over a time range.
+
+    Uses customer_activity module (TimeSeries).
+
+    Query params:
+    - start, end: Timestamp range (milliseconds)
+    - days: Last N days up to the customer's latest transaction
+    - bucket_ms: Sum samples per bucket server-side
+    """
+    if days:
+        end_ts = customer_activity.get_latest_timestamp(redis, customer_id)
+        if end_ts == 0:
+            return {"customer_id": customer_id, "data": [], "count": 0, "total_spent": 0, "redis_ms": 0}
+        start_ts = end_ts - (days * 24 * 60 * 60 * 1000)
+    elif start and end:
+        start_ts, end_ts = start, end
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide either 'days' or both 'start' and 'end'"
+        )
+
+    try:
+        t0 = time.perf_counter()
+        data_points = customer_activity.get_spending_in_range(redis, customer_id, start_ts, end_ts, bucket_ms)
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+        result = [{"timestamp": int(ts), "amount": float(amount)} for ts, amount in data_points]
+        return {
+            "customer_id": customer_id,
+            "data": result,
+            "count": len(result),
+            "total_spent": sum(point["amount"] for point in result),
+            "start": start_ts,
+            "end": end_ts,
+            "redis_ms": redis_ms,
+        }
+    except Exception as e:
+        return {"customer_id": customer_id, "data": [], "count": 0, "total_spent": 0, "error": str(e)}
@@ -0,0 +1,33 @@
+"""
+Metrics Router
+
+Prometheus scrape endpoint for the API's request latency and Redis
+command metrics (lib.metrics).
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from api.pipeline import pipeline_down, pipeline_status
+from lib import metrics
+from lib.redis_client import get_redis
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Metrics in the Prometheus text format.
+
+    - http_request_duration_seconds{method,route,status}: request latency
+    - http_request_phase_duration_seconds{route,phase}: time per phase
+    - redis_commands_total{command}: commands sent, pipelined ones included
+    - pipeline_*: consumer lag and freshness, read from Redis on each scrape;
+      pipeline_up is 0 (and the others absent) when that fails
+    """
+    try:
+        # Connecting is inside the try: /metrics is served with Redis down
+        pipeline_status(get_redis())
+    except Exception:
+        pipeline_down()
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
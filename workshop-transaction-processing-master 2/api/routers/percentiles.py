@@ -0,0 +1,83 @@
+"""
+Percentiles Router
+
+Endpoints for transaction amount percentiles (amount_percentiles module).
+"""
+
+import time
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from api.dependencies import get_read_redis_client
+from generator.transaction_models import TransactionCategory
+from processor.modules import amount_percentiles
+
+router = APIRouter(prefix="/api/percentiles", tags=["percentiles"])
+
+
+def parse_quantiles(q: Optional[str]) -> List[float]:
+    """Comma-separated quantiles ("0.5,0.95,0.99") -> floats in [0, 1]."""
+    if not q:
+        return list(amount_percentiles.DEFAULT_QUANTILES)
+    try:
+        quantiles = [float(value) for value in q.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid quantiles: {q}")
+    if not quantiles or any(not 0 <= value <= 1 for value in quantiles):
+        raise HTTPException(status_code=400, detail="Quantiles must be between 0 and 1")
+    return quantiles
+
+
+@router.get("/categories")
+def get_category_percentiles(q: Optional[str] = None, redis=Depends(get_read_redis_client)):
+    """
+    Amount percentiles, trimmed mean, min and max for every category.
+
+    Query params:
+    - q: Comma-separated quantiles (default: 0.5,0.95,0.99)
+
+    1 round trip: all TDIGEST queries for all categories in one pipeline.
+    """
+    quantiles = parse_quantiles(q)
+    categories = [category.value for category in TransactionCategory]
+    try:
+        t0 = time.perf_counter()
+        stats = amount_percentiles.get_percentiles(
+            redis, [amount_percentiles.category_key(category) for category in categories], quantiles
+        )
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+        result = [
+            {"category": category, **stats[amount_percentiles.category_key(category)]}
+            for category in categories
+        ]
+        return {"categories": result, "count": len(result), "redis_ms": redis_ms}
+    except Exception as e:
+        return {"categories": [], "count": 0, "error": str(e)}
+
+
+@router.get("/categories/{category}")
+def get_single_category_percentiles(category: str, q: Optional[str] = None, redis=Depends(get_read_redis_client)):
+    """Amount percentiles for one category."""
+    quantiles = parse_quantiles(q)
+    key = amount_percentiles.category_key(category)
+    try:
+        t0 = time.perf_counter()
+        stats = amount_percentiles.get_percentiles(redis, [key], quantiles)[key]
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+        return {"category": category, **stats, "redis_ms": redis_ms}
+    except Exception as e:
+        return {"category": category, "error": str(e)}
+
+
+@router.get("/merchants/{merchant}")
+def get_merchant_percentiles(merchant: str, q: Optional[str] = None, redis=Depends(get_read_redis_client)):
+    """Amount percentiles for one merchant (when TDIGEST_PER_MERCHANT is on)."""
+    quantiles = parse_quantiles(q)
+    key = amount_percentiles.merchant_key(merchant)
+    try:
+        t0 = time.perf_counter()
+        stats = amount_percentiles.get_percentiles(redis, [key], quantiles)[key]
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+        return {"merchant": merchant, **stats, "redis_ms": redis_ms}
+    except Exception as e:
+        return {"merchant": merchant, "error": str(e)}
@@ -0,0 +1,33 @@
+"""
+Pipeline Router
+
+Consumer lag and end-to-end freshness of the processor (api.pipeline).
+"""
+
+import time
+from fastapi import APIRouter, Depends
+from api.dependencies import get_redis_client
+from api.pipeline import pipeline_status
+
+router = APIRouter(prefix="/api", tags=["pipeline"])
+
+
+@router.get("/pipeline")
+def get_pipeline(redis=Depends(get_redis_client)):
+    """
+    How far behind the processor is.
+
+    - stream: length and head (ID, transaction and age)
+    - groups: lag, pending and, per consumer, the oldest pending entry
+    - freshness: newest transaction in spending:timeseries,
+      transactions:ordered and the vector index vs. the stream head
+
+    Read from the primary: replicas may lag the stream themselves.
+    """
+    try:
+        t0 = time.perf_counter()
+        result = pipeline_status(redis)
+        result["redis_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        return result
+    except Exception as e:
+        return {"error": str(e)}
@@ -4,13 +4,31 @@ Search Router
 Endpoints for semantic transaction search (Vector Search module).
 """
 
+import asyncio
+import os
 import time
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
-from api.dependencies import get_redis_client
+from fastapi.concurrency import run_in_threadpool
+from redis.exceptions import ResponseError
+from api import lexicon
+from api.dependencies import get_read_redis_client, get_redis_client
+from api.embedder import TIMEOUT_S, EmbedderBusy, EmbeddingExecutor
+from lib import metrics
+from lib.cache import TTLCache
 from processor.modules import vector_search
 
 router = APIRouter(prefix="/api/search", tags=["search"])
 
+# Query embeddings keyed on the normalized query text
+embedding_cache = TTLCache(
+    maxsize=int(os.getenv("SEARCH_EMBED_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("SEARCH_EMBED_CACHE_TTL", "3600")),
+)
+
+# Dedicated, batching executor for the model - keeps it off the shared thread pool
+embedder = EmbeddingExecutor(vector_search.embed_queries)
+
 
 @router.post("/index")
 def create_search_index(redis=Depends(get_redis_client)):
@@ -27,8 +45,48 @@ def create_search_index(redis=Depends(get_redis_client)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/cache")
+def get_embedding_cache_stats():
+    """Query-embedding cache size and hit rate."""
+    return embedding_cache.stats()
+
+
+@router.get("/embedder")
+def get_embedder_stats():
+    """Embedding executor queue depth and limits."""
+    return embedder.stats()
+
+
+async def embed(text: str):
+    """
+    Embed a query on the embedding executor.
+
+    Raises:
+        HTTPException: 503 when the executor is saturated or too slow
+    """
+    try:
+        future = embedder.submit(text)
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=TIMEOUT_S)
+    except EmbedderBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Embedding timed out", headers={"Retry-After": "1"})
+
+
 @router.get("")
-def search_transactions(q: str, limit: int = 10, redis=Depends(get_redis_client)):
+async def search_transactions(
+    q: str,
+    limit: int = 10,
+    category: Optional[str] = None,
+    merchant: Optional[str] = None,
+    location: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    redis=Depends(get_read_redis_client),
+):
     """
     Search transactions using semantic similarity.
 
@@ -37,28 +95,89 @@ def search_transactions(q: str, limit: int = 10, redis=Depends(get_redis_client)
     - "online shopping"
     - "restaurants in Orlando"
     - "travel expenses"
+
+    Optional pre-filters, applied by Redis in the same FT.SEARCH:
+    - category, merchant, location, customer_id: exact match
+    - min_amount, max_amount: amount range
+    - start, end: timestamp range (milliseconds)
+
+    The response's "path" says how it was served:
+    - lexical: exact merchant/category/city, answered by a TAG query
+    - cache: embedding reused from an earlier identical query
+    - model: query embedded by the model
+
+    Embedding runs on a dedicated batching executor and Redis calls on the
+    thread pool, so the event loop never blocks. Returns 503 when the
+    embedding queue is full.
     """
     if not q or len(q.strip()) < 2:
         raise HTTPException(status_code=400, detail="Query must be at least 2 characters")
 
+    filter_expression = vector_search.build_filter(
+        category=category,
+        merchant=merchant,
+        location=location,
+        customer_id=customer_id,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        start=start,
+        end=end,
+    )
+
     try:
-        # Time embedding generation (Python/ML)
+        # Fast path: known merchant, category or city needs no embedding
+        match = lexicon.match(q)
+        if match:
+            field, value = match
+            try:
+                t0 = time.perf_counter()
+                results = await run_in_threadpool(
+                    vector_search.search_by_tag, redis, field, value, limit, filter_expression
+                )
+                search_ms = round((time.perf_counter() - t0) * 1000, 2)
+                return {
+                    "query": q,
+                    "results": results,
+                    "count": len(results),
+                    "path": "lexical",
+                    "match": {"field": field, "value": value},
+                    "embed_ms": 0,
+                    "search_ms": search_ms,
+                }
+            except ResponseError as e:
+                # Index predates the filter fields - use the vector path
+                if "no such index" in str(e).lower():
+                    raise
+
+        # Time embedding generation (Python/ML), skipped on a cache hit
         t0 = time.perf_counter()
-        query_vector = vector_search.embed_query(q.strip())
+        key = lexicon.normalize_query(q)
+        query_vector = embedding_cache.get(key)
+        path = "cache"
+        if query_vector is None:
+            with metrics.phase("embed"):
+                query_vector = await embed(key)
+            embedding_cache.set(key, query_vector)
+            path = "model"
         embed_ms = round((time.perf_counter() - t0) * 1000, 2)
 
         # Time vector search (Redis FT.SEARCH)
         t0 = time.perf_counter()
-        results = vector_search.search_by_vector(redis, query_vector, limit)
+        results = await run_in_threadpool(
+            vector_search.search_by_vector, redis, query_vector, limit, filter_expression
+        )
         search_ms = round((time.perf_counter() - t0) * 1000, 2)
 
         return {
             "query": q,
             "results": results,
             "count": len(results),
+            "path": path,
             "embed_ms": embed_ms,
             "search_ms": search_ms,
         }
+    except HTTPException:
+        raise
     except Exception as e:
         # Index might not exist yet
         if "no such index" in str(e).lower():
@@ -0,0 +1,121 @@
+"""
+Sketches Router
+
+Endpoints for approximate analytics (transaction_sketches module):
+heavy hitters, distinct counts and frequencies in fixed memory.
+"""
+
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends
+from api.dependencies import get_read_redis_client
+from generator.transaction_models import TransactionCategory
+from processor.modules import transaction_sketches
+
+router = APIRouter(prefix="/api/sketches", tags=["sketches"])
+
+
+@router.get("/bounds")
+def get_sketch_bounds():
+    """Memory and error bounds of each probabilistic structure."""
+    return transaction_sketches.sketch_bounds()
+
+
+@router.get("/merchants/top")
+def get_top_merchants(limit: int = 10, redis=Depends(get_read_redis_client)):
+    """
+    Most frequent merchants across all categories.
+
+    2 Redis calls:
+    1. TOPK.LIST for the heavy hitters
+    2. CMS.QUERY for their estimated transaction counts
+    """
+    try:
+        t0 = time.perf_counter()
+        top = transaction_sketches.get_top_merchants(redis, limit)
+        counts = transaction_sketches.get_merchant_counts(redis, [merchant for merchant, _ in top])
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+        result = [
+            {"merchant": merchant, "topk_count": topk_count, "cms_count": counts.get(merchant, 0)}
+            for merchant, topk_count in top
+        ]
+        return {"merchants": result, "count": len(result), "redis_ms": redis_ms}
+    except Exception as e:
+        return {"merchants": [], "count": 0, "error": str(e)}
+
+
+@router.get("/locations/top")
+def get_top_locations(limit: int = 10, redis=Depends(get_read_redis_client)):
+    """Most frequent locations (TopK)."""
+    try:
+        t0 = time.perf_counter()
+        top = transaction_sketches.get_top_locations(redis, limit)
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+        result = [{"location": location, "count": count} for location, count in top]
+        return {"locations": result, "count": len(result), "redis_ms": redis_ms}
+    except Exception as e:
+        return {"locations": [], "count": 0, "error": str(e)}
+
+
+@router.get("/merchants/{merchant}")
+def get_merchant_sketch(merchant: str, redis=Depends(get_read_redis_client)):
+    """
+    Estimated transaction count (Count-Min Sketch) and distinct customers
+    (HyperLogLog) for one merchant.
+    """
+    try:
+        t0 = time.perf_counter()
+        count = transaction_sketches.get_merchant_counts(redis, [merchant])[merchant]
+        customers = transaction_sketches.count_customers_by_merchant(redis, merchant)
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+        return {"merchant": merchant, "transactions": count, "unique_customers": customers, "redis_ms": redis_ms}
+    except Exception as e:
+        return {"merchant": merchant, "transactions": 0, "unique_customers": 0, "error": str(e)}
+
+
+@router.get("/categories/customers")
+def get_unique_customers_by_category(redis=Depends(get_read_redis_client)):
+    """Estimated distinct customers per category (HyperLogLog)."""
+    try:
+        t0 = time.perf_counter()
+        counts = transaction_sketches.count_customers_by_category(
+            redis, [category.value for category in TransactionCategory]
+        )
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+        result = [
+            {"category": category, "unique_customers": customers}
+            for category, customers in sorted(counts.items(), key=lambda item: -item[1])
+        ]
+        return {"categories": result, "count": len(result), "redis_ms": redis_ms}
+    except Exception as e:
+        return {"categories": [], "count": 0, "error": str(e)}
+
+
+@router.get("/days")
+def get_day_sketch(day: Optional[str] = None, redis=Depends(get_read_redis_client)):
+    """
+    Estimated distinct customers and cards seen on a day (HyperLogLog).
+
+    Query params:
+    - day: UTC date, YYYY-MM-DD (default: the latest day with transactions)
+    """
+    try:
+        t0 = time.perf_counter()
+        day = day or transaction_sketches.latest_day(redis)
+        if day is None:
+            return {"day": None, "unique_customers": 0, "unique_cards": 0, "redis_ms": 0}
+        counts = transaction_sketches.count_day(redis, day)
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+        return {
+            "day": day,
+            "unique_customers": counts["customers"],
+            "unique_cards": counts["cards"],
+            "redis_ms": redis_ms,
+        }
+    except Exception as e:
+        return {"day": day, "unique_customers": 0, "unique_cards": 0, "error": str(e)}
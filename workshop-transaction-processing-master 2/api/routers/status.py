@@ -5,24 +5,30 @@ Checks which tabs should be unlocked based on Redis data.
 """
 
 from fastapi import APIRouter, Depends
-from api.dependencies import get_redis_client
+from api.dependencies import get_cached_redis_client
+from lib.redis_client import client_cache_stats, replica_status
 
 router = APIRouter(prefix="/api", tags=["status"])
 
 
+def any_key(redis, pattern: str) -> bool:
+    """True if a key matches. SCAN stops at the first match, unlike KEYS."""
+    return next(redis.scan_iter(match=pattern, count=1000), None) is not None
+
+
 @router.get("/status")
-def get_status(redis=Depends(get_redis_client)):
+def get_status(redis=Depends(get_cached_redis_client)):
     """
     Check which features are unlocked.
 
     Returns unlock status for each tab based on Redis data presence.
+    EXISTS replies come from the client-side cache until the keys change.
     """
     # Check Transactions tab (needs List + JSON)
     transactions_unlocked = False
     try:
         list_exists = redis.exists("transactions:ordered")
-        json_keys = redis.keys("transaction:*")
-        transactions_unlocked = list_exists and len(json_keys) > 0
+        transactions_unlocked = bool(list_exists) and any_key(redis, "transaction:*")
     except:
         pass
 
@@ -30,8 +36,7 @@ def get_status(redis=Depends(get_redis_client)):
     categories_unlocked = False
     try:
         categories_exist = redis.exists("spending:categories")
-        category_keys = redis.keys("spending:category:*")
-        categories_unlocked = categories_exist and len(category_keys) > 0
+        categories_unlocked = bool(categories_exist) and any_key(redis, "spending:category:*")
     except:
         pass
 
@@ -58,3 +63,20 @@ def get_status(redis=Depends(get_redis_client)):
         "timeseries_unlocked": timeseries_unlocked,
         "search_unlocked": search_unlocked,
     }
+
+
+@router.get("/status/cache")
+def get_client_cache_status():
+    """Hit rate, size and invalidations of the client-side cache."""
+    return client_cache_stats()
+
+
+@router.get("/status/replicas")
+def get_replica_status():
+    """Health and lag of each read replica, from the latest check."""
+    replicas = replica_status()
+    return {
+        "replicas": replicas,
+        "healthy": sum(1 for replica in replicas if replica["healthy"]),
+        "count": len(replicas),
+    }
@@ -4,17 +4,39 @@ Stream Router
 Direct stream access for real-time transaction display.
 """
 
-from fastapi import APIRouter, Depends
+import asyncio
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from api.dependencies import get_redis_client
+from api.stream_hub import StreamHub, HubFull, decode_message, parse_stream_id
+from lib.redis_client import get_redis
 
 router = APIRouter(prefix="/api/stream", tags=["stream"])
 
+# Single shared reader for every live-feed client
+hub = StreamHub(get_redis)
+
+HEARTBEAT_SECONDS = 15
+
+
+def format_event(event: dict) -> bytes:
+    """Encode a stream event as a Server-Sent Event frame."""
+    return (
+        f"id: {event['stream_id']}\nevent: transaction\ndata: ".encode()
+        + orjson.dumps(event)
+        + b"\n\n"
+    )
+
 
 @router.get("/latest")
 def get_latest_transaction(after: str = "0", redis=Depends(get_redis_client)):
     """
     Get latest transaction from stream after given ID.
-    Used by startup screen to show live transactions.
+    Polling fallback for clients that can't use /api/stream/events.
     """
     try:
         # Read from stream starting after the given ID
@@ -28,20 +50,78 @@ def get_latest_transaction(after: str = "0", redis=Depends(get_redis_client)):
             stream_name, message_list = messages[0]
             if message_list:
                 stream_id, data = message_list[0]
-
-                # Decode the transaction data
-                transaction = {
-                    key.decode() if isinstance(key, bytes) else key:
-                    value.decode() if isinstance(value, bytes) else value
-                    for key, value in data.items()
-                }
-
-                return {
-                    "stream_id": stream_id.decode() if isinstance(stream_id, bytes) else stream_id,
-                    "transaction": transaction
-                }
+                return decode_message(stream_id, data)
 
         return {"stream_id": after, "transaction": None}
 
     except Exception as e:
         return {"stream_id": after, "transaction": None, "error": str(e)}
+
+
+@router.get("/events")
+async def stream_events(
+    request: Request,
+    after: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Live transaction feed as Server-Sent Events.
+
+    Every client shares one XREAD loop. Reconnecting clients resume from the
+    Last-Event-ID header (sent automatically by EventSource) or `after`.
+    Returns 503 once STREAM_MAX_CLIENTS are connected.
+    """
+    resume_from = last_event_id or after
+    if resume_from:
+        try:
+            parse_stream_id(resume_from)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid stream ID: {resume_from}")
+
+    try:
+        subscriber = hub.subscribe(asyncio.get_running_loop())
+    except HubFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    async def event_source():
+        try:
+            yield b"retry: 2000\n\n"
+
+            # Subscribed before replaying, so nothing is missed in between;
+            # live events already covered by the replay are skipped below.
+            last_sent = (0, 0)
+            if resume_from:
+                last_sent = parse_stream_id(resume_from)
+                backlog = await run_in_threadpool(hub.replay, resume_from)
+                for event in backlog:
+                    last_sent = parse_stream_id(event["stream_id"])
+                    yield format_event(event)
+
+            while not subscriber.overflowed:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": keepalive\n\n"
+                    continue
+
+                event_id = parse_stream_id(event["stream_id"])
+                if event_id <= last_sent:
+                    continue
+                last_sent = event_id
+                yield format_event(event)
+        finally:
+            hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/clients")
+def get_stream_clients():
+    """Connected live-feed clients and the configured cap."""
+    return {"clients": hub.client_count, "max_clients": hub.max_clients}
@@ -6,14 +6,18 @@ Endpoints for spending over time data (TimeSeries module).
 
 import time
 from fastapi import APIRouter, Depends, HTTPException
-from api.dependencies import get_redis_client
+from redis.exceptions import ResponseError
+from api.dependencies import get_cached_read_redis_client, get_read_redis_client
 from processor.modules import spending_over_time
 
 router = APIRouter(prefix="/api/spending", tags=["timeseries"])
 
 
 def get_latest_timestamp(redis) -> int:
-    """Get timestamp of most recent data point from TimeSeries."""
+    """
+    Get timestamp of most recent data point from TimeSeries.
+    Pass the cached client: TS.GET is served locally until a new sample lands.
+    """
     try:
         # Get the last data point from timeseries
         result = redis.ts().get("spending:timeseries")
@@ -24,12 +28,37 @@ def get_latest_timestamp(redis) -> int:
         return 0
 
 
+AGGREGATIONS = ("sum", "count", "avg")
+MAX_POINTS = 2000
+# Buckets per group when group_by is given without points/bucket_ms
+DEFAULT_GROUP_POINTS = 100
+
+
+def choose_bucket_ms(start_ts: int, end_ts: int, points: int) -> int:
+    """
+    Bucket size that yields at most `points` buckets over the range.
+
+    Rounded up to whole hours/days once it is that large, so that the
+    compaction series can serve it.
+    """
+    bucket = max(1000, -(-(end_ts - start_ts) // points))
+    for unit in (spending_over_time.DAY_MS, spending_over_time.HOUR_MS):
+        if bucket >= unit:
+            return -(-bucket // unit) * unit
+    return bucket
+
+
 @router.get("/range")
 def get_spending_range(
     start: int = None,
     end: int = None,
     days: int = None,
-    redis=Depends(get_redis_client)
+    points: int = None,
+    bucket_ms: int = None,
+    agg: str = "sum",
+    group_by: str = None,
+    redis=Depends(get_read_redis_client),
+    cached_redis=Depends(get_cached_read_redis_client),
 ):
     """
     Get spending data for time range.
@@ -40,14 +69,35 @@ def get_spending_range(
     - start: Start timestamp (milliseconds)
     - end: End timestamp (milliseconds)
     - days: Shortcut for last N days (overrides start/end)
+    - points: Target number of buckets (server-side aggregation)
+    - bucket_ms: Explicit bucket size in milliseconds (overrides points)
+    - agg: Per-bucket value - sum, count or avg (default: sum)
+    - group_by: category or location - one series per value, from the
+      labelled series via TS.MRANGE ... GROUPBY ... REDUCE sum
+
+    Without points/bucket_ms every raw sample is returned (grouped
+    queries always use buckets).
     """
+    if agg not in AGGREGATIONS:
+        raise HTTPException(status_code=400, detail=f"agg must be one of {', '.join(AGGREGATIONS)}")
+    if points is not None and not 1 <= points <= MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"points must be between 1 and {MAX_POINTS}")
+    if bucket_ms is not None and bucket_ms < 1:
+        raise HTTPException(status_code=400, detail="bucket_ms must be positive")
+    if group_by is not None and group_by not in spending_over_time.DIMENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"group_by must be one of {', '.join(spending_over_time.DIMENSIONS)}"
+        )
+
     try:
         # Calculate time range
+        latest_ts = None
         if days:
             # Use latest transaction timestamp as "now"
-            end_ts = get_latest_timestamp(redis)
+            latest_ts = end_ts = get_latest_timestamp(cached_redis)
             if end_ts == 0:
-                return {"data": [], "count": 0, "total_spent": 0, "redis_ms": 0}
+                return {"data": [], "count": 0, "transactions": 0, "total_spent": 0, "redis_ms": 0}
             start_ts = end_ts - (days * 24 * 60 * 60 * 1000)
         elif start and end:
             start_ts = start
@@ -58,25 +108,50 @@ def get_spending_range(
                 detail="Provide either 'days' or both 'start' and 'end'"
             )
 
-        # Query TimeSeries (single Redis call)
+        if group_by and not bucket_ms and not points:
+            points = DEFAULT_GROUP_POINTS
+        if not bucket_ms and not points:
+            return _raw_range(redis, start_ts, end_ts)
+
+        if not bucket_ms:
+            bucket_ms = choose_bucket_ms(start_ts, end_ts, points)
+
+        # Coarsest series whose resolution divides the bucket and still
+        # retains the start of the window
+        if latest_ts is None:
+            latest_ts = get_latest_timestamp(cached_redis) or end_ts
+        resolution = spending_over_time.pick_resolution(bucket_ms, start_ts, latest_ts)
+
+        if group_by:
+            return _grouped_range(redis, group_by, start_ts, end_ts, bucket_ms, agg, resolution)
+
         t0 = time.perf_counter()
-        data_points = spending_over_time.get_spending_in_range(redis, start_ts, end_ts)
+        try:
+            sums, counts = spending_over_time.get_spending_buckets(
+                redis, start_ts, end_ts, bucket_ms, resolution, latest_ts
+            )
+        except ResponseError:
+            # Compaction series not created yet - processor predates them
+            if resolution == "raw":
+                raise
+            resolution = "raw"
+            sums, counts = spending_over_time.get_spending_buckets(
+                redis, start_ts, end_ts, bucket_ms, resolution
+            )
         redis_ms = round((time.perf_counter() - t0) * 1000, 2)
 
-        # Format response and calculate total in single pass
-        result = []
-        total = 0.0
-        for ts, amount in data_points:
-            amt = float(amount)
-            result.append({"timestamp": int(ts), "amount": amt})
-            total += amt
+        result, total, transactions = _combine_buckets(sums, counts, agg)
 
         return {
             "data": result,
             "count": len(result),
+            "transactions": transactions,
             "total_spent": total,
             "start": start_ts,
             "end": end_ts,
+            "bucket_ms": bucket_ms,
+            "agg": agg,
+            "series": resolution,
             "redis_ms": redis_ms,
         }
 
@@ -86,6 +161,99 @@ def get_spending_range(
         return {
             "data": [],
             "count": 0,
+            "transactions": 0,
             "total_spent": 0,
             "error": str(e)
         }
+
+
+def _combine_buckets(sums, counts, agg: str):
+    """Per-bucket sums and counts -> (points, total_spent, transactions)."""
+    count_by_ts = {int(ts): float(n) for ts, n in counts}
+    result = []
+    total = 0.0
+    transactions = 0
+    for ts, amount in sums:
+        ts = int(ts)
+        amt = float(amount)
+        n = count_by_ts.get(ts, 0.0)
+        if agg == "sum":
+            value = amt
+        elif agg == "count":
+            value = n
+        else:
+            value = amt / n if n else 0.0
+        result.append({"timestamp": ts, "amount": value})
+        total += amt
+        transactions += int(n)
+    return result, total, transactions
+
+
+def _grouped_range(redis, group_by: str, start_ts: int, end_ts: int, bucket_ms: int,
+                   agg: str, resolution: str) -> dict:
+    """One bucketed series per category/location value, largest total first."""
+    t0 = time.perf_counter()
+    by_value = spending_over_time.get_spending_by_dimension(
+        redis, group_by, start_ts, end_ts, bucket_ms, resolution
+    )
+    if not by_value and resolution != "raw":
+        # No compaction series matched the filter (not created yet -
+        # processor predates them): MRANGE just returns nothing
+        resolution = "raw"
+        by_value = spending_over_time.get_spending_by_dimension(
+            redis, group_by, start_ts, end_ts, bucket_ms, resolution
+        )
+    redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+    groups = []
+    for value, (sums, counts) in by_value.items():
+        result, total, transactions = _combine_buckets(sums, counts, agg)
+        groups.append({
+            group_by: value,
+            "data": result,
+            "count": len(result),
+            "transactions": transactions,
+            "total_spent": total,
+        })
+    groups.sort(key=lambda group: -group["total_spent"])
+
+    return {
+        "groups": groups,
+        "count": len(groups),
+        "group_by": group_by,
+        "transactions": sum(group["transactions"] for group in groups),
+        "total_spent": sum(group["total_spent"] for group in groups),
+        "start": start_ts,
+        "end": end_ts,
+        "bucket_ms": bucket_ms,
+        "agg": agg,
+        "series": resolution,
+        "redis_ms": redis_ms,
+    }
+
+
+def _raw_range(redis, start_ts: int, end_ts: int) -> dict:
+    """Every raw sample in the range (no aggregation)."""
+    # Query TimeSeries (single Redis call)
+    t0 = time.perf_counter()
+    data_points = spending_over_time.get_spending_in_range(redis, start_ts, end_ts)
+    redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+    # Format response and calculate total in single pass
+    result = []
+    total = 0.0
+    for ts, amount in data_points:
+        amt = float(amount)
+        result.append({"timestamp": int(ts), "amount": amt})
+        total += amt
+
+    return {
+        "data": result,
+        "count": len(result),
+        "transactions": len(result),
+        "total_spent": total,
+        "start": start_ts,
+        "end": end_ts,
+        "series": "raw",
+        "redis_ms": redis_ms,
+    }
@@ -1,24 +1,111 @@
 """
 Transactions Router
 
-Endpoints for transaction data (List + JSON modules).
+Endpoints for transaction data (List + JSON + Query modules).
 """
 
+import os
 import time
+from typing import List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException
-from api.dependencies import get_redis_client
-from processor.modules import ordered_transactions, store_transaction
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from api import export
+from api.dependencies import get_cached_redis_client, get_read_redis_client
+from lib.logger import setup_logger
+from processor.modules import ordered_transactions, store_transaction, transaction_query
 
 router = APIRouter(prefix="/api/transactions", tags=["transactions"])
 
+logger = setup_logger("transactions")
+
+MAX_PAGE_SIZE = 200
+
+# Bulk lookup limits
+BATCH_MAX_IDS = int(os.getenv("TRANSACTIONS_BATCH_MAX", "1000"))
+BATCH_CHUNK_SIZE = int(os.getenv("TRANSACTIONS_BATCH_CHUNK", "100"))
+BATCH_FIELDS = store_transaction.TRANSACTION_FIELDS + ["embedding"]
+
+
+class BatchRequest(BaseModel):
+    """Body of POST /api/transactions/batch."""
+    ids: List[str]
+    fields: Optional[List[str]] = None
+
+
+def parse_cursor(cursor: str) -> Tuple[int, str]:
+    """Split a "<timestamp>:<transactionId>" cursor."""
+    try:
+        timestamp, tx_id = cursor.split(":", 1)
+        return int(timestamp), tx_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+
+
+@router.get("")
+def browse_transactions(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    redis=Depends(get_read_redis_client),
+):
+    """
+    Browse transactions newest first with cursor pagination.
+
+    Query params:
+    - limit: Page size (max 200)
+    - cursor: next_cursor from the previous page
+    - before: Jump to date - start at this timestamp (milliseconds)
+    - after: Stop at this timestamp (milliseconds)
+
+    2 Redis calls per page, whatever its depth:
+    1. ZREVRANGEBYSCORE seek on the time index
+    2. JSON.MGET to fetch all documents at once
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    before_id = None
+    if cursor:
+        before, before_id = parse_cursor(cursor)
+
+    try:
+        t0 = time.perf_counter()
+        page = ordered_transactions.get_transaction_page(
+            redis, limit, before=before, before_id=before_id, after=after
+        )
+        t1 = time.perf_counter()
+
+        transactions = store_transaction.get_transactions_by_ids(redis, [tx_id for tx_id, _ in page])
+        t2 = time.perf_counter()
+
+        next_cursor = None
+        if len(page) == limit:
+            last_id, last_ts = page[-1]
+            next_cursor = f"{last_ts}:{last_id}"
+
+        return {
+            "transactions": transactions,
+            "count": len(transactions),
+            "next_cursor": next_cursor,
+            "redis_ms": round((t2 - t0) * 1000, 2),
+            "zrange_ms": round((t1 - t0) * 1000, 2),
+            "mget_ms": round((t2 - t1) * 1000, 2),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        return {"transactions": [], "count": 0, "next_cursor": None, "error": str(e)}
+
 
 @router.get("/recent")
-def get_recent_transactions(limit: int = 20, redis=Depends(get_redis_client)):
+def get_recent_transactions(limit: int = 20, redis=Depends(get_cached_redis_client)):
     """
     Get recent transactions with full details, ordered newest first.
 
-    2 Redis calls:
-    1. LRANGE to get IDs from List
+    2 Redis calls, both through the client-side cache:
+    1. LRANGE to get IDs from List (invalidated by every new transaction)
     2. JSON.MGET to fetch all documents at once
     """
     try:
@@ -49,10 +136,183 @@ def get_recent_transactions(limit: int = 20, redis=Depends(get_redis_client)):
         return {"transactions": [], "count": 0, "error": str(e)}
 
 
+@router.post("/batch")
+def get_transactions_batch(body: BatchRequest, redis=Depends(get_read_redis_client)):
+    """
+    Get many transactions by ID in one request.
+
+    Body:
+    - ids: Transaction IDs (up to TRANSACTIONS_BATCH_MAX)
+    - fields: Fields to return (default: every field except "embedding")
+
+    Results come back in input order, with null for IDs that don't exist.
+    All JSON.MGET chunks go out in a single pipeline.
+    """
+    if len(body.ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} ids per request")
+
+    fields = body.fields or store_transaction.TRANSACTION_FIELDS
+    unknown = [field for field in fields if field not in BATCH_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    try:
+        t0 = time.perf_counter()
+        transactions = store_transaction.get_transactions_batch(
+            redis, body.ids, fields, chunk_size=BATCH_CHUNK_SIZE
+        )
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+        missing = [tx_id for tx_id, tx in zip(body.ids, transactions) if tx is None]
+        return {
+            "transactions": transactions,
+            "count": len(transactions) - len(missing),
+            "missing": missing,
+            "redis_ms": redis_ms,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export")
+def export_transactions(
+    format: str = "ndjson",
+    gzip: bool = False,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    category: Optional[str] = None,
+    include_embedding: bool = False,
+    redis=Depends(get_read_redis_client),
+):
+    """
+    Stream every matching transaction as NDJSON or CSV.
+
+    Query params:
+    - format: ndjson or csv
+    - gzip: Gzip the body
+    - start, end: Timestamp range (milliseconds)
+    - category: Only this category
+    - include_embedding: Also export embeddings
+
+    Memory stays constant: documents are read and written a chunk at a time.
+    """
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(export.FORMATS)}")
+
+    stats = export.ExportStats()
+
+    def body():
+        yield from export.export_stream(
+            redis,
+            fmt=format,
+            gzip=gzip,
+            start=start,
+            end=end,
+            category=category,
+            include_embedding=include_embedding,
+            stats=stats,
+        )
+        logger.info(stats.summary())
+
+    filename = f"transactions.{format}" + (".gz" if gzip else "")
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        media_type = "application/gzip"
+
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+
+@router.get("/query")
+def query_transactions(
+    merchant: Optional[str] = None,
+    category: Optional[str] = None,
+    location: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    card_last4: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    q: Optional[str] = None,
+    sort_by: str = "timestamp",
+    order: str = "desc",
+    limit: int = 20,
+    offset: int = 0,
+    group_by: Optional[str] = None,
+    redis=Depends(get_read_redis_client),
+):
+    """
+    Structured query over transaction documents (transaction_query module).
+
+    Query params:
+    - merchant, category, location, customer_id, card_last4: Exact match
+    - min_amount, max_amount: Amount range
+    - start, end: Timestamp range (milliseconds)
+    - q: Words in the merchant name
+    - sort_by: timestamp or amount; order: asc or desc
+    - limit, offset: Paging (limit max 200)
+    - group_by: category, merchant, location, customerId or cardLast4 -
+      return FT.AGGREGATE totals instead of rows
+
+    1 Redis call: FT.SEARCH (or FT.AGGREGATE with group_by)
+    """
+    if sort_by not in transaction_query.SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of {', '.join(transaction_query.SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    if group_by and group_by not in transaction_query.TAG_FIELDS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(transaction_query.TAG_FIELDS)}")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = max(0, offset)
+
+    query_string = transaction_query.build_query_string(
+        merchant=merchant,
+        category=category,
+        location=location,
+        customer_id=customer_id,
+        card_last4=card_last4,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        start=start,
+        end=end,
+        text=q,
+    )
+
+    try:
+        t0 = time.perf_counter()
+        if group_by:
+            groups = transaction_query.aggregate_transactions(redis, group_by, query_string, limit)
+            redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+            return {
+                "query": query_string,
+                "group_by": group_by,
+                "groups": groups,
+                "count": len(groups),
+                "redis_ms": redis_ms,
+            }
+
+        total, transactions = transaction_query.query_transactions(
+            redis, query_string, sort_by, order == "asc", limit, offset
+        )
+        redis_ms = round((time.perf_counter() - t0) * 1000, 2)
+        return {
+            "query": query_string,
+            "transactions": transactions,
+            "count": len(transactions),
+            "total": total,
+            "offset": offset,
+            "redis_ms": redis_ms,
+        }
+    except Exception as e:
+        return {"query": query_string, "transactions": [], "count": 0, "error": str(e)}
+
+
 @router.get("/{transaction_id}")
-def get_transaction(transaction_id: str, redis=Depends(get_redis_client)):
+def get_transaction(transaction_id: str, redis=Depends(get_cached_redis_client)):
     """
-    Get single transaction by ID.
+    Get single transaction by ID (documents are immutable, so the
+    client-side cache serves repeat reads).
     """
     try:
         t0 = time.perf_counter()
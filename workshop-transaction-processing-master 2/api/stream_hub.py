@@ -0,0 +1,165 @@
+"""
+Stream Hub
+
+Fans out a single shared XREAD loop to every connected live-feed client.
+
+One background thread reads "stream:transactions" and pushes each message
+onto a bounded per-client asyncio queue. Clients that fall behind (queue
+full) are disconnected instead of slowing the reader down; they resume
+from their last seen stream ID on reconnect.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from lib.logger import setup_logger
+
+STREAM_KEY = "stream:transactions"
+
+# Configuration from environment
+MAX_CLIENTS = int(os.getenv("STREAM_MAX_CLIENTS", "100"))
+CLIENT_QUEUE_SIZE = int(os.getenv("STREAM_CLIENT_QUEUE_SIZE", "256"))
+REPLAY_LIMIT = int(os.getenv("STREAM_REPLAY_LIMIT", "1000"))
+READ_COUNT = 100
+BLOCK_MS = 1000
+
+logger = setup_logger("stream_hub")
+
+
+class HubFull(Exception):
+    """Raised when the connection cap has been reached."""
+
+
+def decode_message(stream_id, data: Dict) -> Dict:
+    """Convert a raw stream entry into {"stream_id", "transaction"}."""
+    return {
+        "stream_id": stream_id.decode() if isinstance(stream_id, bytes) else stream_id,
+        "transaction": {
+            key.decode() if isinstance(key, bytes) else key:
+            value.decode() if isinstance(value, bytes) else value
+            for key, value in data.items()
+        },
+    }
+
+
+def parse_stream_id(stream_id: str) -> Tuple[int, int]:
+    """
+    Parse a stream ID ("<ms>-<seq>" or "<ms>") into a comparable tuple.
+
+    Raises:
+        ValueError: If the ID is malformed
+    """
+    ms, _, seq = stream_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class Subscriber:
+    """A connected client: its event loop and bounded event queue."""
+
+    def __init__(self, hub: "StreamHub", loop: asyncio.AbstractEventLoop):
+        self.hub = hub
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, event: Dict) -> None:
+        """Enqueue an event. Runs on the subscriber's event loop."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Backpressure: drop the slow client rather than buffer without bound
+            self.overflowed = True
+            self.hub.unsubscribe(self)
+
+
+class StreamHub:
+    """
+    Shared stream reader with per-client fan-out.
+
+    The reader thread starts with the first subscriber and exits once the
+    last one leaves, so an idle API holds no blocking connection.
+    """
+
+    def __init__(self, redis_factory, stream_key: str = STREAM_KEY, max_clients: int = MAX_CLIENTS):
+        self._redis_factory = redis_factory
+        self.stream_key = stream_key
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscriber] = set()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def client_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop) -> Subscriber:
+        """
+        Register a client and make sure the reader thread is running.
+
+        Raises:
+            HubFull: If max_clients are already connected
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                raise HubFull(f"Live feed is limited to {self.max_clients} clients")
+            subscriber = Subscriber(self, loop)
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stream-hub", daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Remove a client. Safe to call more than once."""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def replay(self, after: str, limit: int = REPLAY_LIMIT) -> List[Dict]:
+        """Read up to `limit` entries strictly after the given stream ID."""
+        redis = self._redis_factory()
+        entries = redis.xrange(self.stream_key, min=f"({after}", max="+", count=limit)
+        return [decode_message(stream_id, data) for stream_id, data in entries]
+
+    def _run(self) -> None:
+        """Reader loop: one XREAD for all clients."""
+        redis = self._redis_factory()
+        last_id = "$"
+
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+
+            try:
+                messages = redis.xread(
+                    streams={self.stream_key: last_id},
+                    count=READ_COUNT,
+                    block=BLOCK_MS,
+                )
+            except Exception as e:
+                logger.warning(f"Stream read failed: {e}")
+                time.sleep(1)
+                continue
+
+            if not messages:
+                continue
+
+            with self._lock:
+                subscribers = list(self._subscribers)
+
+            for _, message_list in messages:
+                for stream_id, data in message_list:
+                    event = decode_message(stream_id, data)
+                    last_id = event["stream_id"]
+                    for subscriber in subscribers:
+                        try:
+                            subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+                        except RuntimeError:
+                            # Event loop closed underneath us
+                            self.unsubscribe(subscriber)
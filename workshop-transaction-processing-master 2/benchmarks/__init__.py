@@ -0,0 +1,6 @@
+"""
+Microbenchmarks for the transaction processor and API.
+
+Run with `python -m benchmarks.run` (see run.py); load-test the API with
+`python -m benchmarks.loadtest` (see loadtest.py).
+"""
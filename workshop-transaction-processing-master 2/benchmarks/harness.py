@@ -0,0 +1,172 @@
+"""
+Benchmark harness: timing, baselines and regression checks.
+
+A benchmark is a callable doing `ops` operations per call. measure()
+sizes a round so it lasts at least `min_round_s`, runs several rounds
+with the garbage collector paused (as timeit does) and keeps the per
+operation time of each round. Comparisons use the median round, which
+shrugs off the odd slow round (a GC or a noisy neighbour).
+
+Baselines are JSON files:
+    {"created": "...", "backend": "redis", "python": "3.11.7",
+     "results": {"module/ordered_transactions": {"median_us": 41.2, ...}}}
+"""
+
+import gc
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+class BenchResult:
+    """Per-operation timings of one benchmark."""
+
+    def __init__(self, name: str, round_times: List[float], ops_per_round: int):
+        self.name = name
+        self.round_times = round_times
+        self.ops_per_round = ops_per_round
+
+    @property
+    def median_us(self) -> float:
+        return statistics.median(self.round_times) * 1e6
+
+    @property
+    def min_us(self) -> float:
+        return min(self.round_times) * 1e6
+
+    @property
+    def ops_per_s(self) -> float:
+        return 1e6 / self.median_us if self.median_us else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "median_us": round(self.median_us, 3),
+            "min_us": round(self.min_us, 3),
+            "ops_per_s": round(self.ops_per_s, 1),
+            "rounds": len(self.round_times),
+            "ops_per_round": self.ops_per_round,
+        }
+
+
+def measure(
+    name: str,
+    fn: Callable[[], None],
+    ops: int = 1,
+    rounds: int = 7,
+    min_round_s: float = 0.2,
+) -> BenchResult:
+    """
+    Time `fn` (which performs `ops` operations per call).
+
+    One warm-up call also sizes the rounds: each round repeats `fn` enough
+    times to last about `min_round_s`.
+    """
+    t0 = time.perf_counter()
+    fn()
+    warmup = time.perf_counter() - t0
+    calls = max(1, int(min_round_s / warmup)) if warmup > 0 else 1000
+
+    round_times = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            for _ in range(calls):
+                fn()
+            round_times.append((time.perf_counter() - t0) / (calls * ops))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return BenchResult(name, round_times, calls * ops)
+
+
+# ---------------------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------------------
+
+def results_document(results: List[BenchResult], skipped: Dict[str, str], backend: str,
+                     failed: Optional[Dict[str, str]] = None) -> Dict:
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "backend": backend,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {result.name: result.to_dict() for result in results},
+        "skipped": skipped,
+        "failed": failed or {},
+    }
+
+
+def save_results(path: Path, document: Dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2, sort_keys=True) + "\n")
+
+
+def load_baseline(path: Path) -> Optional[Dict]:
+    """The baseline document, or None when there is none yet."""
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+# Statuses that fail a run
+REGRESSIONS = ("regression", "failed", "missing")
+
+
+def compare(
+    results: List[BenchResult],
+    baseline: Dict,
+    threshold: float,
+    failed: Optional[Dict[str, str]] = None,
+    skipped: Optional[Dict[str, str]] = None,
+) -> List[Dict]:
+    """
+    Compare median times against the baseline.
+
+    A benchmark more than `threshold` (0.2 = 20%) slower than its baseline
+    is a "regression"; that much faster is "faster"; otherwise "ok".
+    Benchmarks missing from the baseline are "new". A benchmark that
+    raised is "failed", and a baseline entry with no result (skipped, or
+    no longer defined) is "missing": both count as regressions.
+    """
+    previous = baseline.get("results", {})
+    failed, skipped = failed or {}, skipped or {}
+    rows = []
+    for result in results:
+        base = previous.get(result.name)
+        if base is None:
+            rows.append({"name": result.name, "status": "new", "median_us": result.median_us})
+            continue
+        ratio = result.median_us / base["median_us"] if base["median_us"] else 1.0
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append({
+            "name": result.name,
+            "status": status,
+            "median_us": result.median_us,
+            "baseline_us": base["median_us"],
+            "change": ratio - 1,
+        })
+    for name, reason in failed.items():
+        rows.append({"name": name, "status": "failed", "reason": reason})
+    measured = {result.name for result in results}
+    for name in sorted(set(previous) - measured - set(failed)):
+        rows.append({"name": name, "status": "missing", "reason": skipped.get(name, "no result")})
+    return rows
+
+
+def format_duration(us: float) -> str:
+    if us >= 1e6:
+        return f"{us / 1e6:.2f} s"
+    if us >= 1e3:
+        return f"{us / 1e3:.2f} ms"
+    return f"{us:.1f} us"
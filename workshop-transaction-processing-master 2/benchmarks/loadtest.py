@@ -0,0 +1,449 @@
+"""
+Dashboard Load Test
+
+Simulates concurrent dashboard users against the API and reports
+per-endpoint throughput, latency percentiles and error rates.
+
+Each virtual user behaves like an open dashboard tab (ui/js):
+- polls /api/status every 2s (app.js POLL_INTERVAL)
+- holds the live feed open (startup.js EventSource): one SSE
+  subscription to /api/stream/events, reconnecting after the server's
+  retry delay and resuming from Last-Event-ID. --stream poll uses the
+  fallback for browsers without EventSource instead: /api/stream/latest
+  every 4s
+- navigates: after a think time it opens one of the tabs, weighted by
+  --mix:
+  - transactions: /api/transactions/recent?limit=20, sometimes a row
+    (/api/transactions/{id})
+  - categories: /api/categories/top?limit=10, sometimes a category
+    (/api/categories/{category}/top?limit=10)
+  - spending: /api/spending/range?days=1|3|7|30&points=200
+  - search: /api/search?q=...&limit=10
+
+Users are closed loops (a user waits for each response), so the load
+offered drops as latency grows; raise --users to push harder. Stats
+cover every request started in the --duration after the --ramp-up
+period, including ones still in flight when it ends. The feed is
+reported as its connect time (to the response headers) and the events
+delivered.
+
+Save each run with --output and pass it to a later run with --compare
+to see the effect of a configuration change (uvicorn workers, pool
+size, REDIS_CLIENT_CACHE, ...). Run it against a real server for
+capacity numbers; --in-process drives api.main:app directly, which
+shares the CPU between load generator and API (and polls the feed:
+httpx's in-process transport can't stream a response).
+
+Usage:
+    python -m benchmarks.loadtest --url http://localhost:8000 --users 50 --duration 60
+    python -m benchmarks.loadtest --users 100 --output workers4.json --label "workers=4"
+    python -m benchmarks.loadtest --users 100 --compare workers4.json
+    python -m benchmarks.loadtest --in-process --users 10 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import httpx
+
+# Allow running as a script from the benchmarks/ directory
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DEFAULT_MIX = "transactions=4,categories=3,spending=3,search=1"
+SPENDING_DAYS = (1, 3, 7, 30)
+# Buckets the UI asks for (ui/js/timeseries.js CHART_POINTS)
+CHART_POINTS = 200
+SEARCH_QUERIES = (
+    "coffee",
+    "groceries in Dallas",
+    "large travel purchases",
+    "gas station",
+    "restaurants in Seattle",
+    "streaming subscriptions",
+)
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class EndpointStats:
+    """Latencies and outcomes of one endpoint."""
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.errors: Dict[str, int] = {}
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies_ms)
+
+    @property
+    def error_count(self) -> int:
+        return sum(self.errors.values())
+
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile of the latencies (ms)."""
+        ordered = sorted(self.latencies_ms)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    def summary(self, duration_s: float) -> Dict:
+        return {
+            "requests": self.requests,
+            "rps": round(self.requests / duration_s, 2) if duration_s else 0.0,
+            **{f"p{q * 100:g}_ms": round(self.percentile(q), 2) for q in PERCENTILES},
+            "max_ms": round(max(self.latencies_ms, default=0.0), 2),
+            "errors": self.error_count,
+            "error_rate": round(self.error_count / self.requests, 4) if self.requests else 0.0,
+            "error_kinds": dict(self.errors),
+        }
+
+
+class LoadTest:
+    """Shared client, stats and the measurement window."""
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.stats: Dict[str, EndpointStats] = {}
+        self.measure_from = 0.0
+        self.stop_at = 0.0
+        self.stream_events = 0
+
+    def running(self) -> bool:
+        return time.monotonic() < self.stop_at
+
+    async def sleep(self, seconds: float) -> None:
+        """Sleep, but not past the end of the test."""
+        await asyncio.sleep(max(0.0, min(seconds, self.stop_at - time.monotonic())))
+
+    def measured(self, t0: float) -> bool:
+        """Whether a request started at `t0` counts (started inside the window)."""
+        return self.measure_from <= t0 < self.stop_at
+
+    def record(self, endpoint: str, t0: float, error: Optional[str] = None) -> None:
+        if not self.measured(t0):
+            return
+        stats = self.stats.setdefault(endpoint, EndpointStats())
+        stats.latencies_ms.append((time.monotonic() - t0) * 1000)
+        if error:
+            stats.errors[error] = stats.errors.get(error, 0) + 1
+
+    async def get(self, endpoint: str, url: str) -> Optional[Dict]:
+        """GET url, recording it under `endpoint`. Returns the JSON body on success."""
+        t0 = time.monotonic()
+        error, body = None, None
+        try:
+            response = await self.client.get(url)
+            if response.status_code >= 400:
+                error = f"http_{response.status_code}"
+            else:
+                body = response.json()
+                # Routers answer 200 with an "error" field when Redis fails
+                if isinstance(body, dict) and body.get("error"):
+                    error = "app_error"
+        except httpx.TimeoutException:
+            error = "timeout"
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        except ValueError:
+            error = "invalid_json"
+
+        self.record(endpoint, t0, error)
+        return None if error else body
+
+
+# ---------------------------------------------------------------------------
+# Virtual user
+# ---------------------------------------------------------------------------
+
+async def poll(test: LoadTest, interval_s: float, request) -> None:
+    """Call `request()` every `interval_s` (like setInterval) until the test ends."""
+    while test.running():
+        started = time.monotonic()
+        await request()
+        await test.sleep(interval_s - (time.monotonic() - started))
+
+
+async def subscribe(test: LoadTest) -> None:
+    """
+    Keep one live-feed subscription open until the test ends, like the
+    UI's EventSource: reconnect after the server's retry delay, resuming
+    from the last event ID.
+    """
+    last_event_id: Optional[str] = None
+    retry_s = 2.0
+
+    async def connect() -> None:
+        nonlocal last_event_id, retry_s
+        headers = {"Last-Event-ID": last_event_id} if last_event_id else {}
+        t0 = time.monotonic()
+        try:
+            # No read timeout: the feed is quiet between events and heartbeats
+            async with test.client.stream(
+                "GET", "/api/stream/events", headers=headers,
+                timeout=httpx.Timeout(test.args.timeout_s, read=None),
+            ) as response:
+                if response.status_code >= 400:
+                    test.record("/api/stream/events", t0, f"http_{response.status_code}")
+                    return
+                test.record("/api/stream/events", t0)
+                event = None
+                async for line in response.aiter_lines():
+                    field, _, value = line.partition(":")
+                    value = value.strip()
+                    if field == "id":
+                        last_event_id = value
+                    elif field == "event":
+                        event = value
+                    elif field == "retry" and value.isdigit():
+                        retry_s = int(value) / 1000
+                    elif not line:
+                        if event == "transaction" and test.measured(time.monotonic()):
+                            test.stream_events += 1
+                        event = None
+        except httpx.TimeoutException:
+            test.record("/api/stream/events", t0, "timeout")
+        except httpx.HTTPError as e:
+            test.record("/api/stream/events", t0, type(e).__name__)
+
+    while test.running():
+        try:
+            await asyncio.wait_for(connect(), test.stop_at - time.monotonic())
+        except asyncio.TimeoutError:
+            return
+        await test.sleep(retry_s)
+
+
+async def open_transactions(test: LoadTest, rng: random.Random) -> None:
+    body = await test.get("/api/transactions/recent", "/api/transactions/recent?limit=20")
+    transactions = (body or {}).get("transactions") or []
+    if transactions and rng.random() < 0.5:
+        tx_id = rng.choice(transactions).get("transactionId")
+        await test.get("/api/transactions/{id}", f"/api/transactions/{tx_id}")
+
+
+async def open_categories(test: LoadTest, rng: random.Random) -> None:
+    body = await test.get("/api/categories/top", "/api/categories/top?limit=10")
+    categories = (body or {}).get("categories") or []
+    if categories and rng.random() < 0.5:
+        category = quote(rng.choice(categories).get("category", ""))
+        await test.get("/api/categories/{category}/top", f"/api/categories/{category}/top?limit=10")
+
+
+async def open_spending(test: LoadTest, rng: random.Random) -> None:
+    days = rng.choice(SPENDING_DAYS)
+    await test.get("/api/spending/range", f"/api/spending/range?days={days}&points={CHART_POINTS}")
+
+
+async def open_search(test: LoadTest, rng: random.Random) -> None:
+    query = quote(rng.choice(SEARCH_QUERIES))
+    await test.get("/api/search", f"/api/search?q={query}&limit=10")
+
+
+ACTIONS = {
+    "transactions": open_transactions,
+    "categories": open_categories,
+    "spending": open_spending,
+    "search": open_search,
+}
+
+
+async def navigate(test: LoadTest, rng: random.Random, mix: Dict[str, int]) -> None:
+    """Open tabs with think times in between (exponential, mean --think-s)."""
+    actions, weights = list(mix), list(mix.values())
+    while test.running():
+        await ACTIONS[rng.choices(actions, weights)[0]](test, rng)
+        await test.sleep(rng.expovariate(1 / test.args.think_s) if test.args.think_s > 0 else 0)
+
+
+async def user(test: LoadTest, user_id: int, start_delay_s: float, mix: Dict[str, int]) -> None:
+    rng = random.Random(test.args.seed * 100_003 + user_id)
+    await asyncio.sleep(start_delay_s)
+    stream_id = "0"
+
+    async def status():
+        await test.get("/api/status", "/api/status")
+
+    async def stream_latest():
+        nonlocal stream_id
+        body = await test.get("/api/stream/latest", f"/api/stream/latest?after={stream_id}")
+        if body and body.get("transaction"):
+            stream_id = body["stream_id"]
+
+    tasks = [navigate(test, rng, mix)]
+    if test.args.status_interval_s > 0:
+        tasks.append(poll(test, test.args.status_interval_s, status))
+    if test.args.stream == "sse":
+        tasks.append(subscribe(test))
+    elif test.args.stream == "poll":
+        tasks.append(poll(test, test.args.stream_interval_s, stream_latest))
+    await asyncio.gather(*tasks)
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """"transactions=4,search=1" -> {"transactions": 4, "search": 1}"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r} (choose from {', '.join(ACTIONS)})")
+        try:
+            mix[name] = int(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid weight for {name}: {weight!r}")
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("mix needs at least one positive weight")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def build_report(test: LoadTest, duration_s: float) -> Dict:
+    args = test.args
+    total = EndpointStats()
+    for stats in test.stats.values():
+        total.latencies_ms.extend(stats.latencies_ms)
+        for kind, count in stats.errors.items():
+            total.errors[kind] = total.errors.get(kind, 0) + count
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "label": args.label,
+        "target": "in-process" if args.in_process else args.url,
+        "config": {
+            "users": args.users,
+            "duration_s": args.duration,
+            "ramp_up_s": args.ramp_up,
+            "think_s": args.think_s,
+            "mix": args.mix,
+            "status_interval_s": args.status_interval_s,
+            "stream": args.stream,
+            "stream_interval_s": args.stream_interval_s,
+            "seed": args.seed,
+        },
+        "endpoints": {name: test.stats[name].summary(duration_s) for name in sorted(test.stats)},
+        "total": total.summary(duration_s),
+        "stream_events": test.stream_events,
+    }
+
+
+def print_report(report: Dict, previous: Optional[Dict] = None) -> None:
+    header = f"{'endpoint':34s} {'reqs':>7s} {'rps':>8s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'errors':>7s}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for name, row in rows:
+        print(
+            f"{name:34s} {row['requests']:>7,d} {row['rps']:>8.1f} {row['p50_ms']:>7.1f}ms "
+            f"{row['p95_ms']:>7.1f}ms {row['p99_ms']:>7.1f}ms {row['error_rate']:>6.1%}"
+        )
+        if previous is None:
+            continue
+        before = previous["total"] if name == "TOTAL" else previous["endpoints"].get(name)
+        if before:
+            print(
+                f"{'  vs ' + (previous.get('label') or 'previous'):34s} {'':>7s} "
+                f"{_change(row['rps'], before['rps']):>8s} {_change(row['p50_ms'], before['p50_ms']):>9s} "
+                f"{_change(row['p95_ms'], before['p95_ms']):>9s} {_change(row['p99_ms'], before['p99_ms']):>9s} "
+                f"{row['error_rate'] - before['error_rate']:>+6.1%}"
+            )
+
+
+    if report["config"]["stream"] == "sse":
+        events = report["stream_events"]
+        print(f"\nLive feed: {events:,} events delivered ({events / report['config']['duration_s']:.1f}/s)")
+
+
+def _change(current: float, before: float) -> str:
+    return f"{(current - before) / before:+.0%}" if before else "-"
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+async def run(args: argparse.Namespace) -> Dict:
+    timeout = httpx.Timeout(args.timeout_s)
+    limits = httpx.Limits(max_connections=args.users * 3, max_keepalive_connections=args.users * 3)
+    if args.in_process:
+        from api.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                   timeout=timeout)
+    else:
+        client = httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits)
+
+    async with client:
+        test = LoadTest(client, args)
+        start = time.monotonic()
+        test.measure_from = start + args.ramp_up
+        test.stop_at = test.measure_from + args.duration
+        # Users join evenly over the ramp-up
+        delays = [args.ramp_up * i / args.users for i in range(args.users)]
+        await asyncio.gather(*(user(test, i, delay, args.mix) for i, delay in enumerate(delays)))
+
+    return build_report(test, args.duration)
+
+
+def main() -> int:
+    """Command-line load test."""
+    parser = argparse.ArgumentParser(description="Load-test the dashboard API")
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL")
+    parser.add_argument("--in-process", action="store_true", help="Drive api.main:app in this process")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent dashboard users")
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds (after ramp-up)")
+    parser.add_argument("--ramp-up", type=float, default=10, help="Seconds over which users join")
+    parser.add_argument("--think-s", type=float, default=5, help="Mean think time between tab opens")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Tab weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--status-interval-s", type=float, default=2, help="Status poll interval, 0 to disable")
+    parser.add_argument("--stream", choices=("sse", "poll", "off"), default="sse",
+                        help="Live feed: SSE subscription (like the UI), polling fallback, or none")
+    parser.add_argument("--stream-interval-s", type=float, default=4, help="Stream poll interval (--stream poll)")
+    parser.add_argument("--timeout-s", type=float, default=10, help="Per-request timeout")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed (same seed, same user behaviour)")
+    parser.add_argument("--label", help="Describes this run's configuration, e.g. \"workers=4\"")
+    parser.add_argument("--output", "-o", type=Path, help="Write the report as JSON")
+    parser.add_argument("--compare", type=Path, help="Earlier --output report to compare with")
+    args = parser.parse_args()
+
+    if args.users < 1 or args.duration <= 0:
+        parser.error("--users and --duration must be positive")
+    if args.stream == "poll" and args.stream_interval_s <= 0:
+        parser.error("--stream-interval-s must be positive")
+    if args.in_process and args.stream == "sse":
+        print("--in-process can't hold SSE connections open; polling the feed instead")
+        args.stream = "poll"
+    previous = json.loads(args.compare.read_text()) if args.compare else None
+
+    target = "api.main:app (in process)" if args.in_process else args.url
+    print(f"{args.users} users against {target} for {args.ramp_up:g}s ramp-up + {args.duration:g}s\n")
+    report = asyncio.run(run(args))
+    print_report(report, previous)
+    if previous:
+        differences = [
+            f"{key} {previous['config'].get(key)} -> {value}"
+            for key, value in report["config"].items()
+            if previous["config"].get(key) != value
+        ]
+        if differences:
+            print(f"\nNote: the load itself differs from the compared run ({'; '.join(differences)})")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
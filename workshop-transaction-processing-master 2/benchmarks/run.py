@@ -0,0 +1,149 @@
+"""
+Benchmark Runner
+
+Times every processor module, the consumer dispatch path, the
+Transactions read path, /api/spending/range, vector search and the
+per-message cost of logging, then compares the results with a JSON
+baseline (benchmarks/baselines/<backend>.json) and exits 1 on
+regressions. A benchmark that fails, or a baseline entry without a
+result, is a regression too.
+
+Timings only compare on the machine that recorded them, so baselines
+aren't committed: record one with --save-baseline before making changes.
+--quick runs are too short to gate on timings; they report the changes
+and fail only on failed or missing benchmarks.
+
+The benchmarks write synthetic transactions (ids "tx_bench_*") to the
+configured Redis (REDIS_HOST/REDIS_PORT): point them at a scratch
+instance. --backend memory runs them against the in-process MemoryRedis
+instead, timing Python overhead alone.
+
+Usage:
+    python -m benchmarks.run --save-baseline         # record this machine's baseline
+    python -m benchmarks.run                         # run all, compare with baseline
+    python -m benchmarks.run --only 'dispatch/*' --only 'module/*'
+    python -m benchmarks.run --backend memory --quick
+"""
+
+import argparse
+import fnmatch
+import os
+import sys
+import time
+from pathlib import Path
+
+# Allow running as a script from the benchmarks/ directory
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.harness import REGRESSIONS, compare, format_duration, load_baseline, measure, results_document, save_results
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+DEFAULT_THRESHOLD = 0.2
+
+
+def main() -> int:
+    """Command-line benchmark run."""
+    parser = argparse.ArgumentParser(description="Benchmark the transaction processor and API")
+    parser.add_argument("--backend", choices=("redis", "memory"),
+                        default=os.getenv("REDIS_BACKEND", "redis"))
+    parser.add_argument("--only", action="append", metavar="GLOB",
+                        help="Only benchmarks matching this pattern (repeatable)")
+    parser.add_argument("--baseline", type=Path,
+                        help="Baseline file (default: benchmarks/baselines/<backend>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline (refused if any benchmark fails)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Slowdown that counts as a regression (default: 0.2 = 20%%)")
+    parser.add_argument("--output", "-o", type=Path, help="Also write the results to this file")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-round-s", type=float, default=0.2, help="Minimum duration of a round")
+    parser.add_argument("--seed", type=int, default=2000, help="Transactions of history to seed")
+    parser.add_argument("--search-docs", type=int, default=200, help="Seeded transactions given embeddings")
+    parser.add_argument("--quick", action="store_true",
+                        help="Fewer, shorter rounds and less history; slowdowns are reported, not gated")
+    parser.add_argument("--flush", action="store_true", help="FLUSHDB before seeding")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.rounds, args.min_round_s, args.seed = 3, 0.05, min(args.seed, 500)
+    baseline_path = args.baseline or BASELINE_DIR / f"{args.backend}.json"
+
+    # Read by lib.redis_client on import
+    os.environ["REDIS_BACKEND"] = args.backend
+    from benchmarks import suites
+    from lib.redis_client import get_redis
+
+    redis = get_redis()
+    if args.flush:
+        redis.flushdb()
+
+    t0 = time.perf_counter()
+    ctx = suites.prepare(redis, seed=args.seed, search_docs=args.search_docs)
+    print(f"Seeded {args.seed:,} transactions in {time.perf_counter() - t0:.1f}s ({args.backend} backend)\n")
+
+    def selected(name: str) -> bool:
+        return not args.only or any(fnmatch.fnmatchcase(name, pattern) for pattern in args.only)
+
+    results, skipped, failed = [], {}, {}
+    for benchmark in suites.all_benchmarks(ctx):
+        if not selected(benchmark.name):
+            continue
+        if benchmark.skip:
+            skipped[benchmark.name] = benchmark.skip
+            print(f"{benchmark.name:48s} skipped: {benchmark.skip}")
+            continue
+        try:
+            result = measure(benchmark.name, benchmark.fn, benchmark.ops, args.rounds, args.min_round_s)
+        except Exception as e:
+            failed[benchmark.name] = str(e).splitlines()[0] if str(e) else type(e).__name__
+            print(f"{benchmark.name:48s} failed: {failed[benchmark.name]}")
+            continue
+        results.append(result)
+        print(f"{result.name:48s} {format_duration(result.median_us):>10s}/op {result.ops_per_s:>12,.0f} ops/s")
+
+    document = results_document(results, skipped, args.backend, failed)
+    if args.output:
+        save_results(args.output, document)
+
+    if args.save_baseline:
+        if failed:
+            print(f"\n{len(failed)} benchmark(s) failed; baseline not written")
+            return 1
+        save_results(baseline_path, document)
+        print(f"\nBaseline written to {baseline_path}")
+        return 0
+
+    regressions = len(failed)
+    baseline = load_baseline(baseline_path)
+    if baseline is None:
+        print(f"\nNo baseline at {baseline_path}; record one with --save-baseline")
+    else:
+        print(f"\nAgainst {baseline_path} (created {baseline.get('created')}, threshold {args.threshold:.0%}):")
+        # Only the benchmarks this run selected are expected to have results
+        baseline = dict(baseline, results={
+            name: entry for name, entry in baseline.get("results", {}).items() if selected(name)
+        })
+        regressions = 0
+        for row in compare(results, baseline, args.threshold, failed, skipped):
+            # Quick timings are too noisy to gate on
+            regressions += row["status"] in REGRESSIONS and not (args.quick and row["status"] == "regression")
+            if row["status"] == "new":
+                print(f"  {row['name']:48s} new")
+            elif "reason" in row:
+                print(f"  {row['name']:48s} {row['status']}: {row['reason']}")
+            else:
+                print(
+                    f"  {row['name']:48s} {format_duration(row['baseline_us']):>10s} -> "
+                    f"{format_duration(row['median_us']):>10s} ({row['change']:+.0%}) {row['status']}"
+                )
+
+    if regressions:
+        if args.quick:
+            print(f"\n{regressions} benchmark(s) failed or missing")
+        else:
+            print(f"\n{regressions} regression(s): slower by over {args.threshold:.0%}, failed or missing")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+"""
+Benchmark definitions.
+
+Groups:
+- module/<name>: one module's process_transaction, per transaction
+  (batches of 10, like the consumer; amount_percentiles includes its
+  flush, vector_search the document store its embedding is written into)
+- dispatch/batch=<n>: consumer.dispatch_transaction for a batch of n
+  transactions plus the per-batch flush, per transaction
+- reads/recent+by_ids/limit=<n>: the Transactions tab read path,
+  get_recent_transactions then get_transactions_by_ids
+- api/spending_range/...: the /api/spending/range handler (called
+  directly: route logic and Redis, without HTTP) at several windows
+- search/embed_query, search/search_by_vector: query embedding and the
+  vector range query
+- logging/<mode>/<format>: one per-transaction log line (lib.logger)
+  written to os.devnull, per message; queue mode waits for the listener
+  to drain, so it counts the listener's work too
+
+prepare() seeds history first (spread over the last 30 days) so reads and
+ranges have realistic data to work on. Every benchmark writes fresh
+transactions (new ids, increasing timestamps), never replays old ones.
+
+Workshop steps still left as TODO stubs would time an empty function, so
+prepare() sends a probe transaction through every step and checks what it
+wrote: benchmarks built on a step that wrote nothing, or on reads that
+come back empty, are skipped with the reason.
+"""
+
+import itertools
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+# The consumer imports its modules as "modules.<name>"
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "processor"))
+
+import consumer
+from consumer import (
+    amount_percentiles,
+    customer_activity,
+    ordered_transactions,
+    spending_categories,
+    spending_over_time,
+    spending_windows,
+    store_transaction,
+    transaction_sketches,
+    vector_search,
+)
+from generator.transaction_models import generate_random_transaction
+from lib.logger import ColoredFormatter, DATE_FORMAT, TEXT_FORMAT, LogQueue, SampledLogger, Sampler, create_formatter
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+# Transactions per consumer batch (consumer BATCH_SIZE)
+MODULE_BATCH = 10
+DISPATCH_BATCH_SIZES = (1, 10, 100)
+READ_LIMITS = (10, 50, 200)
+RANGE_DAYS = (1, 7, 30)
+# Buckets the UI asks for (ui/js/timeseries.js CHART_POINTS)
+CHART_POINTS = 200
+
+# Log lines per logging benchmark call
+LOG_BATCH = 100
+
+SEARCH_QUERIES = (
+    "coffee shops",
+    "groceries in Dallas",
+    "large travel purchases",
+    "streaming subscriptions",
+)
+
+
+class Benchmark:
+    """A named callable doing `ops` operations per call, or a skip reason."""
+
+    def __init__(self, name: str, fn: Optional[Callable[[], None]] = None, ops: int = 1,
+                 skip: Optional[str] = None):
+        self.name = name
+        self.fn = fn
+        self.ops = ops
+        self.skip = skip
+
+
+class TransactionFactory:
+    """
+    Stream-shaped transactions (string values) with unique ids and
+    increasing timestamps, stamped onto a pool of generated templates so
+    generating them costs next to nothing inside a timed loop.
+    """
+
+    def __init__(self, pool_size: int = 1000):
+        self.templates = [generate_random_transaction().to_dict() for _ in range(pool_size)]
+        self.counter = itertools.count()
+        self.timestamp = int(time.time() * 1000)
+
+    def make(self, timestamp: int) -> Dict[str, str]:
+        n = next(self.counter)
+        tx = {key: str(value) for key, value in self.templates[n % len(self.templates)].items()}
+        tx["transactionId"] = f"tx_bench_{n:08d}"
+        tx["timestamp"] = str(timestamp)
+        return tx
+
+    def batch(self, size: int) -> List[Dict[str, str]]:
+        """The next `size` transactions, 1 ms apart after the newest so far."""
+        batch = []
+        for _ in range(size):
+            self.timestamp += 1
+            batch.append(self.make(self.timestamp))
+        return batch
+
+
+class Context:
+    def __init__(self, redis, transactions: TransactionFactory):
+        self.redis = redis
+        self.transactions = transactions
+        self.search_ready: Optional[str] = None
+        # Workshop steps that are still stubs: {module: skip reason}
+        self.unimplemented: Dict[str, str] = {}
+
+
+# (name, process(redis, tx)) of each processing step, in dispatch order
+def _ordered(redis, tx):
+    ordered_transactions.process_transaction(redis, tx)
+    ordered_transactions.index_transaction(redis, tx)
+
+
+def _spending_over_time(redis, tx):
+    spending_over_time.process_transaction(redis, tx)
+    spending_over_time.process_dimensions(redis, tx)
+
+
+MODULES = [
+    ("ordered_transactions", _ordered),
+    ("store_transaction", store_transaction.process_transaction),
+    ("spending_categories", spending_categories.process_transaction),
+    ("spending_over_time", _spending_over_time),
+    ("vector_search", vector_search.process_transaction),
+    ("customer_activity", customer_activity.process_transaction),
+    ("spending_windows", spending_windows.process_transaction),
+    ("transaction_sketches", transaction_sketches.process_transaction),
+    ("amount_percentiles", amount_percentiles.process_transaction),
+]
+
+# Steps a module's writes build on (JSON.SET of a path needs the document)
+PREREQUISITES = {"vector_search": [store_transaction.process_transaction]}
+
+# What each workshop step (one with TODOs) writes for a transaction
+WRITES = {
+    "ordered_transactions": lambda redis, tx: redis.lindex("transactions:ordered", 0) == tx["transactionId"],
+    "store_transaction": lambda redis, tx: redis.exists(f"transaction:{tx['transactionId']}"),
+    "spending_categories": lambda redis, tx: redis.zscore("spending:categories", tx["category"]) is not None,
+    "spending_over_time": lambda redis, tx: redis.exists(spending_over_time.TIMESERIES_KEY),
+    "vector_search": lambda redis, tx: bool(redis.json().get(f"transaction:{tx['transactionId']}", "$.embedding")),
+}
+
+
+def find_unimplemented(redis, tx: Dict[str, str]) -> Dict[str, str]:
+    """
+    Run `tx` through every step and return the workshop steps that wrote
+    nothing, with a skip reason. A step that raises is left in: its
+    benchmark fails and reports the error.
+    """
+    unimplemented = {}
+    for name, process in MODULES:
+        try:
+            for prerequisite in PREREQUISITES.get(name, ()):
+                prerequisite(redis, tx)
+            process(redis, tx)
+        except Exception:
+            continue
+        check = WRITES.get(name)
+        if check is not None and not check(redis, tx):
+            unimplemented[name] = f"not implemented: {name}.process_transaction wrote nothing"
+    amount_percentiles.flush(redis)
+    return unimplemented
+
+
+def prepare(redis, seed: int = 2000, search_docs: int = 200) -> Context:
+    """
+    Create the sketches and index the consumer creates at startup, then
+    seed `seed` transactions over the last 30 days (the newest
+    `search_docs` of them with embeddings) and add the compaction rules,
+    which need the spending series the seed writes.
+    """
+    transaction_sketches.ensure_sketches(redis)
+
+    ctx = Context(redis, TransactionFactory())
+    try:
+        vector_search.create_index(redis)
+        # create_index() also returns False for an up-to-date index: check it exists
+        redis.ft(vector_search.schema["index"]["name"]).info()
+    except Exception as e:
+        ctx.search_ready = f"vector index unavailable: {str(e).splitlines()[0]}"
+
+    start = ctx.transactions.timestamp - 30 * DAY_MS
+    step = 30 * DAY_MS // max(seed, 1)
+    for i in range(seed):
+        tx = ctx.transactions.make(start + i * step)
+        for name, process in MODULES:
+            if name != "vector_search" or (i >= seed - search_docs and ctx.search_ready is None):
+                process(redis, tx)
+        if i % MODULE_BATCH == MODULE_BATCH - 1:
+            amount_percentiles.flush(redis)
+    amount_percentiles.flush(redis)
+    ctx.unimplemented = find_unimplemented(redis, ctx.transactions.batch(1)[0])
+    spending_over_time.ensure_compactions(redis)
+    return ctx
+
+
+def module_benchmarks(ctx: Context) -> Iterator[Benchmark]:
+    redis, transactions = ctx.redis, ctx.transactions
+    for name, process in MODULES:
+        if name in ctx.unimplemented:
+            yield Benchmark(f"module/{name}", skip=ctx.unimplemented[name])
+            continue
+
+        def run(process=process, name=name):
+            for tx in transactions.batch(MODULE_BATCH):
+                for prerequisite in PREREQUISITES.get(name, ()):
+                    prerequisite(redis, tx)
+                process(redis, tx)
+            if name == "amount_percentiles":
+                amount_percentiles.flush(redis)
+        yield Benchmark(f"module/{name}", run, MODULE_BATCH)
+
+
+def dispatch_benchmarks(ctx: Context) -> Iterator[Benchmark]:
+    redis, transactions = ctx.redis, ctx.transactions
+    for size in DISPATCH_BATCH_SIZES:
+        def run(size=size):
+            for tx in transactions.batch(size):
+                consumer.dispatch_transaction(redis, tx)
+            amount_percentiles.flush(redis)
+        yield Benchmark(f"dispatch/batch={size}", run, size)
+
+
+def read_benchmarks(ctx: Context) -> Iterator[Benchmark]:
+    redis = ctx.redis
+    skip = next((ctx.unimplemented[name] for name in ("ordered_transactions", "store_transaction")
+                 if name in ctx.unimplemented), None)
+    if skip is None and not store_transaction.get_transactions_by_ids(
+        redis, ordered_transactions.get_recent_transactions(redis, 1)
+    ):
+        skip = "not implemented: get_recent_transactions/get_transactions_by_ids returned nothing"
+    for limit in READ_LIMITS:
+        name = f"reads/recent+by_ids/limit={limit}"
+        if skip:
+            yield Benchmark(name, skip=skip)
+            continue
+
+        def run(limit=limit):
+            tx_ids = ordered_transactions.get_recent_transactions(redis, limit)
+            if not store_transaction.get_transactions_by_ids(redis, tx_ids):
+                raise RuntimeError(f"no transactions read for {len(tx_ids)} ids")
+        yield Benchmark(name, run)
+
+
+def _spending_range(redis, **params) -> Callable[[], None]:
+    from api.routers import timeseries
+
+    def run():
+        result = timeseries.get_spending_range(redis=redis, cached_redis=redis, **params)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        if not result["transactions"]:
+            raise RuntimeError("no spending in range")
+    return run
+
+
+def api_benchmarks(ctx: Context) -> Iterator[Benchmark]:
+    redis = ctx.redis
+    skip = ctx.unimplemented.get("spending_over_time")
+    if skip:
+        for name in [f"api/spending_range/days={days}" for days in RANGE_DAYS] + [
+            "api/spending_range/days=7/group_by=category", "api/spending_range/days=1/raw",
+        ]:
+            yield Benchmark(name, skip=skip)
+        return
+
+    for days in RANGE_DAYS:
+        yield Benchmark(
+            f"api/spending_range/days={days}",
+            _spending_range(redis, days=days, points=CHART_POINTS),
+        )
+    yield Benchmark(
+        "api/spending_range/days=7/group_by=category",
+        _spending_range(redis, days=7, points=CHART_POINTS, group_by="category"),
+    )
+    latest = redis.ts().get(spending_over_time.TIMESERIES_KEY)[0]
+    if spending_over_time.get_spending_in_range(redis, latest - DAY_MS, latest):
+        yield Benchmark("api/spending_range/days=1/raw", _spending_range(redis, days=1))
+    else:
+        yield Benchmark("api/spending_range/days=1/raw",
+                        skip="not implemented: get_spending_in_range returned nothing")
+
+
+def search_benchmarks(ctx: Context) -> Iterator[Benchmark]:
+    queries = itertools.cycle(SEARCH_QUERIES)
+    yield Benchmark("search/embed_query", lambda: vector_search.embed_query(next(queries)))
+
+    name = "search/search_by_vector"
+    if ctx.search_ready is not None:
+        yield Benchmark(name, skip=ctx.search_ready)
+        return
+    vectors = []
+
+    def run():
+        # Embedded on the (untimed) warm-up call, so filtered-out runs don't pay for it
+        if not vectors:
+            vectors.extend(vector_search.embed_query(query) for query in SEARCH_QUERIES)
+        vector_search.search_by_vector(ctx.redis, vectors[next(counter) % len(vectors)], limit=10)
+
+    counter = itertools.count()
+    yield Benchmark(name, run)
+
+
+def _log_benchmark(name: str, handler: logging.Handler, level: int = logging.INFO,
+                   after: Optional[Callable[[], None]] = None, sample_rate: float = 1.0) -> Benchmark:
+    logger = logging.getLogger(f"benchmarks.{name}")
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    if sample_rate < 1:
+        logger = SampledLogger(logger, Sampler(sample_rate))
+    tx = generate_random_transaction().to_dict()
+    extra = {"transactionId": tx["transactionId"], "customerId": tx["customerId"], "amount": tx["amount"]}
+
+    def run():
+        # The generator's per-transaction line
+        for count in range(LOG_BATCH):
+            logger.info(
+                "💳 [%6d] %s | %-25.25s | $%8.2f | %s | %-12s",
+                count, tx["transactionId"], tx["merchant"], tx["amount"], tx["customerId"], tx["category"],
+                extra=extra,
+            )
+        if after is not None:
+            after()
+    return Benchmark(name, run, LOG_BATCH)
+
+
+def logging_benchmarks(ctx: Context) -> Iterator[Benchmark]:
+    devnull = open(os.devnull, "w")
+
+    def stream(formatter: logging.Formatter) -> logging.Handler:
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(formatter)
+        return handler
+
+    yield _log_benchmark("logging/sync/text", stream(create_formatter("text", devnull)))
+    yield _log_benchmark("logging/sync/text+color", stream(ColoredFormatter(TEXT_FORMAT, DATE_FORMAT)))
+    yield _log_benchmark("logging/sync/json", stream(create_formatter("json")))
+    for fmt in ("text", "json"):
+        log_queue = LogQueue(stream(create_formatter(fmt, devnull)), maxsize=0)
+        yield _log_benchmark(f"logging/queue/{fmt}", log_queue.handler(), after=log_queue.queue.join)
+
+    yield _log_benchmark("logging/sync/json/sampled=0.1", stream(create_formatter("json")), sample_rate=0.1)
+    yield _log_benchmark("logging/disabled", stream(create_formatter("json")), level=logging.WARNING)
+
+
+GROUPS = [module_benchmarks, dispatch_benchmarks, read_benchmarks, api_benchmarks, search_benchmarks,
+          logging_benchmarks]
+
+
+def all_benchmarks(ctx: Context) -> Iterator[Benchmark]:
+    for group in GROUPS:
+        yield from group(ctx)
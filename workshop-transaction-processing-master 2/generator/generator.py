@@ -19,9 +19,11 @@ from typing import Optional
 import signal
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from lib.redis_client import get_redis, close_redis
-from lib.logger import setup_logger
+from lib.logger import setup_logger, setup_transaction_logger
 from transaction_models import generate_random_transaction
 logger = setup_logger(__name__)
+# Per-transaction lines: sampled/rate-limited per LOG_TX_SAMPLE_RATE/LOG_TX_RATE_LIMIT
+tx_logger = setup_transaction_logger(__name__)
 shutdown_requested = False
 
 def print_startup_banner(stream_key: str, delay: float, num_customers: int) -> None:
@@ -39,16 +41,21 @@ def print_startup_banner(stream_key: str, delay: float, num_customers: int) -> N
     logger.info("Starting transaction stream... (Press Ctrl+C to stop)")
     logger.info("-" * 70)
 
-def format_transaction_log(tx, count: int) -> str:
+# Transaction log line: merchant, amount, customer and category in columns
+TRANSACTION_LOG_FORMAT = "💳 [%6d] %s | %-25.25s | $%8.2f | %s | %-12s"
+
+
+def log_transaction(tx, count: int) -> None:
     """
-    Format transaction for logging with color coding based on amount.
+    Log a published transaction.
+
+    The arguments are formatted only if the line is written (not sampled
+    out), and also passed as fields for LOG_FORMAT=json.
     """
-    merchant_str = f"{tx.merchant[:25]:25s}"
-    amount_str = f"${tx.amount:8.2f}"
-    return (
-        f"[{count:6d}] {tx.transactionId} | "
-        f"{merchant_str} | {amount_str} | "
-        f"{tx.customerId} | {tx.category:12s}"
+    tx_logger.info(
+        TRANSACTION_LOG_FORMAT,
+        count, tx.transactionId, tx.merchant, tx.amount, tx.customerId, tx.category,
+        extra={"transactionId": tx.transactionId, "customerId": tx.customerId, "amount": tx.amount},
     )
 
 
@@ -104,8 +111,7 @@ def main() -> int:
 
                 if msg_id:
                     count += 1
-                    log_msg = format_transaction_log(tx, count)
-                    logger.info(f"💳 {log_msg}")
+                    log_transaction(tx, count)
 
                 else:
                     error_count += 1
@@ -2,12 +2,30 @@
 Library modules for the Redis transaction workshop.
 """
 
-from .redis_client import get_redis, close_redis, reset_redis_client
+from .redis_client import (
+    get_redis,
+    get_cached_redis,
+    client_cache_stats,
+    replica_status,
+    close_redis,
+    reset_redis_client,
+    is_cluster,
+    group_keys_by_slot,
+)
+from .memory_backend import MemoryRedis
 from .logger import setup_logger
+from .cache import TTLCache
 
 __all__ = [
     "get_redis",
+    "get_cached_redis",
+    "client_cache_stats",
+    "replica_status",
     "close_redis",
     "reset_redis_client",
+    "is_cluster",
+    "group_keys_by_slot",
+    "MemoryRedis",
     "setup_logger",
+    "TTLCache",
 ]
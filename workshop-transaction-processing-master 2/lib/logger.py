@@ -1,13 +1,40 @@
 """
 Logging utility for the transaction workshop.
 
-Provides colorized console logging with configurable log levels.
+Provides console logging with configurable log levels, chosen by
+environment:
+
+- LOG_FORMAT: "text" (default; colorized when stdout is a TTY, or per
+  LOG_COLOR=true/false) or "json" (one object per line)
+- LOG_MODE: "sync" (default; records are written by the logging thread)
+  or "queue" (records go on a bounded queue and one listener thread
+  formats and writes them, so slow stdout never blocks the caller)
+- LOG_TX_SAMPLE_RATE / LOG_TX_RATE_LIMIT: sampling (0-1) and a
+  per-second cap for per-transaction messages (setup_transaction_logger)
 """
 
+import atexit
+import itertools
 import logging
 import os
+import queue
 import sys
-from typing import Optional
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import IO, Optional
+
+import orjson
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_MODE = os.getenv("LOG_MODE", "sync").lower()
+LOG_COLOR = os.getenv("LOG_COLOR")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+TX_SAMPLE_RATE = float(os.getenv("LOG_TX_SAMPLE_RATE", "1"))
+TX_RATE_LIMIT = float(os.getenv("LOG_TX_RATE_LIMIT", "0"))
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 # ANSI color codes
 COLORS = {
@@ -23,8 +50,22 @@ COLORS = {
 class ColoredFormatter(logging.Formatter):
     """
     Custom formatter that adds colors to log levels.
+
+    Keeps one plain formatter per level, with the colored level name
+    baked into its format string, so records are never modified.
     """
 
+    def __init__(self, fmt: Optional[str] = None, datefmt: Optional[str] = None):
+        super().__init__(fmt=fmt, datefmt=datefmt)
+        self._level_formatters = {
+            level: logging.Formatter(
+                fmt=self._fmt.replace("%(levelname)s", f"{color}{level}{COLORS['RESET']}"),
+                datefmt=datefmt,
+            )
+            for level, color in COLORS.items()
+            if level != "RESET"
+        }
+
     def format(self, record: logging.LogRecord) -> str:
         """
         Format the log record with colors.
@@ -35,31 +76,236 @@ class ColoredFormatter(logging.Formatter):
         Returns:
             str: Formatted and colorized log message
         """
-        # Save original levelname
-        levelname = record.levelname
+        formatter = self._level_formatters.get(record.levelname)
+        if formatter is None:
+            return super().format(record)
+        return formatter.format(record)
 
-        # Add color to levelname
-        if levelname in COLORS:
-            record.levelname = (
-                f"{COLORS[levelname]}{levelname}{COLORS['RESET']}"
-            )
 
-        # Format the message
-        formatted = super().format(record)
+# LogRecord attributes that aren't `extra` fields
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line.
+
+    Fields passed with `extra=` are included as top-level keys.
+
+    Example:
+        >>> logger.info("Published", extra={"transactionId": tx_id})
+        {"ts": "2024-01-01T12:00:00.123Z", "level": "INFO", "logger": "generator", "message": "Published", "transactionId": "tx_0001"}
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format the log record as JSON.
+
+        Args:
+            record: The log record to format
+
+        Returns:
+            str: One line of JSON
+        """
+        document = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                document[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            document["exc_info"] = record.exc_text
+        if record.stack_info:
+            document["stack_info"] = record.stack_info
+        return orjson.dumps(document, default=str).decode()
+
+
+def create_formatter(fmt: str = LOG_FORMAT, stream: Optional[IO] = None) -> logging.Formatter:
+    """
+    Formatter for LOG_FORMAT.
+
+    Args:
+        fmt: "text" or "json"
+        stream: Where the output goes; text is colorized only for a TTY
+                (unless LOG_COLOR is set)
+
+    Returns:
+        logging.Formatter: JsonFormatter, ColoredFormatter or plain Formatter
+    """
+    if fmt == "json":
+        return JsonFormatter()
+    if LOG_COLOR is not None:
+        color = LOG_COLOR.lower() == "true"
+    else:
+        isatty = getattr(stream or sys.stdout, "isatty", None)
+        color = bool(isatty and isatty())
+    if color:
+        return ColoredFormatter(fmt=TEXT_FORMAT, datefmt=DATE_FORMAT)
+    return logging.Formatter(fmt=TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Enqueues records with only their message merged; formatting and I/O
+    happen on the listener thread. Drops records when the queue is full.
+    """
+
+    def __init__(self, log_queue: "LogQueue"):
+        super().__init__(log_queue.queue)
+        self.log_queue = log_queue
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may change later) and render the traceback
+        # while its frames exist; loggers have this one handler, so the
+        # record is changed in place rather than copied
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _TRACEBACK_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.log_queue.dropped += 1
+
 
-        # Restore original levelname
-        record.levelname = levelname
+_TRACEBACK_FORMATTER = logging.Formatter()
 
-        return formatted
+
+class _QueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room rather than fail when the queue is full
+        self.queue.put(self._sentinel)
+
+
+class LogQueue:
+    """
+    Bounded queue drained into `handler` by one listener thread.
+
+    Args:
+        handler: The handler that formats and writes records
+        maxsize: Records the queue holds before new ones are dropped
+                 (0: unbounded)
+
+    Example:
+        >>> log_queue = LogQueue(logging.StreamHandler(sys.stdout))
+        >>> logger.addHandler(log_queue.handler())
+    """
+
+    def __init__(self, handler: logging.Handler, maxsize: int = LOG_QUEUE_SIZE):
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.target = handler
+        self.dropped = 0
+        self._listener = _QueueListener(self.queue, handler)
+        self._listener.start()
+        self._stopped = False
+
+    def handler(self) -> logging.Handler:
+        """A new handler feeding this queue."""
+        return _QueueHandler(self)
+
+    def stop(self) -> None:
+        """Write out the queued records and stop the listener thread."""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._listener.stop()
+        if self.dropped:
+            print(f"Logging: {self.dropped} records dropped (queue full)", file=sys.stderr)
+
+
+class Sampler:
+    """
+    Admits `rate` of the messages (every round(1/rate)-th one) and at most
+    `max_per_second` per second (0: no limit).
+    """
+
+    def __init__(self, rate: float = 1.0, max_per_second: float = 0):
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self.max_per_second = max_per_second
+        self.suppressed = 0
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._tokens = max_per_second
+        self._refilled = time.monotonic()
+
+    def admit(self) -> bool:
+        """Whether to log this message; counts the ones it suppresses."""
+        if not self.every or next(self._counter) % self.every:
+            self.suppressed += 1
+            return False
+        if self.max_per_second > 0:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.max_per_second,
+                    self._tokens + (now - self._refilled) * self.max_per_second,
+                )
+                self._refilled = now
+                if self._tokens < 1:
+                    self.suppressed += 1
+                    return False
+                self._tokens -= 1
+        return True
+
+
+class SampledLogger(logging.LoggerAdapter):
+    """
+    Logger that drops the messages its Sampler doesn't admit before a
+    record is created, so they cost next to nothing.
+
+    Messages that are logged carry the number suppressed since the
+    previous one in a `suppressed` field (shown in JSON output).
+    """
+
+    def __init__(self, logger: logging.Logger, sampler: Sampler):
+        super().__init__(logger, {})
+        self.sampler = sampler
+
+    def isEnabledFor(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level) and self.sampler.admit()
+
+    def process(self, msg, kwargs):
+        suppressed, self.sampler.suppressed = self.sampler.suppressed, 0
+        if suppressed:
+            kwargs["extra"] = {**(kwargs.get("extra") or {}), "suppressed": suppressed}
+        return msg, kwargs
+
+
+_log_queue: Optional[LogQueue] = None
+_log_queue_lock = threading.Lock()
+
+
+def _shared_log_queue() -> LogQueue:
+    """The process's LogQueue writing to stdout, started on first use."""
+    global _log_queue
+    with _log_queue_lock:
+        if _log_queue is None:
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(create_formatter(LOG_FORMAT, sys.stdout))
+            _log_queue = LogQueue(handler)
+            atexit.register(_log_queue.stop)
+        return _log_queue
 
 
 def setup_logger(name: str, level: Optional[str] = None) -> logging.Logger:
     """
-    Set up a logger with colorized console output.
+    Set up a logger with console output.
 
     Creates a logger with the specified name and configures it with
-    a colorized formatter. The log level can be specified or will be
-    read from the LOG_LEVEL environment variable.
+    the LOG_FORMAT formatter, writing directly or (LOG_MODE=queue)
+    through the shared log queue. The log level can be specified or
+    will be read from the LOG_LEVEL environment variable.
 
     Args:
         name: The name of the logger (typically __name__)
@@ -94,17 +340,14 @@ def setup_logger(name: str, level: Optional[str] = None) -> logging.Logger:
     # Remove existing handlers to avoid duplicates
     logger.handlers.clear()
 
-    # Create console handler
-    console_handler = logging.StreamHandler(sys.stdout)
+    # Create console handler: direct, or through the shared queue
+    if LOG_MODE == "queue":
+        console_handler = _shared_log_queue().handler()
+    else:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(create_formatter(LOG_FORMAT, sys.stdout))
     console_handler.setLevel(numeric_level)
 
-    # Create formatter
-    formatter = ColoredFormatter(
-        fmt="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    console_handler.setFormatter(formatter)
-
     # Add handler to logger
     logger.addHandler(console_handler)
 
@@ -114,6 +357,33 @@ def setup_logger(name: str, level: Optional[str] = None) -> logging.Logger:
     return logger
 
 
+def setup_transaction_logger(
+    name: str,
+    sample_rate: float = TX_SAMPLE_RATE,
+    max_per_second: float = TX_RATE_LIMIT,
+) -> SampledLogger:
+    """
+    Set up a logger for per-transaction messages, sampled and rate-limited.
+
+    Dropped messages are never formatted; pass the message arguments
+    separately (logger.info("%s", tx_id)) so that holds for them too.
+
+    Args:
+        name: The name of the parent logger; the logger is "<name>.transactions"
+        sample_rate: Share of messages kept (LOG_TX_SAMPLE_RATE, default: 1)
+        max_per_second: Cap on messages per second (LOG_TX_RATE_LIMIT, default: 0 = none)
+
+    Returns:
+        SampledLogger: Configured logger adapter
+
+    Example:
+        >>> tx_logger = setup_transaction_logger("generator")
+        >>> tx_logger.info("Published %s", tx.transactionId)
+    """
+    logger = setup_logger(f"{name}.transactions")
+    return SampledLogger(logger, Sampler(sample_rate, max_per_second))
+
+
 def get_log_level() -> str:
     """
     Get the current log level from environment.
@@ -0,0 +1,1274 @@
+"""
+In-memory storage backend for the transaction workshop.
+
+MemoryRedis implements, in process, the subset of the redis-py client API
+that the processor modules, the consumer and the API routers use, so
+module logic and the dispatch path can be benchmarked (or poked at)
+without a Redis server. Enable it with REDIS_BACKEND=memory, which makes
+get_redis() return a shared MemoryRedis instead of a network client.
+
+Supported, with redis-py's return shapes (decode_responses=True):
+- Keys: exists, delete, expire, pexpire, ttl, keys, scan_iter
+- Strings: get, set, incrby
+- Lists: lpush, rpush, ltrim, lrange, lindex, llen
+- Sorted Sets: zadd, zincrby, zscore, zcard, zrange, zrevrange,
+  zrangebyscore, zrevrangebyscore, zremrangebyscore, zunionstore
+- HyperLogLog: pfadd, pfcount (exact counts)
+- Streams: xadd, xlen, xrange, xrevrange, xread, xgroup_create,
+  xreadgroup, xack, xinfo_groups, xinfo_consumers, xpending, xpending_range
+- JSON: json().set/get/mget with "$", "$.a.b" and legacy paths
+- TimeSeries: ts().create/add/madd/get/range/revrange/createrule/mrange,
+  with bucket aggregation, compaction rules (closed buckets only, open
+  bucket with latest=True; samples appended before a rule aren't in its
+  open bucket until one of that bucket is updated), label filters and
+  GROUPBY ... REDUCE
+- TopK / Count-Min Sketch / t-digest: same commands, exact answers
+- Pipelines: queued calls run in order on execute()
+
+Search (ft()) and any other command raise ResponseError("unknown command"),
+as a Redis server without the module would.
+
+Example:
+    >>> r = MemoryRedis()
+    >>> r.zincrby("spending:categories", 12.5, "dining")
+    12.5
+    >>> r.zrevrange("spending:categories", 0, 9, withscores=True)
+    [('dining', 12.5)]
+"""
+
+import bisect
+import fnmatch
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from redis.exceptions import ResponseError
+
+WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+_INF = float("inf")
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _score_bound(value) -> Tuple[float, bool]:
+    """ZRANGEBYSCORE bound -> (score, exclusive)."""
+    if isinstance(value, str):
+        text = value.strip()
+        exclusive = text.startswith("(")
+        if exclusive:
+            text = text[1:]
+        if text in ("-inf", "+inf", "inf"):
+            return (-_INF if text == "-inf" else _INF), exclusive
+        return float(text), exclusive
+    return float(value), False
+
+
+def _in_bounds(score: float, low: Tuple[float, bool], high: Tuple[float, bool]) -> bool:
+    (low_score, low_excl), (high_score, high_excl) = low, high
+    above = score > low_score if low_excl else score >= low_score
+    below = score < high_score if high_excl else score <= high_score
+    return above and below
+
+
+def _slice(items: list, start: int, end: int) -> list:
+    """LRANGE/ZRANGE index semantics: inclusive end, negative from the tail."""
+    n = len(items)
+    if start < 0:
+        start = max(n + start, 0)
+    if end < 0:
+        end = n + end
+    return items[start:end + 1] if start <= end else []
+
+
+# ---------------------------------------------------------------------------
+# Streams
+# ---------------------------------------------------------------------------
+
+def _parse_stream_id(value, default_seq: int = 0) -> Tuple[int, int]:
+    if isinstance(value, tuple):
+        return value
+    text = str(value)
+    if text == "-":
+        return (0, 0)
+    if text == "+":
+        return (2 ** 63, 2 ** 63)
+    ms, _, seq = text.partition("-")
+    return (int(ms), int(seq) if seq else default_seq)
+
+
+def _format_stream_id(stream_id: Tuple[int, int]) -> str:
+    return f"{stream_id[0]}-{stream_id[1]}"
+
+
+class _Stream:
+    def __init__(self):
+        self.ids: List[Tuple[int, int]] = []
+        self.fields: List[Dict[str, str]] = []
+        # group -> {"last": id, "pending": {id: [consumer, delivered ms, deliveries]},
+        #           "consumers": {consumer: last seen ms}}
+        self.groups: Dict[str, Dict] = {}
+        self.last_id: Tuple[int, int] = (0, 0)
+
+    def add(self, fields: Dict, stream_id="*", maxlen: Optional[int] = None) -> str:
+        if stream_id == "*":
+            ms = _now_ms()
+            if ms > self.last_id[0]:
+                new_id = (ms, 0)
+            else:
+                new_id = (self.last_id[0], self.last_id[1] + 1)
+        else:
+            new_id = _parse_stream_id(stream_id)
+            if new_id <= self.last_id:
+                raise ResponseError(
+                    "ERR The ID specified in XADD is equal or smaller than the target stream top item"
+                )
+        self.ids.append(new_id)
+        self.fields.append({str(k): str(v) for k, v in fields.items()})
+        self.last_id = new_id
+        if maxlen is not None and len(self.ids) > maxlen:
+            del self.ids[:len(self.ids) - maxlen]
+            del self.fields[:len(self.fields) - maxlen]
+        return _format_stream_id(new_id)
+
+    def after(self, stream_id: Tuple[int, int], count: Optional[int]) -> List[Tuple[str, Dict]]:
+        start = bisect.bisect_right(self.ids, stream_id)
+        stop = len(self.ids) if count is None else min(len(self.ids), start + count)
+        return [(_format_stream_id(self.ids[i]), dict(self.fields[i])) for i in range(start, stop)]
+
+    def get(self, stream_id: Tuple[int, int]) -> Optional[Dict]:
+        i = bisect.bisect_left(self.ids, stream_id)
+        if i < len(self.ids) and self.ids[i] == stream_id:
+            return dict(self.fields[i])
+        return None
+
+
+# ---------------------------------------------------------------------------
+# TimeSeries
+# ---------------------------------------------------------------------------
+
+def _aggregate(aggregation: str, values: List[float]) -> float:
+    aggregation = aggregation.lower()
+    if aggregation == "sum":
+        return float(sum(values))
+    if aggregation == "count":
+        return float(len(values))
+    if aggregation == "avg":
+        return float(sum(values)) / len(values)
+    if aggregation == "min":
+        return float(min(values))
+    if aggregation == "max":
+        return float(max(values))
+    if aggregation == "range":
+        return float(max(values) - min(values))
+    if aggregation == "first":
+        return float(values[0])
+    if aggregation == "last":
+        return float(values[-1])
+    raise ResponseError(f"TSDB: Unknown aggregation type {aggregation}")
+
+
+def _time_bound(value, default: float) -> float:
+    if value in ("-", "+", None):
+        return default
+    return int(value)
+
+
+class _Rule:
+    """Compaction rule: writes each closed bucket of the source to dest."""
+
+    def __init__(self, dest: str, aggregation: str, bucket_ms: int):
+        self.dest = dest
+        self.aggregation = aggregation
+        self.bucket_ms = bucket_ms
+        self.open_bucket: Optional[int] = None
+        self.open_values: List[float] = []
+
+
+class _Series:
+    def __init__(self, retention_ms: int = 0, duplicate_policy: Optional[str] = None, labels=None):
+        self.timestamps: List[int] = []
+        self.values: List[float] = []
+        self.retention_ms = retention_ms or 0
+        self.duplicate_policy = (duplicate_policy or "block").lower()
+        self.labels: Dict[str, str] = {str(k): str(v) for k, v in (labels or {}).items()}
+        self.rules: List[_Rule] = []
+        # (source series, rule) when this series is a compaction
+        self.source: Optional[Tuple["_Series", _Rule]] = None
+
+    def upsert(self, timestamp: int, value: float, policy: Optional[str] = None) -> None:
+        policy = (policy or self.duplicate_policy).lower()
+        i = bisect.bisect_left(self.timestamps, timestamp)
+        if i < len(self.timestamps) and self.timestamps[i] == timestamp:
+            old = self.values[i]
+            if policy == "block":
+                raise ResponseError(
+                    "TSDB: Error at upsert, update is not supported when DUPLICATE_POLICY is set to BLOCK mode"
+                )
+            self.values[i] = {
+                "sum": old + value,
+                "min": min(old, value),
+                "max": max(old, value),
+                "first": old,
+            }.get(policy, value)
+        else:
+            self.timestamps.insert(i, timestamp)
+            self.values.insert(i, value)
+        self._trim()
+
+    def _trim(self) -> None:
+        if not self.retention_ms or not self.timestamps:
+            return
+        cutoff = self.timestamps[-1] - self.retention_ms
+        if self.timestamps[0] < cutoff:
+            i = bisect.bisect_left(self.timestamps, cutoff)
+            del self.timestamps[:i]
+            del self.values[:i]
+
+    def samples(self, start: float, end: float) -> Tuple[List[int], List[float]]:
+        lo = bisect.bisect_left(self.timestamps, start)
+        hi = bisect.bisect_right(self.timestamps, end)
+        return self.timestamps[lo:hi], self.values[lo:hi]
+
+    def range(
+        self,
+        start: float,
+        end: float,
+        aggregation: Optional[str] = None,
+        bucket_ms: int = 0,
+        latest: bool = False,
+    ) -> List[Tuple[int, float]]:
+        timestamps, values = self.samples(start, end)
+        samples = list(zip(timestamps, values))
+        if latest and self.source is not None:
+            # Compaction: add the source's still-open bucket
+            _, rule = self.source
+            if rule.open_bucket is not None and start <= rule.open_bucket <= end and rule.open_values:
+                samples.append((rule.open_bucket, _aggregate(rule.aggregation, rule.open_values)))
+        if not aggregation:
+            return [(t, float(v)) for t, v in samples]
+
+        buckets: "OrderedDict[int, List[float]]" = OrderedDict()
+        for t, v in samples:
+            buckets.setdefault(t - t % bucket_ms, []).append(v)
+        return [(t, _aggregate(aggregation, vs)) for t, vs in buckets.items()]
+
+
+# ---------------------------------------------------------------------------
+# Command groups (client.json(), client.ts(), ...)
+# ---------------------------------------------------------------------------
+
+def _json_path(path: str) -> Tuple[List[str], bool]:
+    """Path -> (field names, is JSONPath). "$", ".", "$.a.b", ".a", "a"."""
+    path = path or "."
+    jsonpath = path.startswith("$")
+    path = path.lstrip("$").lstrip(".")
+    return ([part for part in path.split(".") if part] if path else []), jsonpath
+
+
+def _walk(doc: Any, fields: List[str]) -> Tuple[bool, Any]:
+    for field in fields:
+        if not isinstance(doc, dict) or field not in doc:
+            return False, None
+        doc = doc[field]
+    return True, doc
+
+
+_SCALARS = frozenset((str, int, float, bool, type(None)))
+
+
+def _copy_json(value: Any) -> Any:
+    """
+    Detached copy of a JSON value (tuples become lists, keys strings).
+    Far cheaper than a dumps/loads round trip for documents with embeddings.
+    """
+    if isinstance(value, dict):
+        return {str(k): _copy_json(v) if isinstance(v, (dict, list, tuple)) else v for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if _SCALARS.issuperset(map(type, value)):
+            # e.g. embeddings: a shallow copy is a full copy
+            return list(value)
+        return [_copy_json(v) if isinstance(v, (dict, list, tuple)) else v for v in value]
+    return value
+
+
+class _JsonCommands:
+    """
+    Documents are kept as Python objects, boxed in a one-item list (so a
+    null document is still a value); every read and write copies.
+    """
+
+    def __init__(self, client: "MemoryRedis"):
+        self._client = client
+
+    def set(self, name: str, path: str, obj, nx: bool = False, xx: bool = False, decode_keys: bool = False):
+        client = self._client
+        fields, _ = _json_path(path)
+        value = _copy_json(obj)
+        with client._lock:
+            box = client._lookup(name, "ReJSON-RL")
+            if nx and box is not None or xx and box is None:
+                return None
+            if not fields:
+                client._data[name] = ("ReJSON-RL", [value])
+                return True
+            if box is None:
+                raise ResponseError("ERR new objects must be created at the root")
+            found, parent = _walk(box[0], fields[:-1])
+            if not found or not isinstance(parent, dict):
+                return None
+            parent[fields[-1]] = value
+            return True
+
+    @staticmethod
+    def _read(box: list, path: str):
+        fields, jsonpath = _json_path(path)
+        found, value = _walk(box[0], fields)
+        if jsonpath:
+            return [_copy_json(value)] if found else []
+        if not found:
+            raise ResponseError(f"ERR Path '{path}' does not exist")
+        return _copy_json(value)
+
+    def get(self, name: str, *paths, no_escape: bool = False):
+        with self._client._lock:
+            box = self._client._lookup(name, "ReJSON-RL")
+            if box is None:
+                return None
+            if not paths:
+                return self._read(box, ".")
+            if len(paths) == 1:
+                return self._read(box, paths[0])
+            return {path: self._read(box, path) for path in paths}
+
+    def mget(self, keys: List[str], path: str):
+        results = []
+        with self._client._lock:
+            for key in keys:
+                box = self._client._lookup(key, "ReJSON-RL", check_type=False)
+                try:
+                    results.append(None if box is None else self._read(box, path))
+                except ResponseError:
+                    results.append(None)
+        return results
+
+    def delete(self, key: str, path: str = "$") -> int:
+        fields, _ = _json_path(path)
+        client = self._client
+        with client._lock:
+            box = client._lookup(key, "ReJSON-RL")
+            if box is None:
+                return 0
+            if not fields:
+                return client.delete(key)
+            found, parent = _walk(box[0], fields[:-1])
+            if not found or not isinstance(parent, dict) or fields[-1] not in parent:
+                return 0
+            del parent[fields[-1]]
+            return 1
+
+
+class _TimeSeriesCommands:
+    def __init__(self, client: "MemoryRedis"):
+        self._client = client
+
+    def _series(self, key: str, create: bool = False, **options) -> _Series:
+        series = self._client._lookup(key, "TSDB-TYPE")
+        if series is None:
+            if not create:
+                raise ResponseError("TSDB: the key does not exist")
+            series = _Series(**options)
+            self._client._data[key] = ("TSDB-TYPE", series)
+        return series
+
+    def create(self, key: str, retention_msecs: Optional[int] = None, duplicate_policy: Optional[str] = None,
+               labels: Optional[Dict] = None, **_):
+        with self._client._lock:
+            if self._client._lookup(key, "TSDB-TYPE") is not None:
+                raise ResponseError("TSDB: key already exists")
+            self._series(key, create=True, retention_ms=retention_msecs,
+                         duplicate_policy=duplicate_policy, labels=labels)
+            return True
+
+    def add(self, key: str, timestamp, value: float, retention_msecs: Optional[int] = None,
+            duplicate_policy: Optional[str] = None, labels: Optional[Dict] = None, **_):
+        with self._client._lock:
+            series = self._series(key, create=True, retention_ms=retention_msecs,
+                                  duplicate_policy=duplicate_policy, labels=labels)
+            timestamp = _now_ms() if timestamp == "*" else int(timestamp)
+            appended = not series.timestamps or timestamp > series.timestamps[-1]
+            series.upsert(timestamp, float(value), duplicate_policy)
+            self._apply_rules(series, timestamp, float(value) if appended else None)
+            return timestamp
+
+    def madd(self, ktv_tuples: List[Tuple]) -> List:
+        results = []
+        for key, timestamp, value in ktv_tuples:
+            try:
+                results.append(self.add(key, timestamp, value))
+            except ResponseError as e:
+                results.append(e)
+        return results
+
+    def _apply_rules(self, series: _Series, timestamp: int, appended: Optional[float]) -> None:
+        """
+        Like Redis: an appended sample (`appended` is its value) is added
+        to the rule's open bucket, an update recomputes its bucket from
+        the source.
+        """
+        for rule in series.rules:
+            bucket = timestamp - timestamp % rule.bucket_ms
+            dest = self._series(rule.dest, create=True)
+            if appended is not None:
+                if rule.open_bucket is None or bucket > rule.open_bucket:
+                    # The previous bucket is closed: write it
+                    if rule.open_bucket is not None and rule.open_values:
+                        dest.upsert(rule.open_bucket, _aggregate(rule.aggregation, rule.open_values), "last")
+                    rule.open_bucket = bucket
+                    rule.open_values = []
+                rule.open_values.append(appended)
+            elif bucket >= (rule.open_bucket if rule.open_bucket is not None else
+                            series.timestamps[-1] - series.timestamps[-1] % rule.bucket_ms):
+                rule.open_bucket = bucket
+                _, values = series.samples(bucket, bucket + rule.bucket_ms - 1)
+                rule.open_values = list(values)
+            else:
+                # Late sample in a closed bucket: recompute it
+                _, values = series.samples(bucket, bucket + rule.bucket_ms - 1)
+                if values:
+                    dest.upsert(bucket, _aggregate(rule.aggregation, values), "last")
+
+    def createrule(self, source_key: str, dest_key: str, aggregation_type: str, bucket_size_msec: int,
+                   align_timestamp: Optional[int] = None):
+        with self._client._lock:
+            source = self._series(source_key)
+            dest = self._series(dest_key)
+            if dest.source is not None:
+                raise ResponseError("TSDB: the destination key already has a src rule")
+            rule = _Rule(dest_key, aggregation_type, int(bucket_size_msec))
+            source.rules.append(rule)
+            dest.source = (source, rule)
+            return True
+
+    def get(self, key: str, latest: bool = False):
+        with self._client._lock:
+            series = self._series(key)
+            if not series.timestamps:
+                return None
+            return series.timestamps[-1], float(series.values[-1])
+
+    def range(self, key: str, from_time, to_time, count: Optional[int] = None,
+              aggregation_type: Optional[str] = None, bucket_size_msec: int = 0,
+              latest: bool = False, **_):
+        with self._client._lock:
+            samples = self._series(key).range(
+                _time_bound(from_time, -_INF), _time_bound(to_time, _INF),
+                aggregation_type, int(bucket_size_msec or 0), latest,
+            )
+        return samples[:count] if count else samples
+
+    def revrange(self, key: str, from_time, to_time, count: Optional[int] = None, **kwargs):
+        samples = self.range(key, from_time, to_time, **kwargs)[::-1]
+        return samples[:count] if count else samples
+
+    def mrange(self, from_time, to_time, filters: List[str], count: Optional[int] = None,
+               aggregation_type: Optional[str] = None, bucket_size_msec: int = 0,
+               with_labels: bool = False, groupby: Optional[str] = None, reduce: Optional[str] = None,
+               latest: bool = False, **_):
+        start, end = _time_bound(from_time, -_INF), _time_bound(to_time, _INF)
+        with self._client._lock:
+            matches = sorted(
+                (key, value) for key, (kind, value) in self._client._data.items()
+                if kind == "TSDB-TYPE" and self._client._lookup(key, "TSDB-TYPE") is not None
+                and _match_filters(value.labels, filters)
+            )
+            ranges = [
+                (key, series, series.range(start, end, aggregation_type, int(bucket_size_msec or 0), latest))
+                for key, series in matches
+            ]
+
+        if not groupby:
+            return [
+                {key: [dict(series.labels) if with_labels else {}, samples[:count] if count else samples]}
+                for key, series, samples in ranges
+            ]
+
+        groups: Dict[str, List[Tuple[str, List[Tuple[int, float]]]]] = {}
+        for key, series, samples in ranges:
+            if groupby in series.labels:
+                groups.setdefault(series.labels[groupby], []).append((key, samples))
+        result = []
+        for value in sorted(groups):
+            by_time: Dict[int, List[float]] = {}
+            for _, samples in groups[value]:
+                for t, v in samples:
+                    by_time.setdefault(t, []).append(v)
+            samples = [(t, _aggregate(reduce or "sum", vs)) for t, vs in sorted(by_time.items())]
+            labels = {
+                groupby: value,
+                "__reducer__": reduce or "sum",
+                "__source__": ",".join(key for key, _ in groups[value]),
+            }
+            result.append({f"{groupby}={value}": [labels, samples[:count] if count else samples]})
+        return result
+
+    def info(self, key: str):
+        with self._client._lock:
+            series = self._series(key)
+            return {
+                "total_samples": len(series.timestamps),
+                "first_timestamp": series.timestamps[0] if series.timestamps else 0,
+                "last_timestamp": series.timestamps[-1] if series.timestamps else 0,
+                "retention_msecs": series.retention_ms,
+                "labels": dict(series.labels),
+                "rules": [[rule.dest, rule.bucket_ms, rule.aggregation.upper()] for rule in series.rules],
+            }
+
+
+def _match_filters(labels: Dict[str, str], filters: List[str]) -> bool:
+    for expression in filters:
+        negate = "!=" in expression
+        name, _, value = expression.partition("!=" if negate else "=")
+        if value.startswith("(") and value.endswith(")"):
+            allowed = {v.strip() for v in value[1:-1].split(",")}
+        else:
+            allowed = {value} if value else set()
+        if not allowed:
+            # label= : label missing; label!= : label present
+            if (name in labels) != negate:
+                return False
+        elif (labels.get(name) in allowed) == negate:
+            return False
+    return True
+
+
+class _TopKCommands:
+    def __init__(self, client: "MemoryRedis"):
+        self._client = client
+
+    def reserve(self, key: str, k: int, width: int, depth: int, decay: float):
+        with self._client._lock:
+            if self._client._lookup(key, "TopK-TYPE") is not None:
+                raise ResponseError("TopK: key already exists")
+            self._client._data[key] = ("TopK-TYPE", {"k": int(k), "counts": {}})
+            return True
+
+    def _topk(self, key: str) -> Dict:
+        topk = self._client._lookup(key, "TopK-TYPE")
+        if topk is None:
+            raise ResponseError("TopK: key does not exist")
+        return topk
+
+    def add(self, key: str, *items) -> List[None]:
+        return self.incrby(key, items, [1] * len(items))
+
+    def incrby(self, key: str, items, increments) -> List[None]:
+        with self._client._lock:
+            counts = self._topk(key)["counts"]
+            for item, increment in zip(items, increments):
+                counts[str(item)] = counts.get(str(item), 0) + int(increment)
+            return [None] * len(items)
+
+    def list(self, key: str, withcount: bool = False) -> List:
+        with self._client._lock:
+            topk = self._topk(key)
+            top = sorted(topk["counts"].items(), key=lambda item: (-item[1], item[0]))[:topk["k"]]
+        if not withcount:
+            return [item for item, _ in top]
+        return [value for pair in top for value in pair]
+
+    def query(self, key: str, *items) -> List[int]:
+        top = set(self.list(key))
+        return [1 if str(item) in top else 0 for item in items]
+
+    def count(self, key: str, *items) -> List[int]:
+        with self._client._lock:
+            counts = self._topk(key)["counts"]
+            return [counts.get(str(item), 0) for item in items]
+
+
+class _CmsCommands:
+    def __init__(self, client: "MemoryRedis"):
+        self._client = client
+
+    def _create(self, key: str):
+        with self._client._lock:
+            if self._client._lookup(key, "CMSk-TYPE") is not None:
+                raise ResponseError("CMS: key already exists")
+            self._client._data[key] = ("CMSk-TYPE", {})
+            return True
+
+    def initbyprob(self, key: str, error: float, probability: float):
+        return self._create(key)
+
+    def initbydim(self, key: str, width: int, depth: int):
+        return self._create(key)
+
+    def _cms(self, key: str) -> Dict:
+        counts = self._client._lookup(key, "CMSk-TYPE")
+        if counts is None:
+            raise ResponseError("CMS: key does not exist")
+        return counts
+
+    def incrby(self, key: str, items, increments) -> List[int]:
+        with self._client._lock:
+            counts = self._cms(key)
+            for item, increment in zip(items, increments):
+                counts[str(item)] = counts.get(str(item), 0) + int(increment)
+            return [counts[str(item)] for item in items]
+
+    def query(self, key: str, *items) -> List[int]:
+        with self._client._lock:
+            counts = self._cms(key)
+            return [counts.get(str(item), 0) for item in items]
+
+
+class _TDigestCommands:
+    def __init__(self, client: "MemoryRedis"):
+        self._client = client
+
+    def create(self, key: str, compression: int = 100):
+        with self._client._lock:
+            if self._client._lookup(key, "TDIS-TYPE") is not None:
+                raise ResponseError("T-Digest: key already exists")
+            self._client._data[key] = ("TDIS-TYPE", [])
+            return True
+
+    def _values(self, key: str) -> List[float]:
+        values = self._client._lookup(key, "TDIS-TYPE")
+        if values is None:
+            raise ResponseError("T-Digest: key does not exist")
+        return values
+
+    def add(self, key: str, values: List[float]):
+        with self._client._lock:
+            digest = self._values(key)
+            for value in values:
+                bisect.insort(digest, float(value))
+            return "OK"
+
+    def quantile(self, key: str, quantile: float, *quantiles: float) -> List[float]:
+        with self._client._lock:
+            values = list(self._values(key))
+        return [_quantile(values, q) for q in (quantile, *quantiles)]
+
+    def trimmed_mean(self, key: str, low_cut_quantile: float, high_cut_quantile: float) -> float:
+        with self._client._lock:
+            values = list(self._values(key))
+        n = len(values)
+        kept = values[int(math.floor(low_cut_quantile * n)):int(math.ceil(high_cut_quantile * n))]
+        return sum(kept) / len(kept) if kept else math.nan
+
+    def min(self, key: str) -> float:
+        with self._client._lock:
+            values = self._values(key)
+            return values[0] if values else math.nan
+
+    def max(self, key: str) -> float:
+        with self._client._lock:
+            values = self._values(key)
+            return values[-1] if values else math.nan
+
+
+def _quantile(values: List[float], q: float) -> float:
+    if not values:
+        return math.nan
+    position = q * (len(values) - 1)
+    lower = int(math.floor(position))
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class _Unsupported:
+    """Command group the backend doesn't implement (e.g. ft())."""
+
+    def __init__(self, prefix: str):
+        self._prefix = prefix
+
+    def __getattr__(self, name: str):
+        def unsupported(*args, **kwargs):
+            raise ResponseError(f"unknown command '{self._prefix}.{name.upper()}'")
+        return unsupported
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class MemoryRedis:
+    """
+    In-process stand-in for a redis.Redis client (decode_responses=True).
+
+    Thread-safe: every command runs under one lock, like commands on a
+    single Redis server. Keys expire lazily, when next touched.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, Any]] = {}
+        self._expires: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        # Woken on XADD, for blocking XREAD/XREADGROUP
+        self._stream_added = threading.Condition(self._lock)
+
+    # -- key space ---------------------------------------------------------
+
+    def _lookup(self, key: str, kind: str, check_type: bool = True):
+        deadline = self._expires.get(key)
+        if deadline is not None and deadline <= _now_ms():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] != kind:
+            if check_type:
+                raise ResponseError(WRONGTYPE)
+            return None
+        return entry[1]
+
+    def _create(self, key: str, kind: str, factory):
+        value = self._lookup(key, kind)
+        if value is None:
+            value = factory()
+            self._data[key] = (kind, value)
+        return value
+
+    def _live_keys(self) -> List[str]:
+        now = _now_ms()
+        return [key for key in list(self._data) if self._expires.get(key, now + 1) > now]
+
+    def ping(self) -> bool:
+        return True
+
+    def info(self, section: Optional[str] = None) -> Dict:
+        return {"role": "master", "redis_version": "memory", "keys": len(self._live_keys())}
+
+    def close(self) -> None:
+        pass
+
+    def flushall(self) -> bool:
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+            return True
+
+    flushdb = flushall
+
+    def exists(self, *names: str) -> int:
+        with self._lock:
+            live = self._live_keys_set(list(names))
+            return sum(1 for name in names if name in live)
+
+    def _live_keys_set(self, names: List[str]) -> set:
+        now = _now_ms()
+        return {name for name in names if name in self._data and self._expires.get(name, now + 1) > now}
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            deleted = 0
+            for name in self._live_keys_set(list(names)):
+                del self._data[name]
+                self._expires.pop(name, None)
+                deleted += 1
+            return deleted
+
+    def pexpire(self, name: str, time_ms: int) -> bool:
+        with self._lock:
+            if not self._live_keys_set([name]):
+                return False
+            self._expires[name] = _now_ms() + int(time_ms)
+            return True
+
+    def expire(self, name: str, time_s: int) -> bool:
+        return self.pexpire(name, int(time_s) * 1000)
+
+    def ttl(self, name: str) -> int:
+        with self._lock:
+            if not self._live_keys_set([name]):
+                return -2
+            deadline = self._expires.get(name)
+            return -1 if deadline is None else max(0, (deadline - _now_ms()) // 1000)
+
+    def keys(self, pattern: str = "*") -> List[str]:
+        with self._lock:
+            return [key for key in self._live_keys() if fnmatch.fnmatchcase(key, pattern)]
+
+    def scan_iter(self, match: Optional[str] = None, count: Optional[int] = None, _type: Optional[str] = None,
+                  **_) -> Iterator[str]:
+        for key in self.keys(match or "*"):
+            if _type is None or self._data.get(key, ("",))[0].lower() == _type.lower():
+                yield key
+
+    # -- strings -----------------------------------------------------------
+
+    def get(self, name: str) -> Optional[str]:
+        with self._lock:
+            return self._lookup(name, "string")
+
+    def set(self, name: str, value, ex: Optional[int] = None, px: Optional[int] = None,
+            nx: bool = False, xx: bool = False, **_) -> Optional[bool]:
+        with self._lock:
+            exists = bool(self._live_keys_set([name]))
+            if nx and exists or xx and not exists:
+                return None
+            self._data[name] = ("string", str(value))
+            self._expires.pop(name, None)
+            if ex is not None or px is not None:
+                self._expires[name] = _now_ms() + (int(px) if px is not None else int(ex) * 1000)
+            return True
+
+    def incrby(self, name: str, amount: int = 1) -> int:
+        with self._lock:
+            value = int(self._lookup(name, "string") or 0) + int(amount)
+            self._data[name] = ("string", str(value))
+            return value
+
+    incr = incrby
+
+    # -- lists -------------------------------------------------------------
+
+    def lpush(self, name: str, *values) -> int:
+        with self._lock:
+            items = self._create(name, "list", list)
+            items[:0] = [str(value) for value in reversed(values)]
+            return len(items)
+
+    def rpush(self, name: str, *values) -> int:
+        with self._lock:
+            items = self._create(name, "list", list)
+            items.extend(str(value) for value in values)
+            return len(items)
+
+    def ltrim(self, name: str, start: int, end: int) -> bool:
+        with self._lock:
+            items = self._lookup(name, "list")
+            if items is not None:
+                items[:] = _slice(items, start, end)
+                if not items:
+                    del self._data[name]
+            return True
+
+    def lrange(self, name: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            return _slice(self._lookup(name, "list") or [], start, end)
+
+    def lindex(self, name: str, index: int) -> Optional[str]:
+        with self._lock:
+            items = self._lookup(name, "list") or []
+            return items[index] if -len(items) <= index < len(items) else None
+
+    def llen(self, name: str) -> int:
+        with self._lock:
+            return len(self._lookup(name, "list") or [])
+
+    # -- sorted sets -------------------------------------------------------
+
+    def zadd(self, name: str, mapping: Dict, nx: bool = False, xx: bool = False, ch: bool = False,
+             incr: bool = False, gt: bool = False, lt: bool = False):
+        with self._lock:
+            zset = self._create(name, "zset", dict)
+            added = changed = 0
+            for member, score in mapping.items():
+                member, score = str(member), float(score)
+                old = zset.get(member)
+                if old is None and xx or old is not None and nx:
+                    continue
+                if incr:
+                    score += old or 0.0
+                if old is not None and (gt and score <= old or lt and score >= old):
+                    continue
+                zset[member] = score
+                added += old is None
+                changed += old is None or old != score
+            if incr:
+                return zset.get(str(next(iter(mapping))))
+            return changed if ch else added
+
+    def zincrby(self, name: str, amount: float, value) -> float:
+        with self._lock:
+            zset = self._create(name, "zset", dict)
+            member = str(value)
+            zset[member] = zset.get(member, 0.0) + float(amount)
+            return zset[member]
+
+    def zscore(self, name: str, value) -> Optional[float]:
+        with self._lock:
+            return (self._lookup(name, "zset") or {}).get(str(value))
+
+    def zcard(self, name: str) -> int:
+        with self._lock:
+            return len(self._lookup(name, "zset") or {})
+
+    def _sorted(self, name: str, desc: bool) -> List[Tuple[str, float]]:
+        zset = self._lookup(name, "zset") or {}
+        return sorted(zset.items(), key=lambda item: (item[1], item[0]), reverse=desc)
+
+    @staticmethod
+    def _reply(items: List[Tuple[str, float]], withscores: bool) -> List:
+        return [(member, score) for member, score in items] if withscores else [member for member, _ in items]
+
+    def zrange(self, name: str, start: int, end: int, desc: bool = False, withscores: bool = False, **_) -> List:
+        with self._lock:
+            return self._reply(_slice(self._sorted(name, desc), start, end), withscores)
+
+    def zrevrange(self, name: str, start: int, end: int, withscores: bool = False, **_) -> List:
+        return self.zrange(name, start, end, desc=True, withscores=withscores)
+
+    def _by_score(self, name: str, low, high, desc: bool, start: Optional[int], num: Optional[int],
+                  withscores: bool) -> List:
+        low_bound, high_bound = _score_bound(low), _score_bound(high)
+        with self._lock:
+            items = [item for item in self._sorted(name, desc) if _in_bounds(item[1], low_bound, high_bound)]
+        if start is not None and num is not None:
+            items = items[start:] if num < 0 else items[start:start + num]
+        return self._reply(items, withscores)
+
+    def zrangebyscore(self, name: str, min, max, start: Optional[int] = None, num: Optional[int] = None,
+                      withscores: bool = False, **_) -> List:
+        return self._by_score(name, min, max, False, start, num, withscores)
+
+    def zrevrangebyscore(self, name: str, max, min, start: Optional[int] = None, num: Optional[int] = None,
+                         withscores: bool = False, **_) -> List:
+        return self._by_score(name, min, max, True, start, num, withscores)
+
+    def zremrangebyscore(self, name: str, min, max) -> int:
+        low_bound, high_bound = _score_bound(min), _score_bound(max)
+        with self._lock:
+            zset = self._lookup(name, "zset")
+            if not zset:
+                return 0
+            doomed = [member for member, score in zset.items() if _in_bounds(score, low_bound, high_bound)]
+            for member in doomed:
+                del zset[member]
+            if not zset:
+                del self._data[name]
+            return len(doomed)
+
+    def zunionstore(self, dest: str, keys, aggregate: Optional[str] = None) -> int:
+        weights = keys if isinstance(keys, dict) else {key: 1 for key in keys}
+        combine = {"MIN": min, "MAX": max}.get((aggregate or "SUM").upper(), lambda a, b: a + b)
+        with self._lock:
+            union: Dict[str, float] = {}
+            for key, weight in weights.items():
+                for member, score in (self._lookup(key, "zset") or {}).items():
+                    score *= weight
+                    union[member] = combine(union[member], score) if member in union else score
+            self._data.pop(dest, None)
+            self._expires.pop(dest, None)
+            if union:
+                self._data[dest] = ("zset", union)
+            return len(union)
+
+    # -- HyperLogLog (exact) -----------------------------------------------
+
+    def pfadd(self, name: str, *values) -> int:
+        with self._lock:
+            members = self._create(name, "hll", set)
+            before = len(members)
+            members.update(str(value) for value in values)
+            return int(len(members) > before)
+
+    def pfcount(self, *sources: str) -> int:
+        with self._lock:
+            union = set()
+            for source in sources:
+                union |= self._lookup(source, "hll") or set()
+            return len(union)
+
+    # -- streams -----------------------------------------------------------
+
+    def xadd(self, name: str, fields: Dict, id="*", maxlen: Optional[int] = None, approximate: bool = True,
+             **_) -> str:
+        with self._lock:
+            stream_id = self._create(name, "stream", _Stream).add(fields, id, maxlen)
+            self._stream_added.notify_all()
+            return stream_id
+
+    def xlen(self, name: str) -> int:
+        with self._lock:
+            stream = self._lookup(name, "stream")
+            return len(stream.ids) if stream else 0
+
+    def xrange(self, name: str, min="-", max="+", count: Optional[int] = None) -> List[Tuple[str, Dict]]:
+        with self._lock:
+            stream = self._lookup(name, "stream")
+            if stream is None:
+                return []
+            low = str(min)
+            if low.startswith("("):
+                after = _parse_stream_id(low[1:])
+            else:
+                ms, seq = _parse_stream_id(low)
+                after = (ms, seq - 1)
+            end = _parse_stream_id(max, default_seq=2 ** 63)
+            entries = [entry for entry in stream.after(after, None) if _parse_stream_id(entry[0]) <= end]
+            return entries[:count] if count else entries
+
+    def _wait(self, block: Optional[int], read) -> List:
+        """Run `read` until it returns entries or `block` ms pass."""
+        deadline = None if not block else time.monotonic() + block / 1000
+        with self._lock:
+            while True:
+                result = read()
+                if result or block is None:
+                    return result
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                self._stream_added.wait(remaining)
+
+    def xread(self, streams: Dict[str, str], count: Optional[int] = None, block: Optional[int] = None) -> List:
+        with self._lock:
+            # "$" means entries added after this call
+            positions = {}
+            for name, last in streams.items():
+                stream = self._lookup(name, "stream")
+                positions[name] = (stream.last_id if stream else (0, 0)) if last == "$" else _parse_stream_id(last)
+
+        def read():
+            result = []
+            for name, last in positions.items():
+                stream = self._lookup(name, "stream")
+                entries = stream.after(last, count) if stream else []
+                if entries:
+                    result.append([name, entries])
+            return result
+
+        return self._wait(block, read)
+
+    def xgroup_create(self, name: str, groupname: str, id="$", mkstream: bool = False, **_) -> bool:
+        with self._lock:
+            stream = self._lookup(name, "stream")
+            if stream is None:
+                if not mkstream:
+                    raise ResponseError(
+                        "ERR The XGROUP subcommand requires the key to exist. "
+                        "Note that for CREATE you may want to use the MKSTREAM option to create an empty stream automatically."
+                    )
+                stream = self._create(name, "stream", _Stream)
+            if groupname in stream.groups:
+                raise ResponseError("BUSYGROUP Consumer Group name already exists")
+            last = stream.last_id if id == "$" else _parse_stream_id(id)
+            stream.groups[groupname] = {"last": last, "pending": OrderedDict(), "consumers": {}}
+            return True
+
+    def xreadgroup(self, groupname: str, consumername: str, streams: Dict[str, str], count: Optional[int] = None,
+                   block: Optional[int] = None, noack: bool = False) -> List:
+        def read():
+            result = []
+            for name, position in streams.items():
+                stream = self._lookup(name, "stream")
+                group = stream.groups.get(groupname) if stream else None
+                if group is None:
+                    raise ResponseError(
+                        f"NOGROUP No such key '{name}' or consumer group '{groupname}' in XREADGROUP with GROUP option"
+                    )
+                now = _now_ms()
+                group["consumers"][consumername] = now
+                if position == ">":
+                    entries = stream.after(group["last"], count)
+                    if entries:
+                        group["last"] = _parse_stream_id(entries[-1][0])
+                        if not noack:
+                            for entry_id, _ in entries:
+                                group["pending"][entry_id] = [consumername, now, 1]
+                else:
+                    # Re-read this consumer's pending entries
+                    after = _parse_stream_id(position)
+                    entries = [
+                        (entry_id, stream.get(_parse_stream_id(entry_id)))
+                        for entry_id, (consumer, _, _) in group["pending"].items()
+                        if consumer == consumername and _parse_stream_id(entry_id) > after
+                    ][:count]
+                    for entry_id, _ in entries:
+                        pending = group["pending"][entry_id]
+                        pending[1], pending[2] = now, pending[2] + 1
+                if entries or position != ">":
+                    result.append([name, entries])
+            return result
+
+        has_new = all(position == ">" for position in streams.values())
+        return self._wait(block if has_new else None, read)
+
+    def xack(self, name: str, groupname: str, *ids) -> int:
+        with self._lock:
+            stream = self._lookup(name, "stream")
+            group = stream.groups.get(groupname) if stream else None
+            if group is None:
+                return 0
+            return sum(1 for entry_id in ids if group["pending"].pop(str(entry_id), None) is not None)
+
+    def xrevrange(self, name: str, max="+", min="-", count: Optional[int] = None) -> List[Tuple[str, Dict]]:
+        entries = self.xrange(name, min, max)[::-1]
+        return entries[:count] if count else entries
+
+    def _group(self, name: str, groupname: str) -> Tuple[_Stream, Dict]:
+        stream = self._lookup(name, "stream")
+        group = stream.groups.get(groupname) if stream else None
+        if group is None:
+            raise ResponseError(f"NOGROUP No such key '{name}' or consumer group '{groupname}'")
+        return stream, group
+
+    def xinfo_groups(self, name: str) -> List[Dict]:
+        with self._lock:
+            stream = self._lookup(name, "stream")
+            if stream is None:
+                raise ResponseError("ERR no such key")
+            groups = []
+            for groupname, group in stream.groups.items():
+                read = bisect.bisect_right(stream.ids, group["last"])
+                groups.append({
+                    "name": groupname,
+                    "consumers": len(group["consumers"]),
+                    "pending": len(group["pending"]),
+                    "last-delivered-id": _format_stream_id(group["last"]),
+                    "entries-read": read,
+                    "lag": len(stream.ids) - read,
+                })
+            return groups
+
+    def xinfo_consumers(self, name: str, groupname: str) -> List[Dict]:
+        with self._lock:
+            _, group = self._group(name, groupname)
+            now = _now_ms()
+            return [
+                {
+                    "name": consumer,
+                    "pending": sum(1 for owner, _, _ in group["pending"].values() if owner == consumer),
+                    "idle": now - seen,
+                    "inactive": now - seen,
+                }
+                for consumer, seen in group["consumers"].items()
+            ]
+
+    def xpending(self, name: str, groupname: str) -> Dict:
+        with self._lock:
+            _, group = self._group(name, groupname)
+            pending = group["pending"]
+            ids = sorted(pending, key=_parse_stream_id)
+            counts: Dict[str, int] = {}
+            for owner, _, _ in pending.values():
+                counts[owner] = counts.get(owner, 0) + 1
+            return {
+                "pending": len(pending),
+                "min": ids[0] if ids else None,
+                "max": ids[-1] if ids else None,
+                "consumers": [{"name": owner, "pending": n} for owner, n in counts.items()],
+            }
+
+    def xpending_range(self, name: str, groupname: str, min, max, count: int,
+                       consumername: Optional[str] = None, idle: Optional[int] = None) -> List[Dict]:
+        with self._lock:
+            _, group = self._group(name, groupname)
+            low, high = _parse_stream_id(min), _parse_stream_id(max, default_seq=2 ** 63)
+            now = _now_ms()
+            result = []
+            for entry_id in sorted(group["pending"], key=_parse_stream_id):
+                owner, delivered, deliveries = group["pending"][entry_id]
+                if not low <= _parse_stream_id(entry_id) <= high:
+                    continue
+                if consumername is not None and owner != consumername:
+                    continue
+                if idle is not None and now - delivered < idle:
+                    continue
+                result.append({
+                    "message_id": entry_id,
+                    "consumer": owner,
+                    "time_since_delivered": now - delivered,
+                    "times_delivered": deliveries,
+                })
+                if len(result) == count:
+                    break
+            return result
+
+    # -- command groups ----------------------------------------------------
+
+    def json(self) -> _JsonCommands:
+        return _JsonCommands(self)
+
+    def ts(self) -> _TimeSeriesCommands:
+        return _TimeSeriesCommands(self)
+
+    def topk(self) -> _TopKCommands:
+        return _TopKCommands(self)
+
+    def cms(self) -> _CmsCommands:
+        return _CmsCommands(self)
+
+    def tdigest(self) -> _TDigestCommands:
+        return _TDigestCommands(self)
+
+    def ft(self, index_name: str = "idx") -> _Unsupported:
+        return _Unsupported("FT")
+
+    def execute_command(self, *args, **options):
+        raise ResponseError(f"unknown command '{args[0] if args else ''}'")
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> "MemoryPipeline":
+        return MemoryPipeline(self)
+
+
+class _QueuedGroup:
+    """pipe.json() / pipe.ts() / ...: queues the group's commands."""
+
+    def __init__(self, pipeline: "MemoryPipeline", group: str):
+        self._pipeline = pipeline
+        self._group = group
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self._pipeline._queue.append((self._group, name, args, kwargs))
+            return self._pipeline
+        return queue
+
+
+class MemoryPipeline:
+    """Queues commands and runs them in order on execute(), like a non-transactional pipeline."""
+
+    GROUPS = ("json", "ts", "topk", "cms", "tdigest", "ft")
+
+    def __init__(self, client: MemoryRedis):
+        self._client = client
+        self._queue: List[Tuple[Optional[str], str, tuple, dict]] = []
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __enter__(self) -> "MemoryPipeline":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._queue = []
+
+    def __getattr__(self, name: str):
+        if name in self.GROUPS:
+            return lambda *args, **kwargs: _QueuedGroup(self, name)
+        if not hasattr(self._client, name):
+            raise AttributeError(name)
+
+        def queue(*args, **kwargs):
+            self._queue.append((None, name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self, raise_on_error: bool = True) -> List:
+        queue, self._queue = self._queue, []
+        results = []
+        for group, name, args, kwargs in queue:
+            target = getattr(self._client, group)() if group else self._client
+            try:
+                results.append(getattr(target, name)(*args, **kwargs))
+            except ResponseError as e:
+                results.append(e)
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, ResponseError):
+                    raise result
+        return results
@@ -0,0 +1,456 @@
+"""
+Metrics for the transaction workshop.
+
+A small in-process metrics registry rendered in the Prometheus text
+format, plus the plumbing to fill it:
+
+- Counter / Gauge / Histogram: thread-safe, labelled metrics
+- phase(): context manager that times one phase of the current request,
+  reported in the Server-Timing header
+- InstrumentedRedis / InstrumentedRedisCluster: Redis clients that count
+  commands and time them into the "redis" phase of the current request
+- CountingCache / InstrumentedCachedRedis: client-side cache and client
+  that report cache hits, misses and invalidations
+- InstrumentedBlockingConnectionPool: connection pool that reports
+  connections in use and idle, wait time, creations and timeouts
+  (InstrumentedSentinelConnectionPool: the same, for Sentinel clients)
+
+Example:
+    >>> with phase("embed"):
+    ...     vector = model.encode(text)
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from queue import LifoQueue
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import redis
+from redis.cache import CacheEntryStatus, DefaultCache
+from redis.client import Pipeline
+from redis.connection import BlockingConnectionPool
+from redis.cluster import RedisCluster
+from redis.sentinel import SentinelConnectionPool
+
+# Request latency buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def clear(self) -> None:
+        """Drop every value, for label sets that come and go."""
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Cumulative histogram with optional labels."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._values.items())
+        lines = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-2]!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status"),
+))
+REQUEST_PHASE_LATENCY = REGISTRY.register(Histogram(
+    "http_request_phase_duration_seconds",
+    "Time spent in each phase of a request (redis, embed, ...)",
+    ("route", "phase"),
+))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being served",
+))
+REDIS_COMMANDS = REGISTRY.register(Counter(
+    "redis_commands_total",
+    "Redis commands sent, pipelined commands included",
+    ("command",),
+))
+REDIS_ERRORS = REGISTRY.register(Counter(
+    "redis_command_errors_total",
+    "Redis commands that raised",
+    ("command",),
+))
+REDIS_READ_ROUTES = REGISTRY.register(Counter(
+    "redis_read_routes_total",
+    "Reads routed by get_redis(readonly=True), by target (replica, primary)",
+    ("target",),
+))
+REDIS_REPLICAS_HEALTHY = REGISTRY.register(Gauge(
+    "redis_replicas_healthy",
+    "Read replicas within the staleness tolerance at the last health check",
+))
+REDIS_POOL_CONNECTIONS = REGISTRY.register(Gauge(
+    "redis_pool_connections",
+    "Connections held by each pool, by state (in_use, idle)",
+    ("pool", "state"),
+))
+REDIS_POOL_MAX_CONNECTIONS = REGISTRY.register(Gauge(
+    "redis_pool_max_connections",
+    "Size limit of each pool",
+    ("pool",),
+))
+REDIS_POOL_WAIT = REGISTRY.register(Histogram(
+    "redis_pool_wait_seconds",
+    "Time spent waiting for a free connection slot in a pool",
+    ("pool",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+))
+REDIS_POOL_CREATED = REGISTRY.register(Counter(
+    "redis_pool_connections_created_total",
+    "Connections opened by each pool",
+    ("pool",),
+))
+REDIS_POOL_TIMEOUTS = REGISTRY.register(Counter(
+    "redis_pool_timeouts_total",
+    "Requests for a connection that gave up waiting on a full pool",
+    ("pool",),
+))
+CLIENT_CACHE_REQUESTS = REGISTRY.register(Counter(
+    "redis_client_cache_requests_total",
+    "Cacheable reads on the client-side cached connection, by result (hit, miss)",
+    ("result",),
+))
+CLIENT_CACHE_INVALIDATIONS = REGISTRY.register(Counter(
+    "redis_client_cache_invalidations_total",
+    "Cached entries dropped by invalidation messages from Redis",
+))
+CLIENT_CACHE_SIZE = REGISTRY.register(Gauge(
+    "redis_client_cache_entries",
+    "Entries held in the client-side cache",
+))
+
+
+# Phase durations (seconds) of the request being served
+_phases: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_phases", default=None)
+
+
+def start_request() -> Dict[str, float]:
+    """Start collecting phase timings for the current request."""
+    phases: Dict[str, float] = {}
+    _phases.set(phases)
+    return phases
+
+
+def record_phase(name: str, seconds: float) -> None:
+    """Add time to a phase of the current request (no-op outside a request)."""
+    phases = _phases.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block into the named phase of the current request."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - t0)
+
+
+def server_timing(phases: Dict[str, float], total: float) -> str:
+    """Server-Timing header value, durations in milliseconds."""
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+def _command_name(args) -> str:
+    return str(args[0]).upper() if args else "UNKNOWN"
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline that counts its commands and times execute() as "redis"."""
+
+    def execute(self, raise_on_error: bool = True):
+        for args, _ in self.command_stack:
+            REDIS_COMMANDS.inc(_command_name(args))
+        t0 = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            record_phase("redis", time.perf_counter() - t0)
+
+
+def _instrumented_call(call, args, options):
+    """Run one command, counting it and timing it into the "redis" phase."""
+    command = _command_name(args)
+    REDIS_COMMANDS.inc(command)
+    t0 = time.perf_counter()
+    try:
+        return call(*args, **options)
+    except redis.RedisError:
+        REDIS_ERRORS.inc(command)
+        raise
+    finally:
+        record_phase("redis", time.perf_counter() - t0)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client that counts commands and times them as "redis"."""
+
+    def execute_command(self, *args, **options):
+        return _instrumented_call(super().execute_command, args, options)
+
+    def pipeline(self, transaction=True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+class InstrumentedRedisCluster(RedisCluster):
+    """
+    Cluster client with the same instrumentation. The cluster pipeline
+    doesn't expose its queued commands, so they are counted as "PIPELINE".
+    """
+
+    def execute_command(self, *args, **kwargs):
+        return _instrumented_call(super().execute_command, args, kwargs)
+
+    def pipeline(self, transaction=None, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        execute = pipe.execute
+
+        def timed_execute(raise_on_error: bool = True):
+            REDIS_COMMANDS.inc("PIPELINE", amount=len(pipe))
+            t0 = time.perf_counter()
+            try:
+                return execute(raise_on_error)
+            finally:
+                record_phase("redis", time.perf_counter() - t0)
+
+        pipe.execute = timed_execute
+        return pipe
+
+
+# Set when a cacheable read on this thread had to go to Redis
+_cache_fetch = threading.local()
+
+
+class CountingCache(DefaultCache):
+    """redis-py client-side cache that feeds the CLIENT_CACHE_* metrics."""
+
+    def set(self, entry) -> bool:
+        stored = super().set(entry)
+        if stored and entry.status == CacheEntryStatus.IN_PROGRESS:
+            # Placeholder for a reply about to be read from the network
+            _cache_fetch.missed = True
+        CLIENT_CACHE_SIZE.set(self.size)
+        return stored
+
+    def delete_by_redis_keys(self, redis_keys) -> List[bool]:
+        deleted = super().delete_by_redis_keys(redis_keys)
+        CLIENT_CACHE_INVALIDATIONS.inc(amount=len(deleted))
+        CLIENT_CACHE_SIZE.set(self.size)
+        return deleted
+
+    def flush(self) -> int:
+        flushed = super().flush()
+        CLIENT_CACHE_INVALIDATIONS.inc(amount=flushed)
+        CLIENT_CACHE_SIZE.set(0)
+        return flushed
+
+
+class InstrumentedCachedRedis(InstrumentedRedis):
+    """
+    InstrumentedRedis on a client-side cached (RESP3) connection that also
+    counts cacheable reads as hits or misses. Hits are still counted in
+    redis_commands_total; they just never leave the process.
+    """
+
+    def execute_command(self, *args, **options):
+        cache = self.get_cache()
+        if cache is None or not cache.config.is_allowed_to_cache(_command_name(args)):
+            return super().execute_command(*args, **options)
+        _cache_fetch.missed = False
+        result = super().execute_command(*args, **options)
+        CLIENT_CACHE_REQUESTS.inc("miss" if _cache_fetch.missed else "hit")
+        return result
+
+
+class _WaitTimedQueue(LifoQueue):
+    """A pool's slot queue: get() is the wait for a free slot, timed per pool."""
+
+    def __init__(self, maxsize: int, pool_name: str):
+        super().__init__(maxsize)
+        self.pool_name = pool_name
+
+    def get(self, block=True, timeout=None):
+        t0 = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            REDIS_POOL_WAIT.observe(time.perf_counter() - t0, self.pool_name)
+
+
+class InstrumentedBlockingConnectionPool(BlockingConnectionPool):
+    """
+    BlockingConnectionPool that reports its saturation. Callers wait up
+    to `timeout` seconds for a free connection instead of failing at once.
+    Only that wait is timed: connecting and health-check PINGs are not.
+    """
+
+    def __init__(self, name: str, **kwargs):
+        self.name = name
+        super().__init__(queue_class=functools.partial(_WaitTimedQueue, pool_name=name), **kwargs)
+        REDIS_POOL_MAX_CONNECTIONS.set(self.max_connections, name)
+        self._update_gauges()
+
+    def make_connection(self):
+        connection = super().make_connection()
+        REDIS_POOL_CREATED.inc(self.name)
+        return connection
+
+    def get_connection(self, *args, **kwargs):
+        try:
+            return super().get_connection(*args, **kwargs)
+        except redis.ConnectionError as e:
+            if "No connection available" in str(e):
+                REDIS_POOL_TIMEOUTS.inc(self.name)
+            raise
+        finally:
+            self._update_gauges()
+
+    def release(self, connection) -> None:
+        super().release(connection)
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        # Idle connections wait in the queue; empty slots are None
+        idle = sum(1 for connection in list(self.pool.queue) if connection is not None)
+        REDIS_POOL_CONNECTIONS.set(len(self._connections) - idle, self.name, "in_use")
+        REDIS_POOL_CONNECTIONS.set(idle, self.name, "idle")
+
+
+class InstrumentedSentinelConnectionPool(SentinelConnectionPool, InstrumentedBlockingConnectionPool):
+    """
+    Sentinel-managed pool (follows the primary through failovers, or
+    rotates over the replicas) that blocks and reports like
+    InstrumentedBlockingConnectionPool. Pass it as master_for()/slave_for()
+    connection_pool_class, with `name` among the connection kwargs.
+    """
@@ -0,0 +1,610 @@
+"""
+On-demand profiling for a running consumer or API process.
+
+Lets a live process be diagnosed without a restart or extra tooling:
+
+- Profiler: one session at a time, for N seconds, in one of two modes:
+  "sample" takes a statistical sample of every thread's stack
+  (sys._current_frames) every few milliseconds; "cprofile" runs cProfile
+  inside the regions wrapped in profiled() (the consumer's batches)
+- MemoryTracker: tracemalloc snapshots with the top allocations and the
+  growth since the previous snapshot
+- SlowBatchMonitor: records every batch slower than a threshold, with
+  its slowest transactions, the Redis commands it sent and (optionally)
+  its cProfile top functions
+- install_signal_handlers(): SIGUSR1 profiles for PROFILE_SECONDS,
+  SIGUSR2 takes a memory snapshot
+
+Reports are written under PROFILE_DIR and returned as dicts (served by
+the API's /api/admin endpoints, which need ADMIN_TOKEN set).
+
+Example:
+    $ kill -USR1 $(pgrep -f processor/consumer.py)
+    $ ls /tmp/profiles/
+    consumer-41-20240101-120000-sample.txt  consumer-41-20240101-120000-sample.collapsed
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import signal
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from lib import metrics
+from lib.logger import setup_logger
+
+# Configuration from environment
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "profiles")))
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "30"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample").lower()
+SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "10"))
+SLOW_BATCH_MS = float(os.getenv("PROFILE_SLOW_BATCH_MS", "0"))
+SLOW_BATCH_KEEP = int(os.getenv("PROFILE_SLOW_BATCH_KEEP", "20"))
+SLOW_BATCH_CPROFILE = os.getenv("PROFILE_SLOW_BATCH_CPROFILE", "false").lower() == "true"
+
+MODES = ("sample", "cprofile")
+MAX_SECONDS = 600
+# Functions listed in reports
+TOP_FUNCTIONS = 30
+
+ROOT = Path(__file__).parent.parent
+
+# Leaf frames of a thread that is waiting, not working: counted apart
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("concurrent/futures/thread.py", "_worker"),
+}
+
+# Allocations made by the import system and tracemalloc itself
+MEMORY_FILTERS = [
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+logger = setup_logger("profiling")
+
+# Set while a cProfile profile runs in the thread (only one can)
+_local = threading.local()
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profiling session is already running."""
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to the repo or site-packages, for readable labels."""
+    path = filename.replace(os.sep, "/")
+    root = str(ROOT).replace(os.sep, "/") + "/"
+    if path.startswith(root):
+        return path[len(root):]
+    for marker in ("/site-packages/", "/dist-packages/"):
+        if marker in path:
+            return path.split(marker, 1)[1]
+    prefix = os.path.dirname(os.__file__).replace(os.sep, "/") + "/"
+    if path.startswith(prefix):
+        return path[len(prefix):]
+    return path
+
+
+def _function_label(filename: str, line: int, name: str) -> str:
+    return f"{name} ({_short_path(filename)}:{line})"
+
+
+def _location(stat: tracemalloc.Statistic) -> str:
+    if not stat.traceback:
+        return "<unknown>"
+    frame = stat.traceback[0]
+    return f"{_short_path(frame.filename)}:{frame.lineno}"
+
+
+def _timestamp() -> str:
+    return time.strftime("%Y%m%d-%H%M%S")
+
+
+def _write_json(path: Path, document: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2, default=str) + "\n")
+
+
+@contextmanager
+def _thread_profile() -> Iterator[Optional[cProfile.Profile]]:
+    """cProfile the block, or yield None if the thread is already profiled."""
+    if getattr(_local, "active", False):
+        yield None
+        return
+    profile = cProfile.Profile()
+    _local.active = True
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        _local.active = False
+
+
+def _top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+    """Functions by time spent in the function itself."""
+    rows = []
+    for (filename, line, name), (_, calls, self_s, total_s, _) in stats.stats.items():
+        rows.append({
+            "function": _function_label(filename, line, name),
+            "calls": calls,
+            "self_ms": round(self_s * 1000, 3),
+            "total_ms": round(total_s * 1000, 3),
+        })
+    rows.sort(key=lambda row: row["self_ms"], reverse=True)
+    return rows[:limit]
+
+
+class _Session:
+    """One profiling run; finishes on its own after `seconds`."""
+
+    def __init__(self, profiler: "Profiler", seconds: float, mode: str):
+        self.profiler = profiler
+        self.seconds = seconds
+        self.mode = mode
+        self.started = time.time()
+        self.future: Future = Future()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+        self._regions = 0
+        self._thread = threading.Thread(
+            target=self._run, name=f"profiler-{mode}", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def add(self, profile: cProfile.Profile) -> None:
+        """Merge the profile of one profiled() region."""
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self._regions += 1
+
+    def _run(self) -> None:
+        try:
+            if self.mode == "sample":
+                report = self._sample()
+            else:
+                self._stop.wait(self.seconds)
+                report = self._cprofile_report()
+        except Exception as e:
+            logger.error(f"Profiling failed: {e}", exc_info=True)
+            self.profiler._finish(self, None)
+            self.future.set_exception(e)
+            return
+        self.profiler._finish(self, report)
+        self.future.set_result(report)
+
+    def _base_report(self) -> Dict[str, Any]:
+        return {
+            "process": self.profiler.name,
+            "pid": os.getpid(),
+            "mode": self.mode,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "seconds": round(time.time() - self.started, 3),
+        }
+
+    def _path(self, suffix: str) -> Path:
+        started = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        name = f"{self.profiler.name}-{os.getpid()}-{started}-{self.mode}{suffix}"
+        return self.profiler.directory / name
+
+    def _sample(self) -> Dict[str, Any]:
+        """Sample every other thread's stack until the session ends."""
+        interval = SAMPLE_INTERVAL_MS / 1000
+        deadline = time.monotonic() + self.seconds
+        own = threading.get_ident()
+        labels: Dict[Any, str] = {}
+        stacks: Counter = Counter()
+        self_samples: Counter = Counter()
+        total_samples: Counter = Counter()
+        threads: Counter = Counter()
+        samples = idle = 0
+
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                leaf = frame.f_code
+                if (_short_path(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+                    idle += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _function_label(
+                            code.co_filename, code.co_firstlineno, code.co_name
+                        )
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.reverse()
+                thread = names.get(ident, str(ident))
+                stacks[(thread,) + tuple(stack)] += 1
+                self_samples[stack[-1]] += 1
+                for label in set(stack):
+                    total_samples[label] += 1
+                threads[thread] += 1
+                samples += 1
+            self._stop.wait(interval)
+
+        report = self._base_report()
+        report.update({
+            "interval_ms": SAMPLE_INTERVAL_MS,
+            "samples": samples,
+            "idle_samples": idle,
+            "threads": dict(threads.most_common()),
+            "top_functions": [
+                {
+                    "function": label,
+                    "self": count,
+                    "total": total_samples[label],
+                    "self_pct": round(100 * count / samples, 1),
+                    "total_pct": round(100 * total_samples[label] / samples, 1),
+                }
+                for label, count in self_samples.most_common(TOP_FUNCTIONS)
+            ],
+        })
+
+        # Collapsed stacks: flamegraph.pl / speedscope input
+        collapsed = self._path(".collapsed")
+        collapsed.parent.mkdir(parents=True, exist_ok=True)
+        with collapsed.open("w") as f:
+            for stack, count in stacks.most_common():
+                f.write(";".join(stack) + f" {count}\n")
+
+        text = self._path(".txt")
+        lines = [
+            f"{report['process']} (pid {report['pid']}): {samples} samples every "
+            f"{SAMPLE_INTERVAL_MS:g} ms over {report['seconds']:g}s, {idle} idle",
+            "",
+            f"{'self':>7s} {'total':>7s}  function",
+        ]
+        for row in report["top_functions"]:
+            lines.append(f"{row['self_pct']:6.1f}% {row['total_pct']:6.1f}%  {row['function']}")
+        text.write_text("\n".join(lines) + "\n")
+
+        report["files"] = {"collapsed": str(collapsed), "text": str(text)}
+        return report
+
+    def _cprofile_report(self) -> Dict[str, Any]:
+        report = self._base_report()
+        with self._lock:
+            stats, regions = self._stats, self._regions
+            self._stats = None
+        report["regions"] = regions
+        if stats is None:
+            report["top_functions"] = []
+            report["note"] = "No profiled() region ran during the session"
+            return report
+
+        report["top_functions"] = _top_functions(stats)
+        prof = self._path(".prof")
+        prof.parent.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(str(prof))
+        text = self._path(".txt")
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        text.write_text(out.getvalue())
+        report["files"] = {"prof": str(prof), "text": str(text)}
+        return report
+
+
+class Profiler:
+    """
+    Runs one profiling session at a time for a process.
+
+    Example:
+        >>> profiler = Profiler("consumer")
+        >>> with profiler.profiled():      # a region cProfile mode covers
+        ...     process_batch()
+        >>> report = profiler.start(10, "sample").future.result()
+    """
+
+    def __init__(self, name: str, directory: Path = PROFILE_DIR):
+        self.name = name
+        self.directory = Path(directory)
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._session: Optional[_Session] = None
+
+    def start(self, seconds: float = PROFILE_SECONDS, mode: str = PROFILE_MODE) -> _Session:
+        """
+        Start a session; its report is `session.future.result()`.
+
+        Raises:
+            ValueError: unknown mode, or seconds out of range
+            ProfilerBusy: a session is already running
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if not 0 < seconds <= MAX_SECONDS:
+            raise ValueError(f"seconds must be between 0 and {MAX_SECONDS}")
+        with self._lock:
+            if self._session is not None:
+                raise ProfilerBusy(
+                    f"A {self._session.mode} session is already running "
+                    f"(started {time.time() - self._session.started:.0f}s ago)"
+                )
+            self._session = _Session(self, seconds, mode)
+        logger.info(f"Profiling {self.name} for {seconds:g}s ({mode})")
+        self._session.start()
+        return self._session
+
+    def stop(self) -> bool:
+        """End the running session early. Returns False if none was running."""
+        session = self._session
+        if session is None:
+            return False
+        session.stop()
+        return True
+
+    def _finish(self, session: _Session, report: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            if self._session is session:
+                self._session = None
+            if report is not None:
+                self.last_report = report
+        if report is not None:
+            files = ", ".join(report.get("files", {}).values()) or "no files written"
+            logger.info(f"Profile of {self.name} done: {files}")
+
+    @contextmanager
+    def profiled(self) -> Iterator[None]:
+        """Profile the block with cProfile while a cprofile session runs."""
+        session = self._session
+        if session is None or session.mode != "cprofile":
+            yield
+            return
+        with _thread_profile() as profile:
+            yield
+        if profile is not None:
+            session.add(profile)
+
+    def status(self) -> Dict[str, Any]:
+        session = self._session
+        running = None
+        if session is not None:
+            running = {
+                "mode": session.mode,
+                "seconds": session.seconds,
+                "elapsed": round(time.time() - session.started, 3),
+            }
+        return {"running": running, "directory": str(self.directory), "last_report": self.last_report}
+
+
+class MemoryTracker:
+    """
+    tracemalloc snapshots: top allocations and growth between snapshots.
+
+    The first snapshot starts tracing, so it only sees allocations made
+    from then on; later snapshots are compared with the previous one.
+    Tracing slows allocation-heavy code down: stop() it when done.
+    """
+
+    def __init__(self, name: str, directory: Path = PROFILE_DIR):
+        self.name = name
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def snapshot(self, top: int = 25) -> Dict[str, Any]:
+        """Take a snapshot, write it as JSON and return the report."""
+        with self._lock:
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._previous = None
+            snapshot = tracemalloc.take_snapshot().filter_traces(MEMORY_FILTERS)
+            current, peak = tracemalloc.get_traced_memory()
+
+            report: Dict[str, Any] = {
+                "process": self.name,
+                "pid": os.getpid(),
+                "taken": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "tracing_started": started,
+                "traced_bytes": current,
+                "peak_bytes": peak,
+                "top_allocations": [
+                    {
+                        "location": _location(stat),
+                        "size_bytes": stat.size,
+                        "count": stat.count,
+                    }
+                    for stat in snapshot.statistics("lineno")[:top]
+                ],
+            }
+            if self._previous is not None:
+                report["growth"] = [
+                    {
+                        "location": _location(stat),
+                        "size_diff_bytes": stat.size_diff,
+                        "count_diff": stat.count_diff,
+                        "size_bytes": stat.size,
+                    }
+                    for stat in snapshot.compare_to(self._previous, "lineno")[:top]
+                    if stat.size_diff
+                ]
+            self._previous = snapshot
+
+        path = self.directory / f"{self.name}-{os.getpid()}-{_timestamp()}-memory.json"
+        _write_json(path, report)
+        report["file"] = str(path)
+        logger.info(f"Memory snapshot of {self.name}: {current / 1e6:.1f} MB traced, written to {path}")
+        return report
+
+    def stop(self) -> bool:
+        """Stop tracing. Returns False if it wasn't running."""
+        with self._lock:
+            self._previous = None
+            if not tracemalloc.is_tracing():
+                return False
+            tracemalloc.stop()
+        logger.info(f"Memory tracing of {self.name} stopped")
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {"tracing": tracing, "traced_bytes": current, "peak_bytes": peak}
+
+
+class _Batch:
+    """Timings of one batch, filled in by SlowBatchMonitor.batch()."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.transactions: List[tuple] = []
+
+    @contextmanager
+    def transaction(self, transaction_id: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.transactions.append((transaction_id, time.perf_counter() - t0))
+
+
+class SlowBatchMonitor:
+    """
+    Records batches slower than `threshold_ms` (0 disables it).
+
+    Each slow batch is logged, kept in memory (the last `keep`) and
+    appended to <name>-slow-batches.jsonl under the profile directory.
+
+    Example:
+        >>> with monitor.batch(len(messages)) as batch:
+        ...     for tx in messages:
+        ...         with batch.transaction(tx["transactionId"]):
+        ...             dispatch_transaction(redis, tx)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold_ms: float = SLOW_BATCH_MS,
+        keep: int = SLOW_BATCH_KEEP,
+        cprofile: bool = SLOW_BATCH_CPROFILE,
+        directory: Path = PROFILE_DIR,
+    ):
+        self.name = name
+        self.threshold_ms = threshold_ms
+        self.cprofile = cprofile
+        self.path = Path(directory) / f"{name}-slow-batches.jsonl"
+        self.recent: deque = deque(maxlen=keep)
+        self.slow_batches = 0
+
+    @contextmanager
+    def batch(self, size: int) -> Iterator[_Batch]:
+        batch = _Batch(size)
+        if self.threshold_ms <= 0:
+            yield batch
+            return
+
+        commands_before = dict(metrics.REDIS_COMMANDS._values)
+        t0 = time.perf_counter()
+        if self.cprofile:
+            with _thread_profile() as profile:
+                yield batch
+        else:
+            profile = None
+            yield batch
+        duration_ms = (time.perf_counter() - t0) * 1000
+        if duration_ms >= self.threshold_ms:
+            self._record(batch, duration_ms, commands_before, profile)
+
+    def _record(self, batch: _Batch, duration_ms: float, commands_before: Dict, profile) -> None:
+        commands = {}
+        for labels, count in list(metrics.REDIS_COMMANDS._values.items()):
+            diff = count - commands_before.get(labels, 0)
+            if diff:
+                commands[labels[0] if labels else ""] = int(diff)
+        slowest = sorted(batch.transactions, key=lambda item: item[1], reverse=True)[:5]
+        record: Dict[str, Any] = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duration_ms": round(duration_ms, 3),
+            "threshold_ms": self.threshold_ms,
+            "size": batch.size,
+            "slowest": [
+                {"transactionId": tx_id, "ms": round(seconds * 1000, 3)} for tx_id, seconds in slowest
+            ],
+            "redis_commands": dict(sorted(commands.items(), key=lambda item: -item[1])),
+        }
+        if profile is not None:
+            record["top_functions"] = _top_functions(pstats.Stats(profile), limit=10)
+
+        self.slow_batches += 1
+        self.recent.append(record)
+        logger.warning(
+            f"Slow batch: {batch.size} transactions in {duration_ms:.0f} ms "
+            f"(threshold {self.threshold_ms:g} ms), details in {self.path}"
+        )
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write slow batch record: {e}")
+
+
+def install_signal_handlers(profiler: Profiler, memory: MemoryTracker) -> bool:
+    """
+    SIGUSR1 profiles for PROFILE_SECONDS (PROFILE_MODE), SIGUSR2 takes a
+    memory snapshot; reports go to the profile directory.
+
+    Returns False where the signals don't exist (Windows) or outside the
+    main thread, where handlers can't be installed.
+    """
+    if not hasattr(signal, "SIGUSR1"):
+        return False
+
+    # Handlers run between bytecodes of the main thread, which may hold
+    # the profiler's locks: do the work on a thread of its own
+    def run(target, *args):
+        def work():
+            try:
+                target(*args)
+            except ProfilerBusy as e:
+                logger.warning(str(e))
+            except Exception as e:
+                logger.error(f"Profiling signal failed: {e}", exc_info=True)
+        threading.Thread(target=work, name="profiler-signal", daemon=True).start()
+
+    try:
+        signal.signal(signal.SIGUSR1, lambda signum, frame: run(profiler.start))
+        signal.signal(signal.SIGUSR2, lambda signum, frame: run(memory.snapshot))
+    except ValueError:
+        return False
+    logger.info(
+        f"Profiling signals: kill -USR1 {os.getpid()} (profile {PROFILE_SECONDS:g}s), "
+        f"kill -USR2 {os.getpid()} (memory snapshot); output in {profiler.directory}"
+    )
+    return True
@@ -3,25 +3,118 @@ Redis client wrapper for the transaction workshop.
 
 Provides a singleton Redis connection with connection pooling,
 error handling, and configuration loading from environment variables.
+Standalone Redis by default; Redis Cluster with REDIS_CLUSTER=true.
+
+get_redis(readonly=True) routes reads to healthy read replicas
+(REDIS_REPLICAS, or discovered through Sentinel with REDIS_SENTINELS),
+falling back to the primary when none is within the staleness tolerance.
+
+get_cached_redis() is an opt-in second client (REDIS_CLIENT_CACHE=true)
+with server-assisted client-side caching: reads of hot keys are answered
+from process memory, and Redis pushes an invalidation (RESP3 client
+tracking) as soon as a cached key changes.
+
+REDIS_BACKEND=memory swaps Redis for the in-process engine in
+memory_backend, to benchmark module logic without network or server cost.
 """
 
+import itertools
 import os
-from typing import Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 import redis
+from redis.backoff import ExponentialWithJitterBackoff, NoBackoff
+from redis.cache import CacheConfig
+from redis.cluster import RedisCluster
+from redis.crc import key_slot
+from redis.retry import Retry
+from redis.sentinel import Sentinel
+
+from . import metrics
+from .metrics import (
+    CountingCache,
+    InstrumentedBlockingConnectionPool,
+    InstrumentedCachedRedis,
+    InstrumentedRedis,
+    InstrumentedRedisCluster,
+    InstrumentedSentinelConnectionPool,
+)
+from .memory_backend import MemoryRedis
 
 # Global Redis client instance
 _redis_client: Optional[redis.Redis] = None
 
+# "redis", or "memory" for the in-process MemoryRedis engine
+BACKEND = os.getenv("REDIS_BACKEND", "redis").lower()
+
+# Connection pool and socket settings, shared by every client
+POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "10"))
+POOL_TIMEOUT_S = float(os.getenv("REDIS_POOL_TIMEOUT_S", "5"))
+SOCKET_TIMEOUT_S = float(os.getenv("REDIS_SOCKET_TIMEOUT_S", "0")) or None
+SOCKET_CONNECT_TIMEOUT_S = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT_S", "5"))
+HEALTH_CHECK_INTERVAL_S = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL_S", "30"))
+RETRIES = int(os.getenv("REDIS_RETRIES", "3"))
+RETRY_BACKOFF_BASE_S = float(os.getenv("REDIS_RETRY_BACKOFF_BASE_S", "0.05"))
+RETRY_BACKOFF_CAP_S = float(os.getenv("REDIS_RETRY_BACKOFF_CAP_S", "1"))
+# Client-side cached client (None until first use, or when disabled)
+_cached_client: Optional[redis.Redis] = None
+
+CLIENT_CACHE_ENABLED = os.getenv("REDIS_CLIENT_CACHE", "false").lower() == "true"
+CLIENT_CACHE_MAX_KEYS = int(os.getenv("REDIS_CLIENT_CACHE_MAX_KEYS", "10000"))
 
-def get_redis() -> redis.Redis:
+# Read replicas (None until first readonly use)
+_replicas: Optional["ReplicaSet"] = None
+_sentinel: Optional[Sentinel] = None
+
+SENTINEL_SERVICE = os.getenv("REDIS_SENTINEL_SERVICE", "mymaster")
+# A replica serves reads while it heard from the primary this recently.
+# Idle primaries only ping replicas every repl-ping-replica-period (10s).
+REPLICA_MAX_LAG_S = float(os.getenv("REDIS_REPLICA_MAX_LAG_S", "15"))
+REPLICA_CHECK_INTERVAL_S = float(os.getenv("REDIS_REPLICA_CHECK_INTERVAL_S", "5"))
+REPLICA_PROBE_TIMEOUT_S = float(os.getenv("REDIS_REPLICA_PROBE_TIMEOUT_S", "1"))
+
+
+def get_redis(readonly: bool = False) -> redis.Redis:
     """
     Get or create a Redis client connection.
 
     Returns a singleton Redis client instance with connection pooling.
     Configuration is loaded from environment variables:
+    - REDIS_BACKEND: "memory" to use an in-process MemoryRedis instead of
+      a server; the other settings are then ignored (default: redis)
     - REDIS_HOST: Redis server hostname (default: localhost)
     - REDIS_PORT: Redis server port (default: 6379)
     - REDIS_PASSWORD: Redis password (default: None)
+    - REDIS_CLUSTER: "true" to connect to a Redis Cluster, using
+      REDIS_HOST:REDIS_PORT as the startup node (default: false)
+    - REDIS_MAX_CONNECTIONS: pool size, per node on a cluster (default: 10)
+    - REDIS_POOL_TIMEOUT_S: how long a command waits for a free pooled
+      connection before raising (default: 5)
+    - REDIS_SOCKET_TIMEOUT_S: socket read/write timeout, 0 for none
+      (default: 0; keep it above the longest blocking XREAD)
+    - REDIS_SOCKET_CONNECT_TIMEOUT_S: connect timeout (default: 5)
+    - REDIS_HEALTH_CHECK_INTERVAL_S: PING connections idle this long
+      before reuse (default: 30)
+    - REDIS_RETRIES, REDIS_RETRY_BACKOFF_BASE_S, REDIS_RETRY_BACKOFF_CAP_S:
+      retries on connection errors and timeouts, with exponential backoff
+      and jitter (default: 3, 0.05, 1)
+    - REDIS_SENTINELS: comma-separated Sentinel "host:port" list; the
+      primary (and replicas) of REDIS_SENTINEL_SERVICE are discovered
+      through them instead of REDIS_HOST (default: none)
+    - REDIS_REPLICAS: comma-separated "host:port" read replicas
+      (default: none)
+    - REDIS_REPLICA_MAX_LAG_S: staleness tolerance for replica reads
+      (default: 15)
+    - REDIS_REPLICA_CHECK_INTERVAL_S: seconds between replica health
+      checks (default: 5)
+    - REDIS_REPLICA_PROBE_TIMEOUT_S: connect and read timeout of a health
+      check, which is not retried (default: 1)
+
+    Args:
+        readonly: The caller only reads and tolerates REDIS_REPLICA_MAX_LAG_S
+                  of staleness, so a healthy replica may serve it. Falls
+                  back to the primary when no replica is healthy.
 
     Returns:
         redis.Redis: Connected Redis client instance
@@ -37,28 +130,47 @@ def get_redis() -> redis.Redis:
     """
     global _redis_client
 
+    if readonly and BACKEND != "memory":
+        replica = _pick_replica()
+        if replica is not None:
+            return replica
+
     if _redis_client is not None:
         return _redis_client
 
+    if BACKEND == "memory":
+        _redis_client = MemoryRedis()
+        return _redis_client
+
     # Get configuration from environment
     host = os.getenv("REDIS_HOST", "localhost")
     port = int(os.getenv("REDIS_PORT", "6379"))
     password = None
 
-    # Create connection pool for better performance
-    pool = redis.ConnectionPool(
+    if os.getenv("REDIS_CLUSTER", "false").lower() == "true":
+        _redis_client = _connect_cluster(host, port, password)
+        return _redis_client
+
+    if os.getenv("REDIS_SENTINELS"):
+        _redis_client = _get_sentinel().master_for(
+            SENTINEL_SERVICE,
+            redis_class=InstrumentedRedis,
+            connection_pool_class=InstrumentedSentinelConnectionPool,
+            **_pool_options(f"sentinel:{SENTINEL_SERVICE}:primary"),
+        )
+        return _redis_client
+
+    # Create connection pool for better performance (waits for a free
+    # connection when all are busy, rather than failing)
+    pool = _make_pool(
+        "primary",
         host=host,
         port=port,
         password=password if password else None,
-        decode_responses=True,  # Auto-decode responses to strings
-        max_connections=10,
-        socket_keepalive=True,
-        socket_connect_timeout=5,
-        retry_on_timeout=True,
     )
 
-    # Create Redis client
-    _redis_client = redis.Redis(connection_pool=pool)
+    # Create Redis client (counts commands for /metrics)
+    _redis_client = InstrumentedRedis(connection_pool=pool)
 
     # Test connection
     try:
@@ -72,14 +184,321 @@ def get_redis() -> redis.Redis:
     return _redis_client
 
 
+def _connection_options() -> Dict:
+    """Socket, health check and retry settings for every connection."""
+    return {
+        "socket_keepalive": True,
+        "socket_timeout": SOCKET_TIMEOUT_S,
+        "socket_connect_timeout": SOCKET_CONNECT_TIMEOUT_S,
+        "health_check_interval": HEALTH_CHECK_INTERVAL_S,
+        "retry": Retry(ExponentialWithJitterBackoff(RETRY_BACKOFF_CAP_S, RETRY_BACKOFF_BASE_S), RETRIES),
+    }
+
+
+def _pool_options(name: str) -> Dict:
+    """Settings of a pool reported as `name` in the pool metrics."""
+    return {
+        "name": name,
+        "decode_responses": True,  # Auto-decode responses to strings
+        "max_connections": POOL_MAX_CONNECTIONS,
+        "timeout": POOL_TIMEOUT_S,
+        **_connection_options(),
+    }
+
+
+def _make_pool(name: str, **kwargs) -> InstrumentedBlockingConnectionPool:
+    """Blocking connection pool reported as `name` in the pool metrics."""
+    return InstrumentedBlockingConnectionPool(**_pool_options(name), **kwargs)
+
+
+def _cluster_node_pool(**kwargs) -> InstrumentedBlockingConnectionPool:
+    """Pool of one cluster node, reported as "cluster:<host>:<port>"."""
+    return InstrumentedBlockingConnectionPool(
+        f"cluster:{kwargs['host']}:{kwargs['port']}",
+        timeout=POOL_TIMEOUT_S,
+        **kwargs,
+    )
+
+
+def _connect_cluster(host: str, port: int, password: Optional[str]) -> RedisCluster:
+    """
+    Cluster client: discovers every node from one startup node.
+
+    Started from a URL, so that every node's pool is created through
+    connection_pool_class (redis-py only uses it for URL clients).
+    """
+    try:
+        return InstrumentedRedisCluster(
+            url=f"redis://{host}:{port}",
+            password=password if password else None,
+            decode_responses=True,
+            max_connections=POOL_MAX_CONNECTIONS,  # per node
+            connection_pool_class=_cluster_node_pool,
+            **_connection_options(),
+        )
+    except redis.RedisError as e:
+        raise redis.ConnectionError(
+            f"Failed to connect to Redis Cluster at {host}:{port}. "
+            f"Make sure the cluster is running. Error: {e}"
+        ) from e
+
+
+def _parse_nodes(value: str) -> List[Tuple[str, int]]:
+    """Parse "host:port,host" into [(host, port), ...] (port defaults to 6379)."""
+    nodes = []
+    for node in value.split(","):
+        node = node.strip()
+        if not node:
+            continue
+        host, _, port = node.partition(":")
+        nodes.append((host, int(port) if port else 6379))
+    return nodes
+
+
+def _get_sentinel() -> Sentinel:
+    global _sentinel
+
+    if _sentinel is None:
+        _sentinel = Sentinel(
+            _parse_nodes(os.getenv("REDIS_SENTINELS", "")),
+            socket_timeout=1,
+            socket_connect_timeout=1,
+        )
+    return _sentinel
+
+
+class ReplicaSet:
+    """
+    Read replicas, health-checked every `check_interval_s` by a background
+    thread.
+
+    A replica is healthy while its link to the primary is up, it is not
+    resyncing, and it heard from the primary within `max_lag_s`. Reads are
+    spread round-robin over the healthy ones. pick() only reads the latest
+    check, so a hung replica never holds up a request: the checks go
+    through `probes`, clients with a short timeout and no retries. Until
+    the first check completes, reads go to the primary.
+    """
+
+    def __init__(self, clients: Dict[str, redis.Redis], probes: Dict[str, redis.Redis],
+                 max_lag_s: float, check_interval_s: float):
+        self.clients = clients
+        self.probes = probes
+        self.max_lag_s = max_lag_s
+        self.check_interval_s = check_interval_s
+        self._healthy: List[redis.Redis] = []
+        self._status: List[Dict] = []
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def pick(self) -> Optional[redis.Redis]:
+        """A healthy replica, or None."""
+        self._start()
+        healthy = self._healthy
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def status(self) -> List[Dict]:
+        """Result of the latest health check, per replica (empty before the first)."""
+        self._start()
+        return self._status
+
+    def close(self) -> None:
+        """Stop the health checks and close every client."""
+        self._stopped.set()
+        for client in list(self.clients.values()) + list(self.probes.values()):
+            client.close()
+
+    def _start(self) -> None:
+        if self._thread is not None or not self.clients:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._refresh()
+            except Exception:
+                pass  # the previous check stands; retried next interval
+            self._stopped.wait(self.check_interval_s)
+
+    def _refresh(self) -> None:
+        status = [self._check(name, probe) for name, probe in self.probes.items()]
+        self._healthy = [self.clients[result["replica"]] for result in status if result["healthy"]]
+        self._status = status
+        metrics.REDIS_REPLICAS_HEALTHY.set(len(self._healthy))
+
+    def _check(self, name: str, client: redis.Redis) -> Dict:
+        result = {"replica": name, "healthy": False, "lag_s": None, "error": None}
+        try:
+            info = client.info("replication")
+        except redis.RedisError as e:
+            result["error"] = str(e)
+            return result
+
+        if info.get("role") == "master":
+            # Sentinel falls back to the primary when it has no replicas
+            result.update(healthy=True, lag_s=0)
+        elif info.get("master_link_status") != "up":
+            result["error"] = "link to primary is down"
+        elif info.get("master_sync_in_progress"):
+            result["error"] = "resyncing"
+        else:
+            lag = info.get("master_last_io_seconds_ago", -1)
+            result["lag_s"] = lag
+            if 0 <= lag <= self.max_lag_s:
+                result["healthy"] = True
+            else:
+                result["error"] = f"lag {lag}s exceeds {self.max_lag_s:g}s"
+        return result
+
+
+def _probe_options() -> Dict:
+    """Replica health checks: fail fast rather than wait out a hung replica."""
+    return {
+        "decode_responses": True,
+        "socket_timeout": REPLICA_PROBE_TIMEOUT_S,
+        "socket_connect_timeout": REPLICA_PROBE_TIMEOUT_S,
+        "retry": Retry(NoBackoff(), 0),
+    }
+
+
+def _connect_replicas() -> ReplicaSet:
+    """Replica clients from REDIS_REPLICAS or Sentinel (empty if neither)."""
+    clients: Dict[str, redis.Redis] = {}
+    probes: Dict[str, redis.Redis] = {}
+    for host, port in _parse_nodes(os.getenv("REDIS_REPLICAS", "")):
+        pool = _make_pool(f"replica:{host}:{port}", host=host, port=port)
+        clients[f"{host}:{port}"] = InstrumentedRedis(connection_pool=pool)
+        probes[f"{host}:{port}"] = redis.Redis(host=host, port=port, **_probe_options())
+    if os.getenv("REDIS_SENTINELS"):
+        clients[f"sentinel:{SENTINEL_SERVICE}"] = _get_sentinel().slave_for(
+            SENTINEL_SERVICE,
+            redis_class=InstrumentedRedis,
+            connection_pool_class=InstrumentedSentinelConnectionPool,
+            **_pool_options(f"sentinel:{SENTINEL_SERVICE}:replica"),
+        )
+        probes[f"sentinel:{SENTINEL_SERVICE}"] = _get_sentinel().slave_for(SENTINEL_SERVICE, **_probe_options())
+    return ReplicaSet(clients, probes, REPLICA_MAX_LAG_S, REPLICA_CHECK_INTERVAL_S)
+
+
+def _pick_replica() -> Optional[redis.Redis]:
+    """A healthy replica for a read, or None to read from the primary."""
+    global _replicas
+
+    if _replicas is None:
+        _replicas = _connect_replicas()
+    replica = _replicas.pick()
+    metrics.REDIS_READ_ROUTES.inc("replica" if replica is not None else "primary")
+    return replica
+
+
+def replica_status() -> List[Dict]:
+    """Health of each configured read replica (empty without replicas)."""
+    global _replicas
+
+    if _replicas is None:
+        _replicas = _connect_replicas()
+    return _replicas.status()
+
+
+def get_cached_redis() -> redis.Redis:
+    """
+    Get the client-side cached Redis client, for read-mostly keys.
+
+    Configuration (besides REDIS_HOST/REDIS_PORT):
+    - REDIS_CLIENT_CACHE: "true" to enable (default: false, which returns
+      the regular get_redis() client)
+    - REDIS_CLIENT_CACHE_MAX_KEYS: cached replies kept, least recently used
+      evicted first (default: 10000)
+
+    Only single read commands are cached (GET, ZREVRANGE, TS.GET, JSON.GET,
+    ...); pipelines and writes go straight to Redis. The connection speaks
+    RESP3, so some replies differ in shape from get_redis() (e.g.
+    ZREVRANGE WITHSCORES returns [member, score] lists).
+    """
+    global _cached_client
+
+    if (
+        not CLIENT_CACHE_ENABLED
+        or BACKEND == "memory"
+        or os.getenv("REDIS_SENTINELS")
+        or is_cluster(get_redis())
+    ):
+        return get_redis()
+    if _cached_client is not None:
+        return _cached_client
+
+    host = os.getenv("REDIS_HOST", "localhost")
+    port = int(os.getenv("REDIS_PORT", "6379"))
+    pool = _make_pool(
+        "cached",
+        host=host,
+        port=port,
+        protocol=3,
+        cache_config=CacheConfig(max_size=CLIENT_CACHE_MAX_KEYS, cache_class=CountingCache),
+    )
+    _cached_client = InstrumentedCachedRedis(connection_pool=pool)
+    return _cached_client
+
+
+def client_cache_stats() -> Dict:
+    """Hit rate and size of the client-side cache."""
+    hits = metrics.CLIENT_CACHE_REQUESTS.value("hit")
+    misses = metrics.CLIENT_CACHE_REQUESTS.value("miss")
+    cache = _cached_client.get_cache() if _cached_client is not None else None
+    return {
+        "enabled": cache is not None,
+        "entries": cache.size if cache is not None else 0,
+        "max_entries": CLIENT_CACHE_MAX_KEYS,
+        "hits": int(hits),
+        "misses": int(misses),
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+        "invalidations": int(metrics.CLIENT_CACHE_INVALIDATIONS.value()),
+    }
+
+
+def is_cluster(client) -> bool:
+    """True for a Redis Cluster client."""
+    return isinstance(client, RedisCluster)
+
+
+def group_keys_by_slot(client, keys: List[str]) -> List[List[str]]:
+    """
+    Split keys so each group can go in one multi-key command.
+
+    On a cluster, multi-key commands (JSON.MGET, ZUNIONSTORE, ...) must
+    stay within one hash slot; keys are grouped by slot, keeping their
+    relative order. Standalone Redis gets a single group.
+    """
+    if not is_cluster(client):
+        return [list(keys)] if keys else []
+    groups: Dict[int, List[str]] = {}
+    for key in keys:
+        groups.setdefault(key_slot(key.encode()), []).append(key)
+    return list(groups.values())
+
+
 def close_redis() -> None:
     """
     Close the Redis connection and cleanup resources.
 
     This should be called when shutting down the application.
     """
-    global _redis_client
+    global _redis_client, _cached_client, _replicas
 
+    if _replicas is not None:
+        _replicas.close()
+        _replicas = None
+    if _cached_client is not None:
+        _cached_client.close()
+        _cached_client = None
     if _redis_client is not None:
         _redis_client.close()
         _redis_client = None
@@ -91,9 +510,16 @@ def reset_redis_client() -> None:
 
     Useful for testing or when you need to force a reconnection.
     """
-    global _redis_client
+    global _redis_client, _cached_client, _replicas, _sentinel
 
+    if _replicas is not None:
+        _replicas.close()
+    if _cached_client is not None:
+        _cached_client.close()
     if _redis_client is not None:
         _redis_client.close()
 
+    _replicas = None
+    _sentinel = None
+    _cached_client = None
     _redis_client = None
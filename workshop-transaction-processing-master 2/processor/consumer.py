@@ -15,6 +15,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from lib.redis_client import get_redis
 from lib.logger import setup_logger
+from lib.profiling import MemoryTracker, Profiler, SlowBatchMonitor, install_signal_handlers
 
 # Import all module processors
 from modules import ordered_transactions
@@ -22,9 +23,19 @@ from modules import store_transaction
 from modules import spending_categories
 from modules import spending_over_time
 from modules import vector_search
+from modules import customer_activity
+from modules import transaction_query
+from modules import spending_windows
+from modules import transaction_sketches
+from modules import amount_percentiles
 
 logger = setup_logger("consumer")
 
+# On-demand profiling (SIGUSR1/SIGUSR2) and slow batch capture (PROFILE_SLOW_BATCH_MS)
+profiler = Profiler("consumer")
+memory = MemoryTracker("consumer")
+slow_batches = SlowBatchMonitor("consumer")
+
 def dispatch_transaction(redis_client, tx_data: Dict[str, str]) -> None:
     """
     Dispatch transaction to all module processors.
@@ -32,8 +43,9 @@ def dispatch_transaction(redis_client, tx_data: Dict[str, str]) -> None:
     Each module receives the same transaction and stores it
     in a different Redis data structure.
     """
-    # Module 1: Add to ordered list
+    # Module 1: Add to ordered list (and the time-ordered index)
     ordered_transactions.process_transaction(redis_client, tx_data)
+    ordered_transactions.index_transaction(redis_client, tx_data)
 
     # Module 2: Store as JSON document
     store_transaction.process_transaction(redis_client, tx_data)
@@ -41,12 +53,28 @@ def dispatch_transaction(redis_client, tx_data: Dict[str, str]) -> None:
     # Module 3: Update spending category rankings
     spending_categories.process_transaction(redis_client, tx_data)
 
-    # Module 4: Add to time-series
+    # Module 4: Add to time-series (and the per-category/location series)
     spending_over_time.process_transaction(redis_client, tx_data)
+    spending_over_time.process_dimensions(redis_client, tx_data)
 
     # Module 5: Generate embedding for vector search
     vector_search.process_transaction(redis_client, tx_data)
 
+    # Module 6: Update per-customer views
+    customer_activity.process_transaction(redis_client, tx_data)
+
+    # (Module 7, transaction_query, has no per-transaction work: Redis
+    # indexes the documents Module 2 writes)
+
+    # Module 8: Update hourly spending buckets (sliding-window leaderboards)
+    spending_windows.process_transaction(redis_client, tx_data)
+
+    # Module 9: Feed the probabilistic sketches (TopK, HyperLogLog, Count-Min)
+    transaction_sketches.process_transaction(redis_client, tx_data)
+
+    # Module 10: Buffer the amount for the percentile digests (written by flush)
+    amount_percentiles.process_transaction(redis_client, tx_data)
+
 
 def ensure_consumer_group(redis_client, stream_key: str, group_name: str) -> None:
     """Create consumer group if it doesn't exist."""
@@ -72,24 +100,61 @@ def main() -> None:
     redis = get_redis()
     ensure_consumer_group(redis, STREAM_KEY, GROUP_NAME)
 
+    # Index transactions processed before the time index existed
+    try:
+        if not redis.exists(ordered_transactions.TIME_INDEX_KEY):
+            indexed = ordered_transactions.backfill_time_index(redis)
+            logger.info(f"Time index backfilled with {indexed} transactions")
+    except Exception as e:
+        logger.warning(f"Time index backfill failed: {e}")
+
+    # Create hourly/daily compaction rules for the spending time series
+    # (retried after each batch until the series exists)
+    compactions_ready = False
+    try:
+        compactions_ready = spending_over_time.ensure_compactions(redis)
+    except Exception as e:
+        logger.warning(f"Spending compactions not ready: {e}")
+
     # Create vector search index if configured
     try:
         vector_search.create_index(redis)
     except Exception as e:
         logger.warning(f"Vector search index not ready: {e}")
 
+    # Reserve the TopK and Count-Min sketches
+    try:
+        transaction_sketches.ensure_sketches(redis)
+    except Exception as e:
+        logger.warning(f"Transaction sketches not ready: {e}")
+
+    # Create the structured query index over transaction documents
+    try:
+        transaction_query.create_index(redis)
+    except Exception as e:
+        logger.warning(f"Transaction query index not ready: {e}")
+
     logger.info("=" * 70)
     logger.info("Transaction Processor Starting")
     logger.info("=" * 70)
     logger.info(f"Stream: {STREAM_KEY}")
-    logger.info(f"Dispatching to 5 modules:")
+    logger.info(f"Dispatching to 9 of the 10 modules:")
     logger.info("  1. ordered_transactions  - List")
     logger.info("  2. store_transaction     - JSON")
     logger.info("  3. spending_categories   - Sorted Sets")
     logger.info("  4. spending_over_time    - TimeSeries")
     logger.info("  5. vector_search         - Vector Search")
+    logger.info("  6. customer_activity     - List + Sorted Set + TimeSeries")
+    logger.info(f"  7. transaction_query     - Search index {transaction_query.INDEX_NAME} (kept by Redis)")
+    logger.info("  8. spending_windows      - Hourly Sorted Sets")
+    logger.info("  9. transaction_sketches  - TopK + HyperLogLog + Count-Min Sketch")
+    logger.info(" 10. amount_percentiles    - t-digest")
+    if slow_batches.threshold_ms > 0:
+        logger.info(f"Slow batches (>{slow_batches.threshold_ms:g} ms) logged to {slow_batches.path}")
     logger.info("=" * 70)
 
+    install_signal_handlers(profiler, memory)
+
     processed_count = 0
     start_time = time.time()
 
@@ -108,27 +173,41 @@ def main() -> None:
                 continue
 
             for stream, message_list in messages:
-                for message_id, data in message_list:
-                    # Convert bytes to strings
-                    tx_data = {
-                        key.decode() if isinstance(key, bytes) else key:
-                        value.decode() if isinstance(value, bytes) else value
-                        for key, value in data.items()
-                    }
-
-                    # Dispatch to all modules
-                    dispatch_transaction(redis, tx_data)
-
-                    # Acknowledge message
-                    redis.xack(stream, GROUP_NAME, message_id)
-
-                    processed_count += 1
-
-                    # Log progress
-                    if processed_count % 50 == 0:
-                        elapsed = time.time() - start_time
-                        tps = processed_count / elapsed if elapsed > 0 else 0
-                        logger.info(f"Processed: {processed_count} | TPS: {tps:.2f}")
+                with profiler.profiled(), slow_batches.batch(len(message_list)) as batch:
+                    for message_id, data in message_list:
+                        # Convert bytes to strings
+                        tx_data = {
+                            key.decode() if isinstance(key, bytes) else key:
+                            value.decode() if isinstance(value, bytes) else value
+                            for key, value in data.items()
+                        }
+
+                        # Dispatch to all modules
+                        with batch.transaction(tx_data.get("transactionId", message_id)):
+                            dispatch_transaction(redis, tx_data)
+
+                        processed_count += 1
+
+                        # Log progress
+                        if processed_count % 50 == 0:
+                            elapsed = time.time() - start_time
+                            tps = processed_count / elapsed if elapsed > 0 else 0
+                            logger.info("Processed: %d | TPS: %.2f", processed_count, tps)
+
+                    # Write batched digests
+                    amount_percentiles.flush(redis)
+
+                # Acknowledge the whole batch
+                redis.xack(stream, GROUP_NAME, *[message_id for message_id, _ in message_list])
+
+            if not compactions_ready:
+                try:
+                    compactions_ready = spending_over_time.ensure_compactions(redis)
+                    if compactions_ready:
+                        logger.info("Spending compaction rules created")
+                except Exception as e:
+                    logger.warning(f"Spending compactions not ready: {e}")
+                    compactions_ready = True  # don't retry a failing setup every batch
 
     except KeyboardInterrupt:
         logger.info("\n" + "=" * 70)
@@ -2,6 +2,7 @@
 Workshop Modules
 
 Each module processes the same transaction and stores it in a different Redis data structure.
+Modules 1-5 are the workshop exercises (their TODOs); 6-10 ship pre-built.
 """
 
 from . import ordered_transactions
@@ -9,6 +10,11 @@ from . import store_transaction
 from . import spending_categories
 from . import spending_over_time
 from . import vector_search
+from . import customer_activity
+from . import transaction_query
+from . import spending_windows
+from . import transaction_sketches
+from . import amount_percentiles
 
 __all__ = [
     'ordered_transactions',
@@ -16,4 +22,9 @@ __all__ = [
     'spending_categories',
     'spending_over_time',
     'vector_search',
+    'customer_activity',
+    'transaction_query',
+    'spending_windows',
+    'transaction_sketches',
+    'amount_percentiles',
 ]
@@ -0,0 +1,129 @@
+"""
+Module 10: Amount Percentiles
+
+Transaction amount distributions per category (and per merchant) using
+t-digest sketches, so p50/p95/p99 and trimmed means are answered in
+constant time and memory.
+
+Keys:
+- spending:tdigest:category:{category}
+- spending:tdigest:merchant:{merchant} (unless TDIGEST_PER_MERCHANT=false)
+
+Amounts are buffered in process_transaction() and written by flush() with
+one TDIGEST.ADD per digest per batch; the consumer flushes before it
+acknowledges the batch, so nothing buffered is lost on a crash.
+"""
+
+import math
+import os
+from typing import Dict, List, Optional, Sequence, Set
+
+COMPRESSION = 100
+PER_MERCHANT = os.getenv("TDIGEST_PER_MERCHANT", "true").lower() != "false"
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+# Trimmed mean drops the lowest and highest 10%
+DEFAULT_TRIM = (0.1, 0.9)
+
+# Amounts waiting for the next flush, by digest key
+_pending: Dict[str, List[float]] = {}
+# Digests known to exist
+_created: Set[str] = set()
+
+
+def category_key(category: str) -> str:
+    return f"spending:tdigest:category:{category}"
+
+
+def merchant_key(merchant: str) -> str:
+    return f"spending:tdigest:merchant:{merchant}"
+
+
+def process_transaction(redis_client, tx_data: Dict[str, str]) -> None:
+    """Buffer the amount for its category (and merchant) digest."""
+    amount = float(tx_data.get('amount', 0))
+    _pending.setdefault(category_key(tx_data.get('category')), []).append(amount)
+    if PER_MERCHANT:
+        _pending.setdefault(merchant_key(tx_data.get('merchant')), []).append(amount)
+
+
+def _create_digests(redis_client, keys: List[str]) -> None:
+    """TDIGEST.CREATE each key, ignoring ones that already exist."""
+    if not keys:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.tdigest().create(key, COMPRESSION)
+    for key, result in zip(keys, pipe.execute(raise_on_error=False)):
+        if isinstance(result, Exception) and "exists" not in str(result).lower():
+            raise result
+        _created.add(key)
+
+
+def flush(redis_client) -> int:
+    """
+    Write buffered amounts: one TDIGEST.ADD per digest, all in one pipeline.
+    Returns the number of amounts written.
+    """
+    if not _pending:
+        return 0
+
+    _create_digests(redis_client, [key for key in _pending if key not in _created])
+
+    keys = list(_pending)
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.tdigest().add(key, _pending[key])
+    results = pipe.execute(raise_on_error=False)
+
+    # Digests deleted since we created them: create again and retry once
+    missing = [key for key, result in zip(keys, results) if isinstance(result, Exception)]
+    if missing:
+        _created.difference_update(missing)
+        _create_digests(redis_client, missing)
+        pipe = redis_client.pipeline(transaction=False)
+        for key in missing:
+            pipe.tdigest().add(key, _pending[key])
+        pipe.execute()
+
+    written = sum(len(amounts) for amounts in _pending.values())
+    _pending.clear()
+    return written
+
+
+def _number(value) -> Optional[float]:
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else value
+
+
+def get_percentiles(
+    redis_client,
+    keys: List[str],
+    quantiles: Sequence[float] = DEFAULT_QUANTILES,
+    trim: Sequence[float] = DEFAULT_TRIM,
+) -> Dict[str, Dict]:
+    """
+    Quantiles, trimmed mean, min and max of several digests in one round trip.
+    Empty or missing digests come back with None values.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.tdigest().quantile(key, *quantiles)
+        pipe.tdigest().trimmed_mean(key, *trim)
+        pipe.tdigest().min(key)
+        pipe.tdigest().max(key)
+    results = pipe.execute(raise_on_error=False)
+
+    stats = {}
+    for i, key in enumerate(keys):
+        values, trimmed, low, high = results[i * 4:(i + 1) * 4]
+        if isinstance(values, Exception):
+            # Digest doesn't exist yet
+            values, trimmed, low, high = [math.nan] * len(quantiles), math.nan, math.nan, math.nan
+        stats[key] = {
+            "quantiles": {f"p{q * 100:g}": _number(value) for q, value in zip(quantiles, values)},
+            "trimmed_mean": _number(trimmed),
+            "min": _number(low),
+            "max": _number(high),
+        }
+    return stats
@@ -0,0 +1,102 @@
+"""
+Module 6: Customer Activity
+
+Per-customer views of the transaction stream, so customer questions
+never need a scan over every transaction.
+
+Maintains, for each customer:
+1. A capped list of recent transaction IDs (List)
+2. Spending per category (Sorted Set)
+3. Spending over time, labelled customer=<id> (TimeSeries)
+
+Keys are hash-tagged on the customer ID ("customer:{C1234}:recent"), so
+a customer's keys share one cluster slot.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+# Recent-activity list length per customer
+RECENT_LIMIT = 100
+
+
+def recent_key(customer_id: str) -> str:
+    return f"customer:{{{customer_id}}}:recent"
+
+
+def categories_key(customer_id: str) -> str:
+    return f"customer:{{{customer_id}}}:categories"
+
+
+def timeseries_key(customer_id: str) -> str:
+    return f"customer:{{{customer_id}}}:timeseries"
+
+
+def process_transaction(redis_client, tx_data: Dict[str, str]) -> None:
+    """
+    Update the customer's recent list, category totals and time series.
+    All writes go out in one pipeline.
+    """
+    customer_id = tx_data.get('customerId')
+    if not customer_id:
+        return
+
+    tx_id = tx_data.get('transactionId')
+    category = tx_data.get('category')
+    amount = float(tx_data.get('amount', 0))
+    timestamp = int(tx_data.get('timestamp', 0))
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.lpush(recent_key(customer_id), tx_id)
+    pipe.ltrim(recent_key(customer_id), 0, RECENT_LIMIT - 1)
+    pipe.zincrby(categories_key(customer_id), amount, category)
+    pipe.ts().add(
+        timeseries_key(customer_id),
+        timestamp,
+        amount,
+        labels={"metric": "customer_spending", "customer": customer_id},
+        duplicate_policy="sum",
+    )
+    pipe.execute()
+
+
+def get_recent_transactions(redis_client, customer_id: str, limit: int = 20) -> List[str]:
+    """
+    Most recent transaction IDs for a customer, newest first. O(k).
+    """
+    return redis_client.lrange(recent_key(customer_id), 0, min(limit, RECENT_LIMIT) - 1)
+
+
+def get_category_spending(redis_client, customer_id: str, limit: int = 10) -> List[Tuple[str, float]]:
+    """
+    A customer's spending per category, highest first. O(log N + k).
+    Returns list of (category, total_amount) tuples.
+    """
+    return redis_client.zrevrange(categories_key(customer_id), 0, limit - 1, withscores=True)
+
+
+def get_latest_timestamp(redis_client, customer_id: str) -> int:
+    """Timestamp of the customer's most recent transaction, or 0."""
+    try:
+        result = redis_client.ts().get(timeseries_key(customer_id))
+        return int(result[0]) if result else 0
+    except Exception:
+        return 0
+
+
+def get_spending_in_range(
+    redis_client,
+    customer_id: str,
+    start_time: int,
+    end_time: int,
+    bucket_ms: Optional[int] = None,
+) -> List[Tuple[int, float]]:
+    """
+    A customer's spending between two timestamps.
+    With `bucket_ms`, samples are summed per bucket server-side.
+    """
+    if bucket_ms:
+        return redis_client.ts().range(
+            timeseries_key(customer_id), start_time, end_time,
+            aggregation_type="sum", bucket_size_msec=bucket_ms,
+        )
+    return redis_client.ts().range(timeseries_key(customer_id), start_time, end_time)
@@ -5,7 +5,7 @@ Track spending over time using Redis TimeSeries.
 Enables time-range queries like "spending in last 7 days".
 """
 
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 
 
 def process_transaction(redis_client, tx_data: Dict[str, str]) -> None:
@@ -37,3 +37,351 @@ def get_total_spending_in_range(redis_client, start_time: int, end_time: int) ->
     """
     data_points = get_spending_in_range(redis_client, start_time, end_time)
     return sum(amount for _, amount in data_points)
+
+
+# ---------------------------------------------------------------------------
+# Downsampled series
+#
+# Long windows are answered from compaction series instead of raw samples.
+# Each resolution keeps a "sum" and a "count" series so sum, count and avg
+# can all be rebuilt from it.
+# ---------------------------------------------------------------------------
+
+TIMESERIES_KEY = "spending:timeseries"
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+
+# (suffix, bucket_ms, retention_ms) - coarsest first. Retention 0 keeps forever.
+COMPACTIONS = [
+    ("1d", DAY_MS, 0),
+    ("1h", HOUR_MS, 90 * DAY_MS),
+]
+
+COMPACTION_AGGREGATIONS = ("sum", "count")
+
+
+def compaction_key(aggregation: str, suffix: str) -> str:
+    """
+    Key of a compaction series, e.g. "{spending:timeseries}:sum:1h".
+
+    The hash tag puts it in the raw series' slot: on a cluster, a
+    compaction rule's source and destination must share a slot.
+    """
+    return f"{{{TIMESERIES_KEY}}}:{aggregation}:{suffix}"
+
+
+def ensure_compactions(redis_client) -> bool:
+    """
+    Create the hourly/daily compaction rules of the raw series.
+    Safe to call repeatedly; returns False until the raw series exists.
+
+    The raw series is left to process_transaction's first TS.ADD (the
+    Track Spending tab unlocks when it appears, and its duplicate policy
+    is the participant's), so callers retry until this returns True.
+
+    Rules only apply to new samples, so freshly created compaction series
+    are backfilled from raw data for every bucket that is already closed,
+    and the rules are made to count the open one (_count_open_bucket).
+    """
+    if not redis_client.exists(TIMESERIES_KEY):
+        return False
+
+    ts = redis_client.ts()
+    rules_added = False
+    for suffix, bucket_ms, retention_ms in COMPACTIONS:
+        for aggregation in COMPACTION_AGGREGATIONS:
+            dest = compaction_key(aggregation, suffix)
+            try:
+                ts.create(
+                    dest,
+                    retention_msecs=retention_ms,
+                    duplicate_policy="sum",
+                    labels={"metric": "spending", "agg": aggregation, "resolution": suffix},
+                )
+                created = True
+            except Exception as e:
+                if "already exists" not in str(e).lower():
+                    raise
+                created = False
+
+            try:
+                ts.createrule(TIMESERIES_KEY, dest, aggregation, bucket_ms)
+                rules_added = True
+            except Exception as e:
+                if "rule" not in str(e).lower():
+                    raise
+
+            if created:
+                _backfill_compaction(redis_client, dest, aggregation, bucket_ms)
+    if rules_added:
+        _count_open_bucket(redis_client, TIMESERIES_KEY)
+    return True
+
+
+def _backfill_compaction(redis_client, dest: str, aggregation: str, bucket_ms: int) -> None:
+    """Copy closed buckets of existing raw data into a new compaction series."""
+    ts = redis_client.ts()
+    latest = ts.get(TIMESERIES_KEY)
+    if not latest:
+        return
+
+    # The bucket holding the newest sample is still open; the rule owns it.
+    open_bucket = int(latest[0]) - int(latest[0]) % bucket_ms
+    buckets = ts.range(
+        TIMESERIES_KEY, 0, open_bucket - 1,
+        aggregation_type=aggregation, bucket_size_msec=bucket_ms,
+    )
+    for i in range(0, len(buckets), 1000):
+        ts.madd([(dest, int(t), float(v)) for t, v in buckets[i:i + 1000]])
+
+
+def _count_open_bucket(redis_client, source: str) -> None:
+    """
+    Make new compaction rules count the samples already in the open bucket.
+
+    A rule aggregates the samples appended after it was created, but an
+    update to a sample of its open bucket makes Redis recompute that bucket
+    from the source. Adding 0 to the newest sample is such an update, and
+    changes no value whatever else is writing.
+    """
+    latest = redis_client.ts().get(source)
+    if latest:
+        redis_client.ts().add(source, int(latest[0]), 0.0, duplicate_policy="sum")
+
+
+def pick_resolution(bucket_ms: int, start_time: int, latest_time: int) -> str:
+    """
+    Choose the coarsest series that can serve buckets of `bucket_ms`.
+
+    A compaction qualifies when the bucket is a whole multiple of its
+    resolution and its retention still covers `start_time`.
+    Returns a COMPACTIONS suffix, or "raw".
+    """
+    for suffix, resolution_ms, retention_ms in COMPACTIONS:
+        if bucket_ms % resolution_ms:
+            continue
+        if retention_ms and start_time < latest_time - retention_ms:
+            continue
+        return suffix
+    return "raw"
+
+
+def get_spending_buckets(
+    redis_client,
+    start_time: int,
+    end_time: int,
+    bucket_ms: int,
+    resolution: str = "raw",
+    latest_time: Optional[int] = None,
+) -> Tuple[List[Tuple[int, float]], List[Tuple[int, float]]]:
+    """
+    Get per-bucket spending totals and transaction counts.
+
+    Aggregation runs server-side (TS.RANGE ... AGGREGATION) and every range
+    goes out in one pipeline. A compaction series has no sample for its
+    still-open bucket, so that tail (from the bucket holding `latest_time`)
+    is read from the raw series and merged in.
+
+    Returns (sums, counts) as lists of (bucket_timestamp, value) tuples.
+    """
+    raw_from = start_time
+    pipe = redis_client.pipeline(transaction=False)
+    if resolution != "raw":
+        resolution_ms = next(ms for suffix, ms, _ in COMPACTIONS if suffix == resolution)
+        latest_time = end_time if latest_time is None else latest_time
+        raw_from = max(start_time, latest_time - latest_time % resolution_ms)
+        # Compacted counts are already per-bucket counts: sum them up
+        for aggregation in COMPACTION_AGGREGATIONS:
+            pipe.ts().range(compaction_key(aggregation, resolution), start_time, min(raw_from - 1, end_time),
+                            aggregation_type="sum", bucket_size_msec=bucket_ms)
+    # A window that ends before the open bucket has no raw tail
+    read_tail = resolution == "raw" or raw_from <= end_time
+    if read_tail:
+        for aggregation in COMPACTION_AGGREGATIONS:
+            pipe.ts().range(TIMESERIES_KEY, raw_from, end_time,
+                            aggregation_type=aggregation, bucket_size_msec=bucket_ms)
+    ranges = pipe.execute()
+
+    if resolution == "raw":
+        sums, counts = ranges
+        return sums, counts
+
+    if not read_tail:
+        ranges += [[], []]
+    merged = []
+    for compacted, tail in ((ranges[0], ranges[2]), (ranges[1], ranges[3])):
+        buckets: Dict[int, float] = {}
+        for ts, value in list(compacted) + list(tail):
+            buckets[int(ts)] = buckets.get(int(ts), 0.0) + float(value)
+        merged.append(sorted(buckets.items()))
+    return merged[0], merged[1]
+
+
+# ---------------------------------------------------------------------------
+# Per-dimension series
+#
+# Besides the single total series, spending is written to one labelled
+# series per category and per location (with the same sum/count compaction
+# rules), so breakdowns over time are one TS.MRANGE ... GROUPBY query.
+# ---------------------------------------------------------------------------
+
+DIMENSIONS = ("category", "location")
+DIMENSION_METRIC = "spending_by"
+
+# Series already created by this process, as (dimension, value)
+_dimension_series = set()
+
+
+def dimension_key(dimension: str, value: str, aggregation: Optional[str] = None, suffix: str = "raw") -> str:
+    """
+    Key of a per-dimension series, e.g. "spending:timeseries:{category:dining}"
+    or its compaction "spending:timeseries:{category:dining}:sum:1h"
+    (hash-tagged so a series and its compactions share a cluster slot).
+    """
+    key = f"{TIMESERIES_KEY}:{{{dimension}:{value}}}"
+    return key if suffix == "raw" else f"{key}:{aggregation}:{suffix}"
+
+
+def _dimension_labels(dimension: str, value: str, resolution: str, aggregation: Optional[str] = None) -> Dict[str, str]:
+    labels = {"metric": DIMENSION_METRIC, "dimension": dimension, dimension: value, "resolution": resolution}
+    if aggregation:
+        labels["agg"] = aggregation
+    return labels
+
+
+def ensure_dimension_series(redis_client, dimension: str, value: str) -> None:
+    """
+    Create a per-dimension series and its compaction rules if missing.
+    A series recreated by TS.ADD already holds a sample the new rules
+    have to count.
+    """
+    ts = redis_client.ts()
+    source = dimension_key(dimension, value)
+    rules_added = False
+    try:
+        ts.create(source, duplicate_policy="sum", labels=_dimension_labels(dimension, value, "raw"))
+    except Exception as e:
+        if "already exists" not in str(e).lower():
+            raise
+
+    for suffix, bucket_ms, retention_ms in COMPACTIONS:
+        for aggregation in COMPACTION_AGGREGATIONS:
+            dest = dimension_key(dimension, value, aggregation, suffix)
+            try:
+                ts.create(
+                    dest,
+                    retention_msecs=retention_ms,
+                    duplicate_policy="sum",
+                    labels=_dimension_labels(dimension, value, suffix, aggregation),
+                )
+            except Exception as e:
+                if "already exists" not in str(e).lower():
+                    raise
+            try:
+                ts.createrule(source, dest, aggregation, bucket_ms)
+                rules_added = True
+            except Exception as e:
+                if "rule" not in str(e).lower():
+                    raise
+    if rules_added:
+        _count_open_bucket(redis_client, source)
+
+
+def process_dimensions(redis_client, tx_data: Dict[str, str]) -> None:
+    """
+    Add the transaction to its category and location series (one pipeline).
+
+    Series this process has already set up are written with TS.ADD ...
+    LABELS, so one deleted behind its back (e.g. FLUSHDB) comes back
+    labelled; the EXISTS queued ahead of it tells, and its compaction
+    rules are then recreated.
+    """
+    amount = float(tx_data.get('amount', 0))
+    timestamp = int(tx_data.get('timestamp', 0))
+
+    pipe = redis_client.pipeline(transaction=False)
+    written = []
+    for dimension in DIMENSIONS:
+        value = tx_data.get(dimension)
+        if not value:
+            continue
+        if (dimension, value) not in _dimension_series:
+            ensure_dimension_series(redis_client, dimension, value)
+            _dimension_series.add((dimension, value))
+        key = dimension_key(dimension, value)
+        pipe.exists(key)
+        pipe.ts().add(key, timestamp, amount, duplicate_policy="sum",
+                      labels=_dimension_labels(dimension, value, "raw"))
+        written.append((dimension, value))
+    results = pipe.execute()
+
+    for (dimension, value), existed in zip(written, results[::2]):
+        if not existed:
+            ensure_dimension_series(redis_client, dimension, value)
+
+
+def _grouped_series(response, dimension: str) -> Dict[str, List[Tuple[int, float]]]:
+    """TS.MRANGE GROUPBY reply -> {dimension value: [(timestamp, value)]}."""
+    entries = response.items() if isinstance(response, dict) else (
+        item for entry in response for item in entry.items()
+    )
+    series = {}
+    for key, data in entries:
+        # Grouped series are named "<label>=<value>"; samples come last
+        value = key.split("=", 1)[1] if key.startswith(f"{dimension}=") else key
+        series[value] = [(int(ts), float(v)) for ts, v in data[-1]]
+    return series
+
+
+def _queue_mrange(
+    pipe,
+    dimension: str,
+    resolution: str,
+    series_aggregation: Optional[str],
+    aggregation: str,
+    start_time: int,
+    end_time: int,
+    bucket_ms: int,
+) -> None:
+    """Queue one grouped, bucketed TS.MRANGE over a dimension's series."""
+    filters = [f"metric={DIMENSION_METRIC}", f"dimension={dimension}", f"resolution={resolution}"]
+    if series_aggregation:
+        filters.append(f"agg={series_aggregation}")
+    pipe.ts().mrange(
+        start_time, end_time, filters,
+        aggregation_type=aggregation, bucket_size_msec=bucket_ms,
+        # Compactions: include each series' still-open bucket
+        latest=resolution != "raw",
+        groupby=dimension, reduce="sum",
+    )
+
+
+def get_spending_by_dimension(
+    redis_client,
+    dimension: str,
+    start_time: int,
+    end_time: int,
+    bucket_ms: int,
+    resolution: str = "raw",
+) -> Dict[str, Tuple[List[Tuple[int, float]], List[Tuple[int, float]]]]:
+    """
+    Per-bucket spending totals and counts for every value of a dimension.
+
+    Each is a single TS.MRANGE ... FILTER ... GROUPBY <dimension> REDUCE sum
+    with server-side bucket aggregation, and both go out in one pipeline.
+    Per-dimension series each have their own open compaction bucket, so
+    compactions are read with LATEST rather than patched from raw data.
+
+    Returns {value: (sums, counts)}.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for aggregation in COMPACTION_AGGREGATIONS:
+        if resolution == "raw":
+            _queue_mrange(pipe, dimension, "raw", None, aggregation, start_time, end_time, bucket_ms)
+        else:
+            # Compacted counts are already per-bucket counts: sum them up
+            _queue_mrange(pipe, dimension, resolution, aggregation, "sum", start_time, end_time, bucket_ms)
+    sums, counts = [_grouped_series(response, dimension) for response in pipe.execute()]
+
+    return {value: (sums.get(value, []), counts.get(value, [])) for value in set(sums) | set(counts)}
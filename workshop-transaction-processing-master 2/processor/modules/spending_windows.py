@@ -0,0 +1,137 @@
+"""
+Module 8: Spending Windows
+
+Sliding-window versions of the spending_categories leaderboards
+("top categories in the last 24h").
+
+Spending is also written to one Sorted Set per hour:
+1. Category spending: spending:window:{categories}:{hour}
+2. Merchant spending per category: spending:window:{category:<category>}:{hour}
+
+Each leaderboard's buckets and merged windows share a hash tag, so the
+ZUNIONSTORE over them stays within one cluster slot.
+
+Bucket keys expire after RETENTION_HOURS, so memory stays bounded. A window
+query unions the hourly buckets it covers (ZUNIONSTORE) into a short-lived
+cache key, so its cost depends on the window length, never on how much
+history exists. Windows end at the newest bucket seen, which keeps them
+meaningful for replayed or generated data.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+HOUR_MS = 60 * 60 * 1000
+
+# Supported windows, in hourly buckets
+WINDOWS = {"1h": 1, "6h": 6, "24h": 24, "7d": 7 * 24}
+
+RETENTION_HOURS = int(os.getenv("SPENDING_WINDOW_RETENTION_HOURS", str(7 * 24 + 1)))
+# Merged windows are reused for this long (the newest bucket is still filling)
+CACHE_TTL_MS = int(os.getenv("SPENDING_WINDOW_CACHE_TTL_MS", "5000"))
+
+# Bucket start timestamps, scored by themselves
+BUCKETS_KEY = "spending:window:buckets"
+
+
+def bucket_start(timestamp: int) -> int:
+    return timestamp - timestamp % HOUR_MS
+
+
+def categories_bucket_key(bucket: int) -> str:
+    return f"spending:window:{{categories}}:{bucket}"
+
+
+def merchants_bucket_key(category: str, bucket: int) -> str:
+    return f"spending:window:{{category:{category}}}:{bucket}"
+
+
+def process_transaction(redis_client, tx_data: Dict[str, str]) -> None:
+    """
+    Add the transaction to its hourly buckets and refresh their TTLs.
+    All writes go out in one pipeline.
+    """
+    category = tx_data.get('category')
+    merchant = tx_data.get('merchant')
+    amount = float(tx_data.get('amount', 0))
+    bucket = bucket_start(int(tx_data.get('timestamp', 0)))
+    ttl = RETENTION_HOURS * 60 * 60
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zincrby(categories_bucket_key(bucket), amount, category)
+    pipe.expire(categories_bucket_key(bucket), ttl)
+    pipe.zincrby(merchants_bucket_key(category, bucket), amount, merchant)
+    pipe.expire(merchants_bucket_key(category, bucket), ttl)
+    pipe.zadd(BUCKETS_KEY, {bucket: bucket})
+    # Forget buckets that have expired
+    pipe.zremrangebyscore(BUCKETS_KEY, "-inf", f"({bucket - RETENTION_HOURS * HOUR_MS}")
+    pipe.execute()
+
+
+def latest_bucket(redis_client) -> Optional[int]:
+    """Start of the newest hourly bucket, or None before any data."""
+    newest = redis_client.zrevrange(BUCKETS_KEY, 0, 0)
+    return int(newest[0]) if newest else None
+
+
+def _top_in_window(
+    redis_client,
+    bucket_key,
+    cache_key: str,
+    window: str,
+    limit: int,
+) -> Tuple[List[Tuple[str, float]], Dict]:
+    """
+    Union the buckets of a window (or reuse the cached union) and read the top entries.
+    Returns (entries, info) with info = {"window", "start", "end", "cached"}.
+    """
+    hours = WINDOWS[window]
+    latest = latest_bucket(redis_client)
+    if latest is None:
+        return [], {"window": window, "start": None, "end": None, "cached": False}
+
+    first = latest - (hours - 1) * HOUR_MS
+    info = {"window": window, "start": first, "end": latest + HOUR_MS - 1, "cached": True}
+    cache_key = f"{cache_key}:{window}:{latest}"
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.exists(cache_key)
+    pipe.zrevrange(cache_key, 0, limit - 1, withscores=True)
+    exists, entries = pipe.execute()
+    if exists:
+        return entries, info
+
+    keys = [bucket_key(first + i * HOUR_MS) for i in range(hours)]
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zunionstore(cache_key, keys)
+    pipe.pexpire(cache_key, CACHE_TTL_MS)
+    pipe.zrevrange(cache_key, 0, limit - 1, withscores=True)
+    _, _, entries = pipe.execute()
+    info["cached"] = False
+    return entries, info
+
+
+def get_top_categories(redis_client, window: str, limit: int = 10) -> Tuple[List[Tuple[str, float]], Dict]:
+    """
+    Top spending categories over the last `window` ("1h", "6h", "24h", "7d").
+    Returns ([(category, amount)], window info).
+    """
+    return _top_in_window(
+        redis_client, categories_bucket_key, "spending:window:{categories}:top", window, limit
+    )
+
+
+def get_top_merchants_in_category(
+    redis_client, category: str, window: str, limit: int = 10
+) -> Tuple[List[Tuple[str, float]], Dict]:
+    """
+    Top merchants within a category over the last `window`.
+    Returns ([(merchant, amount)], window info).
+    """
+    return _top_in_window(
+        redis_client,
+        lambda bucket: merchants_bucket_key(category, bucket),
+        f"spending:window:{{category:{category}}}:top",
+        window,
+        limit,
+    )
@@ -7,6 +7,8 @@ This provides the source of truth for all transaction data.
 
 from typing import Dict, List, Optional
 
+from lib.redis_client import group_keys_by_slot, is_cluster
+
 
 def process_transaction(redis_client, tx_data: Dict[str, str]) -> None:
     """
@@ -52,6 +54,10 @@ def get_transactions_by_ids(redis_client, tx_ids: List[str]) -> List[Dict]:
     if not tx_ids:
         return []
 
+    if is_cluster(redis_client):
+        # JSON.MGET can't span hash slots - fan out per slot instead
+        return [tx for tx in get_transactions_batch(redis_client, tx_ids) if tx]
+
     keys = [f"transaction:{tx_id}" for tx_id in tx_ids]
     
     # TODO: Replace the line below with:
@@ -65,3 +71,57 @@ def get_transactions_by_ids(redis_client, tx_ids: List[str]) -> List[Dict]:
             transactions.append(result[0])
 
     return transactions
+
+
+# Top-level fields of a transaction document (everything but "embedding")
+TRANSACTION_FIELDS = [
+    'transactionId', 'customerId', 'amount', 'merchant',
+    'category', 'timestamp', 'location', 'cardLast4',
+]
+
+
+def get_transactions_batch(
+    redis_client,
+    tx_ids: List[str],
+    fields: Optional[List[str]] = None,
+    chunk_size: int = 100,
+) -> List[Optional[Dict]]:
+    """
+    Retrieve many transactions in input order, with None for each miss.
+
+    IDs are split into JSON.MGET calls of up to `chunk_size` keys (further
+    split by hash slot on a cluster), all sent in one pipeline. With
+    `fields`, each field is fetched by its own JSONPath so only those
+    values (e.g. no embedding) leave Redis.
+    """
+    if not tx_ids:
+        return []
+
+    paths = ["$"] if fields is None else [f"$.{field}" for field in fields]
+    keys = [f"transaction:{tx_id}" for tx_id in tx_ids]
+
+    groups: List[List[str]] = []
+    for i in range(0, len(keys), chunk_size):
+        groups.extend(group_keys_by_slot(redis_client, keys[i:i + chunk_size]))
+
+    pipe = redis_client.pipeline(transaction=False)
+    for group in groups:
+        for path in paths:
+            pipe.json().mget(group, path)
+    replies = pipe.execute()
+
+    by_key: Dict[str, Optional[Dict]] = {}
+    for group_index, group in enumerate(groups):
+        per_path = replies[group_index * len(paths):(group_index + 1) * len(paths)]
+        for key, values in zip(group, zip(*per_path)):
+            if fields is None:
+                by_key[key] = values[0][0] if values[0] else None
+            elif all(value is None for value in values):
+                by_key[key] = None
+            else:
+                by_key[key] = {
+                    field: value[0]
+                    for field, value in zip(fields, values)
+                    if value
+                }
+    return [by_key[key] for key in keys]
@@ -0,0 +1,173 @@
+"""
+Module 7: Transaction Query
+
+Secondary RediSearch index over the JSON documents written by
+store_transaction, for ad-hoc structured queries: exact merchant or card,
+amount and time ranges, sorting, and group-by totals with FT.AGGREGATE.
+
+The index is created once at startup; Redis keeps it up to date as
+documents are written, so there is no per-transaction work here.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from redis.commands.search import reducers
+from redis.commands.search.aggregation import AggregateRequest, Desc
+from redis.commands.search.field import NumericField, TagField, TextField
+from redis.commands.search.query import Query
+
+try:
+    from redis.commands.search.index_definition import IndexDefinition, IndexType
+except ImportError:  # redis-py < 6
+    from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+
+INDEX_NAME = "idx:transactions"
+
+# Fields the index can filter on, group by, or sort by
+TAG_FIELDS = ["merchant", "category", "location", "customerId", "cardLast4"]
+SORT_FIELDS = ["timestamp", "amount"]
+
+# Returned for every hit (never the embedding)
+RETURN_FIELDS = [
+    'transactionId', 'customerId', 'amount', 'merchant',
+    'category', 'timestamp', 'location', 'cardLast4',
+]
+
+schema = (
+    # "|" separator: locations contain commas
+    *[TagField(f"$.{name}", as_name=name, separator="|") for name in TAG_FIELDS],
+    NumericField("$.amount", as_name="amount", sortable=True),
+    NumericField("$.timestamp", as_name="timestamp", sortable=True),
+    TextField("$.merchant", as_name="merchant_text"),
+)
+
+
+def create_index(redis_client) -> bool:
+    """Create the transaction index. Called once at startup."""
+    try:
+        redis_client.ft(INDEX_NAME).create_index(
+            schema,
+            definition=IndexDefinition(prefix=["transaction:"], index_type=IndexType.JSON),
+        )
+        return True
+    except Exception as e:
+        if "index already exists" in str(e).lower():
+            return False
+        raise
+
+
+def _escape_tag(value: str) -> str:
+    """Escape punctuation and spaces inside a TAG query value."""
+    return re.sub(r"([^\w])", r"\\\1", value)
+
+
+def build_query_string(
+    merchant: Optional[str] = None,
+    category: Optional[str] = None,
+    location: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    card_last4: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    text: Optional[str] = None,
+) -> str:
+    """
+    Build an FT.SEARCH query string from the given filters.
+    Returns "*" (match all) when no filter is set.
+    """
+    clauses = []
+    for field, value in (
+        ("merchant", merchant),
+        ("category", category),
+        ("location", location),
+        ("customerId", customer_id),
+        ("cardLast4", card_last4),
+    ):
+        if value:
+            clauses.append(f"@{field}:{{{_escape_tag(value)}}}")
+
+    if min_amount is not None or max_amount is not None:
+        low = "-inf" if min_amount is None else min_amount
+        high = "+inf" if max_amount is None else max_amount
+        clauses.append(f"@amount:[{low} {high}]")
+
+    if start is not None or end is not None:
+        low = "-inf" if start is None else start
+        high = "+inf" if end is None else end
+        clauses.append(f"@timestamp:[{low} {high}]")
+
+    if text:
+        words = " ".join(re.sub(r"[^\w]+", " ", text).split())
+        if words:
+            clauses.append(f"@merchant_text:({words})")
+
+    return " ".join(clauses) or "*"
+
+
+def _parse_document(doc) -> Dict:
+    """Search hit -> transaction dict with typed amount and timestamp."""
+    tx = {field: getattr(doc, field, None) for field in RETURN_FIELDS}
+    if tx["amount"] is not None:
+        tx["amount"] = float(tx["amount"])
+    if tx["timestamp"] is not None:
+        tx["timestamp"] = int(tx["timestamp"])
+    return tx
+
+
+def query_transactions(
+    redis_client,
+    query_string: str = "*",
+    sort_by: str = "timestamp",
+    ascending: bool = False,
+    limit: int = 20,
+    offset: int = 0,
+) -> Tuple[int, List[Dict]]:
+    """
+    Run a filtered, sorted, paged FT.SEARCH.
+    Returns (total_matches, transactions).
+    """
+    query = Query(query_string).sort_by(sort_by, asc=ascending).paging(offset, limit).dialect(2)
+    for field in RETURN_FIELDS:
+        query.return_field(f"$.{field}", as_field=field)
+
+    result = redis_client.ft(INDEX_NAME).search(query)
+    return result.total, [_parse_document(doc) for doc in result.docs]
+
+
+def aggregate_transactions(
+    redis_client,
+    group_by: str,
+    query_string: str = "*",
+    limit: int = 20,
+) -> List[Dict]:
+    """
+    Group matching transactions by a TAG field with FT.AGGREGATE.
+    Returns groups with total, count and average amount, highest total first.
+    """
+    request = (
+        AggregateRequest(query_string)
+        .group_by(
+            f"@{group_by}",
+            reducers.sum("@amount").alias("total"),
+            reducers.count().alias("count"),
+            reducers.avg("@amount").alias("avg"),
+        )
+        .sort_by(Desc("@total"))
+        .limit(0, limit)
+        .dialect(2)
+    )
+    result = redis_client.ft(INDEX_NAME).aggregate(request)
+
+    groups = []
+    for row in result.rows:
+        values = dict(zip(row[::2], row[1::2]))
+        groups.append({
+            group_by: values.get(group_by),
+            "total": float(values.get("total", 0)),
+            "count": int(values.get("count", 0)),
+            "avg": float(values.get("avg", 0)),
+        })
+    return groups
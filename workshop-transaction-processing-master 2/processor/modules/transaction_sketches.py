@@ -0,0 +1,217 @@
+"""
+Module 9: Transaction Sketches
+
+Approximate analytics in fixed memory, using the probabilistic
+structures in Redis Stack:
+
+1. Heavy hitters (TopK): most frequent merchants and locations overall
+   Keys: sketch:topk:merchants, sketch:topk:locations
+2. Distinct counts (HyperLogLog): unique customers per category and per
+   merchant, unique customers and cards per day
+   Keys: sketch:hll:customers:category:{category},
+         sketch:hll:customers:merchant:{merchant},
+         sketch:hll:customers:day:{YYYY-MM-DD}, sketch:hll:cards:day:{YYYY-MM-DD}
+3. Frequency (Count-Min Sketch): transaction count per merchant
+   Key: sketch:cms:merchants
+
+Memory and error bounds (independent of transaction volume):
+- HyperLogLog: at most 12 KB per key, standard error 0.81%
+- Count-Min Sketch: CMS_ERROR=0.001, CMS_PROBABILITY=0.01 gives a
+  2719 x 5 counter matrix (~54 KB); a count is never under-reported and is
+  over-reported by at most 0.1% of all transactions, with 99% certainty
+- TopK: k=TOPK_K items over a TOPK_WIDTH x TOPK_DEPTH sketch of 8-byte
+  buckets (~110 KB at the defaults); the list holds the heavy hitters with
+  high probability and counts may be under-reported
+"""
+
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+TOPK_MERCHANTS_KEY = "sketch:topk:merchants"
+TOPK_LOCATIONS_KEY = "sketch:topk:locations"
+CMS_MERCHANTS_KEY = "sketch:cms:merchants"
+# Days with data, scored by day start (ms)
+DAYS_KEY = "sketch:days"
+
+TOPK_K = 50
+TOPK_WIDTH = 2000
+TOPK_DEPTH = 7
+TOPK_DECAY = 0.9
+
+CMS_ERROR = 0.001
+CMS_PROBABILITY = 0.01
+
+DAY_MS = 24 * 60 * 60 * 1000
+# Per-day HyperLogLogs are kept this long
+DAY_RETENTION_S = 35 * 24 * 60 * 60
+# After the TopK/CMS sketches fail to be reserved, wait this long before retrying
+RESERVE_RETRY_S = 30
+
+# TopK/CMS writes are skipped until this time (monotonic) after a failed reserve
+_sketches_retry_at = 0.0
+
+
+def customers_by_category_key(category: str) -> str:
+    return f"sketch:hll:customers:category:{category}"
+
+
+def customers_by_merchant_key(merchant: str) -> str:
+    return f"sketch:hll:customers:merchant:{merchant}"
+
+
+def customers_by_day_key(day: str) -> str:
+    return f"sketch:hll:customers:day:{day}"
+
+
+def cards_by_day_key(day: str) -> str:
+    return f"sketch:hll:cards:day:{day}"
+
+
+def day_of(timestamp: int) -> str:
+    """UTC date ("2024-01-31") of a millisecond timestamp."""
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp / 1000))
+
+
+def ensure_sketches(redis_client) -> None:
+    """Create the TopK and Count-Min sketches. Called at startup and when they go missing."""
+    for key in (TOPK_MERCHANTS_KEY, TOPK_LOCATIONS_KEY):
+        if not redis_client.exists(key):
+            redis_client.topk().reserve(key, TOPK_K, TOPK_WIDTH, TOPK_DEPTH, TOPK_DECAY)
+    if not redis_client.exists(CMS_MERCHANTS_KEY):
+        redis_client.cms().initbyprob(CMS_MERCHANTS_KEY, CMS_ERROR, CMS_PROBABILITY)
+
+
+def _add_to_sketches(pipe, merchant: str, location: str) -> None:
+    pipe.topk().add(TOPK_MERCHANTS_KEY, merchant)
+    pipe.topk().add(TOPK_LOCATIONS_KEY, location)
+    pipe.cms().incrby(CMS_MERCHANTS_KEY, [merchant], [1])
+
+
+def _retry_sketches(redis_client, merchant: str, location: str) -> None:
+    """
+    Reserve the TopK/CMS sketches again (deleted by a FLUSHDB, or never
+    created) and retry the writes once. While they can't be reserved (no
+    bloom module), skip them for RESERVE_RETRY_S instead of failing dispatch.
+    """
+    global _sketches_retry_at
+    try:
+        ensure_sketches(redis_client)
+        pipe = redis_client.pipeline(transaction=False)
+        _add_to_sketches(pipe, merchant, location)
+        pipe.execute()
+    except RedisError:
+        _sketches_retry_at = time.monotonic() + RESERVE_RETRY_S
+
+
+def process_transaction(redis_client, tx_data: Dict[str, str]) -> None:
+    """
+    Feed the transaction to every sketch.
+    All writes go out in one pipeline; TopK/CMS failures never raise.
+    """
+    merchant = tx_data.get('merchant')
+    category = tx_data.get('category')
+    location = tx_data.get('location')
+    customer_id = tx_data.get('customerId')
+    card = tx_data.get('cardLast4')
+    timestamp = int(tx_data.get('timestamp', 0))
+    day = day_of(timestamp)
+
+    pipe = redis_client.pipeline(transaction=False)
+    with_sketches = time.monotonic() >= _sketches_retry_at
+    if with_sketches:
+        _add_to_sketches(pipe, merchant, location)
+    pipe.pfadd(customers_by_category_key(category), customer_id)
+    pipe.pfadd(customers_by_merchant_key(merchant), customer_id)
+    pipe.pfadd(customers_by_day_key(day), customer_id)
+    pipe.expire(customers_by_day_key(day), DAY_RETENTION_S)
+    if card:
+        # Card last 4 is only unique per customer
+        pipe.pfadd(cards_by_day_key(day), f"{customer_id}:{card}")
+        pipe.expire(cards_by_day_key(day), DAY_RETENTION_S)
+    pipe.zadd(DAYS_KEY, {day: timestamp - timestamp % DAY_MS})
+    results = pipe.execute(raise_on_error=False)
+
+    sketch_results, results = (results[:3], results[3:]) if with_sketches else ([], results)
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    if any(isinstance(result, Exception) for result in sketch_results):
+        _retry_sketches(redis_client, merchant, location)
+
+
+def get_top_merchants(redis_client, limit: int = 10) -> List[Tuple[str, int]]:
+    """Most frequent merchants (TopK). Returns [(merchant, estimated_count)]."""
+    return _topk_list(redis_client, TOPK_MERCHANTS_KEY, limit)
+
+
+def get_top_locations(redis_client, limit: int = 10) -> List[Tuple[str, int]]:
+    """Most frequent locations (TopK). Returns [(location, estimated_count)]."""
+    return _topk_list(redis_client, TOPK_LOCATIONS_KEY, limit)
+
+
+def _topk_list(redis_client, key: str, limit: int) -> List[Tuple[str, int]]:
+    flat = redis_client.topk().list(key, withcount=True)
+    pairs = [(item, int(count)) for item, count in zip(flat[::2], flat[1::2])]
+    return pairs[:limit]
+
+
+def get_merchant_counts(redis_client, merchants: List[str]) -> Dict[str, int]:
+    """Estimated transaction count per merchant (Count-Min Sketch)."""
+    if not merchants:
+        return {}
+    counts = redis_client.cms().query(CMS_MERCHANTS_KEY, *merchants)
+    return dict(zip(merchants, (int(count) for count in counts)))
+
+
+def count_customers_by_category(redis_client, categories: List[str]) -> Dict[str, int]:
+    """Estimated distinct customers per category (one PFCOUNT each, pipelined)."""
+    pipe = redis_client.pipeline(transaction=False)
+    for category in categories:
+        pipe.pfcount(customers_by_category_key(category))
+    return dict(zip(categories, pipe.execute()))
+
+
+def count_customers_by_merchant(redis_client, merchant: str) -> int:
+    """Estimated distinct customers of a merchant."""
+    return redis_client.pfcount(customers_by_merchant_key(merchant))
+
+
+def latest_day(redis_client) -> Optional[str]:
+    """Most recent day with transactions, or None."""
+    newest = redis_client.zrevrange(DAYS_KEY, 0, 0)
+    return newest[0] if newest else None
+
+
+def count_day(redis_client, day: str) -> Dict[str, int]:
+    """Estimated distinct customers and cards seen on a day."""
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.pfcount(customers_by_day_key(day))
+    pipe.pfcount(cards_by_day_key(day))
+    customers, cards = pipe.execute()
+    return {"customers": customers, "cards": cards}
+
+
+def sketch_bounds() -> Dict[str, Dict]:
+    """Configured memory and error bounds of each structure."""
+    cms_width = math.ceil(math.e / CMS_ERROR)
+    cms_depth = math.ceil(math.log(1 / CMS_PROBABILITY))
+    return {
+        "hyperloglog": {"max_bytes_per_key": 12 * 1024, "standard_error": 0.0081},
+        "count_min_sketch": {
+            "width": cms_width,
+            "depth": cms_depth,
+            "bytes": cms_width * cms_depth * 4,
+            "overcount_fraction_of_total": CMS_ERROR,
+            "probability": 1 - CMS_PROBABILITY,
+        },
+        "topk": {
+            "k": TOPK_K,
+            "width": TOPK_WIDTH,
+            "depth": TOPK_DEPTH,
+            "decay": TOPK_DECAY,
+            "bytes": TOPK_WIDTH * TOPK_DEPTH * 8,
+        },
+    }
@@ -0,0 +1,331 @@
+"""
+MemoryRedis against Redis.
+
+Seeds the same transactions into a MemoryRedis and into a Redis client
+(fakeredis, which implements the Stack commands in process), runs the
+processor modules' writes and reads on both, and checks that every read
+returns the same result. Keeps the memory backend honest: a benchmark on
+it measures the modules' real logic only if it answers like Redis.
+
+Where fakeredis itself falls short of Redis, MemoryRedis is checked
+against the exact answer instead:
+- TS.ADD ON_DUPLICATE SUM keeps the last value, so the shared data gives
+  every transaction its own millisecond (ties get a test of their own),
+  and its compaction rules exist before the data (rules added later are
+  checked on MemoryRedis alone, against the raw series)
+- TS.MRANGE ignores LATEST, so compactions' open buckets are compared
+  with the raw series, on MemoryRedis
+- TOPK.LIST repeats items; with this few items a Redis TopK is exact
+- TDIGEST.TRIMMED_MEAN returns the median
+- JSON.MGET returns the first JSONPath match instead of the list of matches
+
+    pip install -r requirements-dev.txt
+    python -m pytest tests/
+"""
+
+import importlib.util
+import math
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+import fakeredis
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from lib.memory_backend import MemoryRedis
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+# Fixed so both backends (and every run) see the same data
+START_MS = 1_700_000_000_000 - 1_700_000_000_000 % DAY_MS
+CATEGORIES = ("dining", "groceries", "travel", "entertainment")
+MERCHANTS = ("Blue Bottle", "Whole Foods", "Delta", "AMC", "Shell", "Chipotle")
+LOCATIONS = ("Dallas, TX", "Seattle, WA", "New York, NY")
+
+
+def _load(name: str):
+    """
+    processor/modules/<name>.py on its own: the package __init__ also
+    imports vector_search, whose vectorizer needs sentence-transformers.
+    """
+    spec = importlib.util.spec_from_file_location(f"_modules.{name}", ROOT / "processor" / "modules" / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+amount_percentiles = _load("amount_percentiles")
+customer_activity = _load("customer_activity")
+ordered_transactions = _load("ordered_transactions")
+spending_over_time = _load("spending_over_time")
+spending_windows = _load("spending_windows")
+store_transaction = _load("store_transaction")
+transaction_sketches = _load("transaction_sketches")
+
+
+def make_transactions(count: int = 400):
+    """Stream-shaped transactions (string values) over 3 days, each in its own millisecond."""
+    rng = random.Random(45)
+    transactions = []
+    timestamp = START_MS
+    for i in range(count):
+        timestamp += rng.choice((1, 60_000, 600_000, 1_800_000))
+        transactions.append({
+            "transactionId": f"tx_{i:05d}",
+            "customerId": f"CUST_{rng.randrange(12):04d}",
+            "amount": f"{rng.uniform(1, 500):.2f}",
+            "merchant": rng.choice(MERCHANTS),
+            "category": rng.choice(CATEGORIES),
+            "timestamp": str(timestamp),
+            "location": rng.choice(LOCATIONS),
+            "cardLast4": f"{rng.randrange(10_000):04d}",
+        })
+    return transactions
+
+
+TRANSACTIONS = make_transactions()
+LATEST_MS = int(TRANSACTIONS[-1]["timestamp"])
+
+
+def document(tx):
+    """The JSON document of a transaction (Store Transaction step)."""
+    return {**tx, "amount": float(tx["amount"]), "timestamp": int(tx["timestamp"])}
+
+
+def seed(redis, compactions_after: int = 0) -> None:
+    """
+    The consumer's writes, plus the workshop steps' (TODO) writes done
+    directly. The compaction rules are added after `compactions_after`
+    transactions, like a consumer started on existing data.
+    """
+    # Module-level "already created" state would otherwise carry over
+    amount_percentiles._created.clear()
+    spending_over_time._dimension_series.clear()
+    transaction_sketches._sketches_retry_at = 0.0
+
+    transaction_sketches.ensure_sketches(redis)
+    redis.ts().create(spending_over_time.TIMESERIES_KEY, duplicate_policy="sum")
+    for i, tx in enumerate(TRANSACTIONS):
+        if i == compactions_after:
+            spending_over_time.ensure_compactions(redis)
+        # What the participant's steps write
+        redis.lpush("transactions:ordered", tx["transactionId"])
+        redis.json().set(f"transaction:{tx['transactionId']}", "$", document(tx))
+        redis.ts().add(spending_over_time.TIMESERIES_KEY, int(tx["timestamp"]), float(tx["amount"]))
+
+        ordered_transactions.index_transaction(redis, tx)
+        spending_over_time.process_dimensions(redis, tx)
+        customer_activity.process_transaction(redis, tx)
+        spending_windows.process_transaction(redis, tx)
+        transaction_sketches.process_transaction(redis, tx)
+        amount_percentiles.process_transaction(redis, tx)
+    amount_percentiles.flush(redis)
+
+
+@pytest.fixture(scope="module")
+def backends():
+    memory = MemoryRedis()
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    seed(memory)
+    seed(redis)
+    return memory, redis
+
+
+def normalize(value):
+    """Round floats (the backends may sum in a different order) and make tuples lists."""
+    if isinstance(value, float):
+        return None if math.isnan(value) else round(value, 6)
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    return value
+
+
+def assert_same(backends, read) -> None:
+    memory, redis = backends
+    expected = normalize(read(redis))
+    assert expected, "the read returned nothing: the test data doesn't exercise it"
+    assert normalize(read(memory)) == expected
+
+
+# ---------------------------------------------------------------------------
+# Lists, sorted sets, JSON
+# ---------------------------------------------------------------------------
+
+def test_transaction_page(backends):
+    assert_same(backends, lambda r: ordered_transactions.get_transaction_page(r, limit=25))
+
+
+def test_transaction_page_cursor(backends):
+    cursor = TRANSACTIONS[300]
+    assert_same(backends, lambda r: ordered_transactions.get_transaction_page(
+        r, limit=10, before=int(cursor["timestamp"]), before_id=cursor["transactionId"], after=START_MS + HOUR_MS,
+    ))
+
+
+def test_transaction_page_ties():
+    # Only the sorted set is read, so ties don't need the duplicate policy
+    tied = [{**tx, "timestamp": str(START_MS + i // 4)} for i, tx in enumerate(TRANSACTIONS[:20])]
+    backends = MemoryRedis(), fakeredis.FakeRedis(decode_responses=True)
+    for r in backends:
+        for tx in tied:
+            r.lpush("transactions:ordered", tx["transactionId"])
+            ordered_transactions.index_transaction(r, tx)
+    cursor = tied[9]
+    assert_same(backends, lambda r: ordered_transactions.get_transaction_page(
+        r, limit=6, before=int(cursor["timestamp"]), before_id=cursor["transactionId"],
+    ))
+
+
+@pytest.mark.parametrize("fields", [
+    None,
+    ["amount"],
+    ["transactionId", "amount", "merchant", "notAField"],
+])
+def test_transactions_batch(backends, fields):
+    # Against the documents: JSON.MGET is one of the fakeredis gaps
+    memory, _ = backends
+    ids = [tx["transactionId"] for tx in TRANSACTIONS[::7]] + ["tx_missing"]
+    expected = [
+        {key: value for key, value in document(tx).items() if fields is None or key in fields}
+        for tx in TRANSACTIONS[::7]
+    ] + [None]
+    assert store_transaction.get_transactions_batch(memory, ids, fields, chunk_size=16) == expected
+
+
+@pytest.mark.parametrize("customer", ["CUST_0000", "CUST_0007"])
+def test_customer_activity(backends, customer):
+    assert_same(backends, lambda r: (
+        customer_activity.get_recent_transactions(r, customer, 15),
+        customer_activity.get_category_spending(r, customer),
+        customer_activity.get_latest_timestamp(r, customer),
+    ))
+
+
+@pytest.mark.parametrize("window", sorted(spending_windows.WINDOWS))
+def test_spending_windows(backends, window):
+    assert_same(backends, lambda r: (
+        spending_windows.get_top_categories(r, window)[0],
+        spending_windows.get_top_merchants_in_category(r, "dining", window, limit=3)[0],
+    ))
+
+
+# ---------------------------------------------------------------------------
+# TimeSeries
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("bucket_ms", [15 * 60_000, HOUR_MS, 6 * HOUR_MS])
+def test_spending_buckets_raw(backends, bucket_ms):
+    assert_same(backends, lambda r: spending_over_time.get_spending_buckets(
+        r, START_MS, LATEST_MS, bucket_ms,
+    ))
+
+
+@pytest.mark.parametrize("resolution", ["1h", "1d"])
+def test_spending_buckets_compacted(backends, resolution):
+    # Compacted buckets, backfilled and rule-written, patched with the open tail
+    assert_same(backends, lambda r: spending_over_time.get_spending_buckets(
+        r, START_MS, LATEST_MS, DAY_MS, resolution, LATEST_MS,
+    ))
+
+
+@pytest.mark.parametrize("compactions_after", [0, 200, 201])
+def test_compactions_match_raw(compactions_after):
+    # Rules added to existing data: backfilled closed buckets, the open
+    # bucket counted (200 and 201 close it with the next sample or not)
+    memory = MemoryRedis()
+    seed(memory, compactions_after)
+    for resolution, bucket_ms in (("1h", HOUR_MS), ("1d", DAY_MS)):
+        raw = spending_over_time.get_spending_buckets(memory, START_MS, LATEST_MS, bucket_ms)
+        compacted = spending_over_time.get_spending_buckets(
+            memory, START_MS, LATEST_MS, bucket_ms, resolution, LATEST_MS,
+        )
+        assert normalize(compacted) == normalize(raw), resolution
+
+
+@pytest.mark.parametrize("resolution, bucket_ms", [("1h", HOUR_MS), ("1d", DAY_MS)])
+def test_spending_buckets_past_window(backends, resolution, bucket_ms):
+    # A window that ends days before the newest sample: nothing after it
+    memory, _ = backends
+    end = START_MS + DAY_MS - 1
+    raw = spending_over_time.get_spending_buckets(memory, START_MS, end, bucket_ms)
+    compacted = spending_over_time.get_spending_buckets(memory, START_MS, end, bucket_ms, resolution, LATEST_MS)
+    assert compacted[0] and all(ts <= end for ts, _ in compacted[0] + compacted[1])
+    assert normalize(compacted) == normalize(raw)
+
+
+@pytest.mark.parametrize("dimension", spending_over_time.DIMENSIONS)
+@pytest.mark.parametrize("resolution", ["raw", "1h"])
+def test_spending_by_dimension(backends, dimension, resolution):
+    # Up to the last day, which every series has samples in: no open buckets
+    end = LATEST_MS - LATEST_MS % DAY_MS - 1
+    assert_same(backends, lambda r: spending_over_time.get_spending_by_dimension(
+        r, dimension, START_MS, end, 6 * HOUR_MS, resolution,
+    ))
+
+
+@pytest.mark.parametrize("dimension", spending_over_time.DIMENSIONS)
+def test_dimension_compactions_match_raw(backends, dimension):
+    memory, _ = backends
+    raw, compacted = (
+        spending_over_time.get_spending_by_dimension(memory, dimension, START_MS, LATEST_MS, 6 * HOUR_MS, resolution)
+        for resolution in ("raw", "1h")
+    )
+    assert normalize(compacted) == normalize(raw)
+
+
+def test_customer_spending_range(backends):
+    assert_same(backends, lambda r: customer_activity.get_spending_in_range(
+        r, "CUST_0003", START_MS, LATEST_MS, HOUR_MS,
+    ))
+
+
+# ---------------------------------------------------------------------------
+# Probabilistic structures (small enough here to be exact in Redis too)
+# ---------------------------------------------------------------------------
+
+def test_top_k(backends):
+    memory, _ = backends
+    for field, read in (("merchant", transaction_sketches.get_top_merchants),
+                        ("location", transaction_sketches.get_top_locations)):
+        counts = Counter(tx[field] for tx in TRANSACTIONS)
+        assert sorted(read(memory)) == sorted(counts.items())
+
+
+def test_sketches(backends):
+    day = transaction_sketches.day_of(LATEST_MS)
+    assert_same(backends, lambda r: (
+        transaction_sketches.get_merchant_counts(r, list(MERCHANTS) + ["Nobody"]),
+        transaction_sketches.count_customers_by_category(r, list(CATEGORIES)),
+        transaction_sketches.count_customers_by_merchant(r, "Delta"),
+        transaction_sketches.latest_day(r),
+        transaction_sketches.count_day(r, day),
+    ))
+
+
+def test_percentiles_extremes(backends):
+    # min/max are exact in a t-digest; quantiles are estimates (below)
+    keys = [amount_percentiles.category_key(category) for category in CATEGORIES] + ["tdigest:missing"]
+
+    def read(r):
+        return {key: (stats["min"], stats["max"]) for key, stats in amount_percentiles.get_percentiles(r, keys).items()}
+    assert_same(backends, read)
+
+
+def test_percentiles_quantiles(backends):
+    keys = [amount_percentiles.category_key(category) for category in CATEGORIES]
+    memory, redis = (amount_percentiles.get_percentiles(r, keys) for r in backends)
+    for category, key in zip(CATEGORIES, keys):
+        spread = redis[key]["max"] - redis[key]["min"]
+        for name, value in redis[key]["quantiles"].items():
+            assert memory[key]["quantiles"][name] == pytest.approx(value, abs=0.05 * spread), (key, name)
+        # Against the data: fakeredis answers TDIGEST.TRIMMED_MEAN with the median
+        amounts = sorted(float(tx["amount"]) for tx in TRANSACTIONS if tx["category"] == category)
+        low, high = (round(cut * len(amounts)) for cut in amount_percentiles.DEFAULT_TRIM)
+        trimmed = amounts[low:high]
+        assert memory[key]["trimmed_mean"] == pytest.approx(sum(trimmed) / len(trimmed), abs=0.05 * spread)
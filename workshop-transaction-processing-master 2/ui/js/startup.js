@@ -57,6 +57,20 @@ function renderStartupScreen() {
     `;
 }
 
+function showLatestTransaction(streamId, tx) {
+    lastStreamId = streamId;
+
+    latestTransaction = {
+        merchant: tx.merchant || 'Unknown',
+        amount: parseFloat(tx.amount || 0).toFixed(2)
+    };
+
+    const pulseEl = document.getElementById('transaction-pulse');
+    if (pulseEl) {
+        pulseEl.textContent = `${latestTransaction.merchant} - $${latestTransaction.amount}`;
+    }
+}
+
 async function pollStreamForNewTransactions() {
     try {
         // Fetch latest transaction from stream via API endpoint
@@ -64,18 +78,7 @@ async function pollStreamForNewTransactions() {
         const data = await res.json();
 
         if (data.transaction) {
-            const tx = data.transaction;
-            lastStreamId = data.stream_id;
-
-            latestTransaction = {
-                merchant: tx.merchant || 'Unknown',
-                amount: parseFloat(tx.amount || 0).toFixed(2)
-            };
-
-            const pulseEl = document.getElementById('transaction-pulse');
-            if (pulseEl) {
-                pulseEl.textContent = `${latestTransaction.merchant} - $${latestTransaction.amount}`;
-            }
+            showLatestTransaction(data.stream_id, data.transaction);
         }
     } catch (err) {
         // Silently fail - stream might not be available yet
@@ -83,8 +86,28 @@ async function pollStreamForNewTransactions() {
     }
 }
 
+let transactionFeed = null;
+let transactionPollTimer = null;
+
 function startTransactionPolling() {
-    // Poll every 4 seconds to catch transactions as they come in
-    pollStreamForNewTransactions();
-    setInterval(pollStreamForNewTransactions, 4000);
+    // Already connected (startup screen re-renders on status changes)
+    if (transactionFeed || transactionPollTimer) return;
+
+    if (typeof EventSource === 'undefined') {
+        // Poll every 4 seconds to catch transactions as they come in
+        pollStreamForNewTransactions();
+        transactionPollTimer = setInterval(pollStreamForNewTransactions, 4000);
+        return;
+    }
+
+    // Push feed: the browser reconnects on its own and resumes via Last-Event-ID
+    const resume = lastStreamId !== '0' ? `?after=${lastStreamId}` : '';
+    transactionFeed = new EventSource(`${API_BASE}/api/stream/events${resume}`);
+    transactionFeed.addEventListener('transaction', (e) => {
+        const data = JSON.parse(e.data);
+        showLatestTransaction(data.stream_id, data.transaction);
+    });
+    transactionFeed.onerror = () => {
+        console.log('Waiting for stream...');
+    };
 }
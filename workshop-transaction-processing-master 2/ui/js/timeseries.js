@@ -4,6 +4,7 @@
 
 let timeseriesChart = null;
 let currentFilter = '7day';
+const CHART_POINTS = 200; // Buckets aggregated server-side
 
 function renderTimeseriesTab() {
     return `
@@ -62,7 +63,7 @@ function renderTimeseriesTab() {
 
 async function loadTimeseriesData(days) {
     try {
-        const url = `${API_BASE}/api/spending/range?days=${days}`;
+        const url = `${API_BASE}/api/spending/range?days=${days}&points=${CHART_POINTS}`;
         const res = await fetch(url);
         const data = await res.json();
         const timing = performance.getEntriesByName(url).pop();
@@ -76,7 +77,7 @@ async function loadTimeseriesData(days) {
 
         updateChart(data.data);
         updateSummary(data);
-        showToast(`Loaded ${data.count} data points`, 'TS.RANGE', data.redis_ms, duration);
+        showToast(`Loaded ${data.count} data points (${data.series})`, 'TS.RANGE', data.redis_ms, duration);
     } catch (err) {
         console.error('Failed to load timeseries data:', err);
         updateChart([]);
@@ -162,7 +163,8 @@ function updateSummary(data) {
         return;
     }
 
-    const avgSpending = data.total_spent / data.count;
+    const transactions = data.transactions ?? data.count;
+    const avgSpending = transactions ? data.total_spent / transactions : 0;
 
     container.innerHTML = `
         <div class="bg-gray-50 rounded-lg p-4">
@@ -171,7 +173,7 @@ function updateSummary(data) {
         </div>
         <div class="bg-gray-50 rounded-lg p-4">
             <div class="text-sm text-gray-600 mb-1">Transactions</div>
-            <div class="text-2xl font-medium">${data.count}</div>
+            <div class="text-2xl font-medium">${transactions}</div>
         </div>
         <div class="bg-gray-50 rounded-lg p-4">
             <div class="text-sm text-gray-600 mb-1">Average</div>